@@ -1,14 +1,41 @@
 """Main API router that aggregates all route modules."""
 
-from fastapi import APIRouter
+import asyncio
+import time
 
-from app.api.routes import auth, habits, status
+from fastapi import APIRouter, Depends, Response
+from fastapi.responses import PlainTextResponse
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.errors import PyMongoError
 
-api_router = APIRouter(prefix="/api")
+from app.api.routes import (
+    analytics,
+    auth,
+    categories,
+    export,
+    habits,
+    imports,
+    jobs,
+    status,
+    sync,
+)
+from app.core.config import get_settings
+from app.core.database import get_database, pool_stats
+from app.core.deps import principal_cache
+from app.core.metrics import gauge_lines, metrics
+from app.core.timing import TimedRoute
+
+api_router = APIRouter(prefix="/api", route_class=TimedRoute)
 
 api_router.include_router(auth.router)
 api_router.include_router(habits.router)
+api_router.include_router(categories.router)
 api_router.include_router(status.router)
+api_router.include_router(analytics.router)
+api_router.include_router(export.router)
+api_router.include_router(imports.router)
+api_router.include_router(sync.router)
+api_router.include_router(jobs.router)
 
 
 @api_router.get("/", tags=["root"])
@@ -21,3 +48,46 @@ async def root():
 async def health_check():
     """Health check endpoint."""
     return {"status": "healthy"}
+
+
+@api_router.get("/ready", tags=["health"])
+async def readiness_check(
+    response: Response, db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """Readiness check that pings MongoDB.
+
+    Reports the ping round trip and connection pool counters; answers 503
+    when the ping fails or takes longer than ``ready_timeout_seconds``.
+    """
+    settings = get_settings()
+    pool = {"max_size": settings.mongo_max_pool_size, **pool_stats.snapshot()}
+    started = time.perf_counter()
+    try:
+        await asyncio.wait_for(
+            db.command("ping"), timeout=settings.ready_timeout_seconds
+        )
+    except (PyMongoError, asyncio.TimeoutError) as exc:
+        response.status_code = 503
+        return {
+            "status": "unavailable",
+            "error": str(exc)[:200] or type(exc).__name__,
+            "pool": pool,
+        }
+    return {
+        "status": "ready",
+        "ping_ms": round((time.perf_counter() - started) * 1000, 2),
+        "pool": pool,
+    }
+
+
+@api_router.get("/metrics", tags=["health"], response_class=PlainTextResponse)
+async def metrics_endpoint():
+    """Request, MongoDB command, pool and auth cache metrics for Prometheus."""
+    extra = gauge_lines(
+        "mongodb_pool", "MongoDB connection pool counters.", pool_stats.snapshot()
+    ) + gauge_lines(
+        "auth_cache", "Authenticated-principal cache counters.", principal_cache.stats()
+    )
+    return PlainTextResponse(
+        metrics.render(extra), media_type="text/plain; version=0.0.4"
+    )
@@ -0,0 +1,175 @@
+"""Analytics API routes."""
+
+from calendar import monthrange
+from datetime import date, datetime, timedelta, timezone
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from app.core.database import get_database
+from app.core.deps import get_current_user
+from app.core.timing import TimedRoute
+from app.models.analytics import (
+    DailyStats,
+    HabitAnalytics,
+    MonthlyStats,
+    OverallAnalytics,
+    WeeklyStats,
+)
+from app.models.user import User
+from app.services.analytics import (
+    HABIT_FIELDS,
+    daily_stats,
+    get_user_habits,
+    habit_streaks,
+    percentage,
+)
+from app.services.overview import overall_analytics
+
+router = APIRouter(prefix="/analytics", tags=["analytics"], route_class=TimedRoute)
+
+DATE_PATTERN = r"^\d{4}-\d{2}-\d{2}$"
+
+
+def utc_today() -> date:
+    """Current date in UTC."""
+    return datetime.now(timezone.utc).date()
+
+
+def parse_day(value: str, name: str) -> date:
+    """Parse a ``YYYY-MM-DD`` query parameter, raising 400 if it is no date."""
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise HTTPException(
+            status_code=400, detail=f"'{name}' is not a valid date: {value}"
+        ) from None
+
+
+@router.get("/habits/{habit_id}", response_model=HabitAnalytics)
+async def get_habit_analytics(
+    habit_id: str,
+    db: AsyncIOMotorDatabase = Depends(get_database),
+    current_user: User = Depends(get_current_user),
+):
+    """Get streaks and completion rates for a single habit."""
+    habit = await db.habits.find_one(
+        {"user_id": current_user.id, "id": habit_id}, HABIT_FIELDS
+    )
+    if not habit:
+        raise HTTPException(status_code=404, detail="Habit not found")
+
+    today = utc_today()
+    row = (await habit_streaks(db, current_user.id, [habit_id], today)).get(
+        habit_id, {}
+    )
+    created = date.fromisoformat(str(habit["created_at"])[:10])
+    days_tracked = max((today - created).days + 1, 1)
+    total = row.get("total_completions", 0)
+
+    return HabitAnalytics(
+        habit_id=habit_id,
+        habit_name=habit["name"],
+        current_streak=row.get("current_streak", 0),
+        longest_streak=row.get("longest_streak", 0),
+        completion_rate_7d=percentage(row.get("completed_7d", 0), 7),
+        completion_rate_30d=percentage(row.get("completed_30d", 0), 30),
+        completion_rate_all_time=percentage(total, days_tracked),
+        total_completions=total,
+        best_streak_start=row.get("best_streak_start"),
+        best_streak_end=row.get("best_streak_end"),
+    )
+
+
+@router.get("/daily", response_model=list[DailyStats])
+async def get_daily_analytics(
+    date_from: str | None = Query(None, alias="from", pattern=DATE_PATTERN),
+    date_to: str | None = Query(None, alias="to", pattern=DATE_PATTERN),
+    db: AsyncIOMotorDatabase = Depends(get_database),
+    current_user: User = Depends(get_current_user),
+):
+    """Get per-day stats for a date range (defaults to the last 30 days)."""
+    end = parse_day(date_to, "to") if date_to else utc_today()
+    start = parse_day(date_from, "from") if date_from else end - timedelta(days=29)
+    if start > end:
+        raise HTTPException(status_code=400, detail="'from' must not be after 'to'")
+    if (end - start).days >= 366:
+        raise HTTPException(status_code=400, detail="Date range exceeds one year")
+
+    habits = await get_user_habits(db, current_user.id)
+    return await daily_stats(db, current_user.id, habits, start, end)
+
+
+@router.get("/weekly", response_model=WeeklyStats)
+async def get_weekly_analytics(
+    week_start: str | None = Query(None, pattern=DATE_PATTERN),
+    db: AsyncIOMotorDatabase = Depends(get_database),
+    current_user: User = Depends(get_current_user),
+):
+    """Get stats for the week starting on ``week_start`` (defaults to this week)."""
+    if week_start:
+        start = parse_day(week_start, "week_start")
+    else:
+        today = utc_today()
+        start = today - timedelta(days=today.weekday())
+    end = start + timedelta(days=6)
+
+    habits = await get_user_habits(db, current_user.id)
+    days = await daily_stats(db, current_user.id, habits, start, end)
+    completed = sum(day.completed_count for day in days)
+    possible = sum(day.total_habits for day in days)
+    tracked = [day for day in days if day.total_habits]
+
+    return WeeklyStats(
+        week_start=start.isoformat(),
+        week_end=end.isoformat(),
+        completed_count=completed,
+        total_possible=possible,
+        completion_rate=percentage(completed, possible),
+        best_day=(
+            max(tracked, key=lambda d: d.completion_rate).date if tracked else None
+        ),
+        worst_day=(
+            min(tracked, key=lambda d: d.completion_rate).date if tracked else None
+        ),
+    )
+
+
+@router.get("/monthly", response_model=MonthlyStats)
+async def get_monthly_analytics(
+    month: str | None = Query(None, pattern=r"^\d{4}-\d{2}$"),
+    db: AsyncIOMotorDatabase = Depends(get_database),
+    current_user: User = Depends(get_current_user),
+):
+    """Get stats for a ``YYYY-MM`` month (defaults to the current month)."""
+    if month:
+        year, month_number = (int(part) for part in month.split("-"))
+        if not 1 <= month_number <= 12:
+            raise HTTPException(status_code=400, detail="Invalid month")
+    else:
+        today = utc_today()
+        year, month_number = today.year, today.month
+    start = date(year, month_number, 1)
+    end = date(year, month_number, monthrange(year, month_number)[1])
+
+    habits = await get_user_habits(db, current_user.id)
+    days = await daily_stats(db, current_user.id, habits, start, end)
+    completed = sum(day.completed_count for day in days)
+    possible = sum(day.total_habits for day in days)
+
+    return MonthlyStats(
+        month=f"{year:04d}-{month_number:02d}",
+        completed_count=completed,
+        total_possible=possible,
+        completion_rate=percentage(completed, possible),
+        daily_breakdown=days,
+    )
+
+
+@router.get("/overall", response_model=OverallAnalytics)
+async def get_overall_analytics(
+    db: AsyncIOMotorDatabase = Depends(get_database),
+    current_user: User = Depends(get_current_user),
+):
+    """Get totals, recent completion rates and the best current streak."""
+    return await overall_analytics(db, current_user.id, utc_today())
@@ -3,12 +3,48 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from motor.motor_asyncio import AsyncIOMotorDatabase
 
+from app.core.config import get_settings
 from app.core.database import get_database
-from app.core.deps import get_current_user
-from app.core.security import create_access_token, get_password_hash, verify_password
-from app.models.user import Token, User, UserCreate, UserInDB, UserLogin
+from app.core.deps import get_current_user, invalidate_user
+from app.core.security import (
+    create_access_token,
+    hash_password_async,
+    verify_password_async,
+)
+from app.core.timing import TimedRoute
+from app.models.job import JobReceipt
+from app.models.user import (
+    RefreshRequest,
+    Token,
+    User,
+    UserCreate,
+    UserInDB,
+    UserLogin,
+)
+from app.services.jobs import enqueue
+from app.services.refresh_tokens import (
+    RefreshTokenError,
+    issue_refresh_token,
+    revoke_refresh_token,
+    rotate_refresh_token,
+)
 
-router = APIRouter(prefix="/auth", tags=["auth"])
+router = APIRouter(prefix="/auth", tags=["auth"], route_class=TimedRoute)
+
+
+async def issue_tokens(db: AsyncIOMotorDatabase, user_id: str) -> Token:
+    """Start a session: a short-lived access token plus a new refresh token."""
+    return issue_access_token(user_id, await issue_refresh_token(db, user_id))
+
+
+def issue_access_token(user_id: str, refresh_token: str) -> Token:
+    """Build the token response for a session."""
+    settings = get_settings()
+    return Token(
+        access_token=create_access_token(data={"sub": user_id}),
+        expires_in=settings.access_token_expire_minutes * 60,
+        refresh_token=refresh_token,
+    )
 
 
 @router.post("/register", response_model=User, status_code=status.HTTP_201_CREATED)
@@ -29,7 +65,7 @@ async def register(
     user_db = UserInDB(
         email=user_in.email,
         name=user_in.name,
-        hashed_password=get_password_hash(user_in.password),
+        hashed_password=await hash_password_async(user_in.password),
     )
 
     doc = user_db.model_dump()
@@ -52,17 +88,71 @@ async def login(
             detail="Invalid email or password",
         )
 
-    if not verify_password(credentials.password, user["hashed_password"]):
+    valid, new_hash = await verify_password_async(
+        credentials.password, user["hashed_password"]
+    )
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid email or password",
         )
+    if new_hash:
+        # Stored hash used an outdated bcrypt cost; upgrade it transparently.
+        await db.users.update_one(
+            {"id": user["id"]}, {"$set": {"hashed_password": new_hash}}
+        )
 
-    access_token = create_access_token(data={"sub": user["id"]})
-    return Token(access_token=access_token)
+    return await issue_tokens(db, user["id"])
+
+
+@router.post("/refresh", response_model=Token)
+async def refresh(
+    body: RefreshRequest,
+    db: AsyncIOMotorDatabase = Depends(get_database),
+):
+    """Exchange a refresh token for a new access/refresh token pair."""
+    try:
+        user_id, refresh_token = await rotate_refresh_token(db, body.refresh_token)
+    except RefreshTokenError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail=str(exc),
+        )
+
+    if not await db.users.find_one({"id": user_id}, {"_id": 1}):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="User not found",
+        )
+    return issue_access_token(user_id, refresh_token)
+
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout(
+    body: RefreshRequest,
+    db: AsyncIOMotorDatabase = Depends(get_database),
+):
+    """Revoke a refresh token and every token rotated from the same login."""
+    await revoke_refresh_token(db, body.refresh_token)
 
 
 @router.get("/me", response_model=User)
 async def get_me(current_user: User = Depends(get_current_user)):
     """Get current authenticated user."""
     return current_user
+
+
+@router.delete("/me", response_model=JobReceipt, status_code=status.HTTP_202_ACCEPTED)
+async def delete_me(
+    db: AsyncIOMotorDatabase = Depends(get_database),
+    current_user: User = Depends(get_current_user),
+):
+    """Delete the current account; its data is removed by a background job.
+
+    The account itself is gone at once, so its access and refresh tokens
+    stop working immediately; poll the job with its ``status_token`` in an
+    ``X-Job-Token`` header instead.
+    """
+    await db.users.delete_one({"id": current_user.id})
+    invalidate_user(current_user.id)
+    return await enqueue(db, current_user.id, "delete_account", with_token=True)
@@ -0,0 +1,113 @@
+"""Category API routes."""
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from app.core.database import get_database
+from app.core.deps import conditional_get, get_current_user
+from app.core.timing import TimedRoute
+from app.models.habit import Category, CategoryCreate, CategoryUpdate
+from app.models.user import User
+from app.services.data_version import bump_data_version
+from app.services.sync import record_change
+
+router = APIRouter(prefix="/categories", tags=["categories"], route_class=TimedRoute)
+
+CATEGORY_EXISTS = "A category with this name already exists"
+
+
+@router.get("", response_model=list[Category], dependencies=[Depends(conditional_get)])
+async def get_categories(
+    db: AsyncIOMotorDatabase = Depends(get_database),
+    current_user: User = Depends(get_current_user),
+):
+    """Get all categories of the current user by name, with habit counts."""
+    return (
+        await db.categories.find({"user_id": current_user.id}, {"_id": 0})
+        .sort("name", 1)
+        .to_list(None)
+    )
+
+
+@router.post("", response_model=Category, status_code=status.HTTP_201_CREATED)
+async def create_category(
+    category_in: CategoryCreate,
+    db: AsyncIOMotorDatabase = Depends(get_database),
+    current_user: User = Depends(get_current_user),
+):
+    """Create a new category."""
+    category = Category(**category_in.model_dump(), user_id=current_user.id)
+    try:
+        await db.categories.insert_one(category.model_dump())
+    except DuplicateKeyError:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT, detail=CATEGORY_EXISTS
+        )
+    await bump_data_version(db, current_user.id)
+    return category
+
+
+@router.patch("/{category_id}", response_model=Category)
+async def update_category(
+    category_id: str,
+    category_in: CategoryUpdate,
+    db: AsyncIOMotorDatabase = Depends(get_database),
+    current_user: User = Depends(get_current_user),
+):
+    """Update a category; renaming it also renames it on its habits."""
+    update_data = category_in.model_dump(exclude_unset=True)
+    if not update_data:
+        raise HTTPException(status_code=400, detail="No fields to update")
+
+    try:
+        before = await db.categories.find_one_and_update(
+            {"user_id": current_user.id, "id": category_id},
+            {"$set": update_data},
+            projection={"_id": 0},
+            return_document=ReturnDocument.BEFORE,
+        )
+    except DuplicateKeyError:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT, detail=CATEGORY_EXISTS
+        )
+    if before is None:
+        raise HTTPException(status_code=404, detail="Category not found")
+
+    category = {**before, **update_data}
+    if category == before:
+        return category
+    if category["name"] != before["name"]:
+        # Archived habits keep the category too, though they are not counted.
+        await db.habits.update_many(
+            {"user_id": current_user.id, "category": before["name"]},
+            {"$set": {"category": category["name"]}},
+        )
+        await record_change(
+            db, current_user.id, "habits", {"category": category["name"]}
+        )
+    else:
+        await bump_data_version(db, current_user.id)
+    return category
+
+
+@router.delete("/{category_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_category(
+    category_id: str,
+    db: AsyncIOMotorDatabase = Depends(get_database),
+    current_user: User = Depends(get_current_user),
+):
+    """Delete a category that no active habit uses."""
+    query = {"user_id": current_user.id, "id": category_id}
+    deleted = await db.categories.find_one_and_delete(
+        {**query, "habit_count": {"$not": {"$gt": 0}}}, {"_id": 0, "id": 1}
+    )
+    if deleted is not None:
+        await bump_data_version(db, current_user.id)
+        return
+    if await db.categories.find_one(query, {"_id": 1}):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT, detail="Category is in use"
+        )
+    raise HTTPException(status_code=404, detail="Category not found")
@@ -0,0 +1,124 @@
+"""Data export API routes."""
+
+import json
+from collections.abc import AsyncIterator
+from datetime import datetime, timezone
+from enum import Enum
+
+from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from app.core.database import get_database
+from app.core.deps import get_current_user
+from app.core.timing import TimedRoute
+from app.models.user import User
+from app.services.overview import overall_analytics
+
+router = APIRouter(prefix="/export", tags=["export"], route_class=TimedRoute)
+
+BATCH_SIZE = 500
+
+
+class ExportFormat(str, Enum):
+    """Supported export encodings."""
+
+    NDJSON = "ndjson"
+    JSON = "json"
+
+
+def dumps(value) -> str:
+    """Compact JSON encoding tolerant of datetimes."""
+    return json.dumps(value, default=str, separators=(",", ":"))
+
+
+def export_sections(
+    db: AsyncIOMotorDatabase, user_id: str
+) -> list[tuple[str, str, AsyncIterator[dict]]]:
+    """Cursors feeding each exported collection, as ``(section, type, cursor)``."""
+    return [
+        (
+            "habits",
+            "habit",
+            db.habits.find({"user_id": user_id}, {"_id": 0})
+            .sort("created_at", 1)
+            .batch_size(BATCH_SIZE),
+        ),
+        (
+            "completions",
+            "completion",
+            db.completions.find({"user_id": user_id}, {"_id": 0})
+            .sort([("habit_id", 1), ("date", 1)])
+            .batch_size(BATCH_SIZE),
+        ),
+        (
+            "categories",
+            "category",
+            db.categories.find({"user_id": user_id}, {"_id": 0})
+            .sort("name", 1)
+            .batch_size(BATCH_SIZE),
+        ),
+    ]
+
+
+async def stream_ndjson(
+    db: AsyncIOMotorDatabase, user_id: str, exported_at: datetime
+) -> AsyncIterator[str]:
+    """Yield one JSON object per line, tagged with its record type."""
+    yield dumps(
+        {"type": "export", "export_date": exported_at.isoformat(), "user_id": user_id}
+    ) + "\n"
+    for _, record_type, cursor in export_sections(db, user_id):
+        async for doc in cursor:
+            yield dumps({"type": record_type, "data": doc}) + "\n"
+    analytics = await overall_analytics(db, user_id, exported_at.date())
+    yield dumps({"type": "analytics", "data": analytics.model_dump()}) + "\n"
+
+
+async def stream_json(
+    db: AsyncIOMotorDatabase, user_id: str, exported_at: datetime
+) -> AsyncIterator[str]:
+    """Yield an ``ExportData`` document piece by piece."""
+    yield "{" + f'"export_date":{dumps(exported_at.isoformat())},'
+    yield f'"user_id":{dumps(user_id)}'
+    for section, _, cursor in export_sections(db, user_id):
+        yield f',"{section}":['
+        separator = ""
+        async for doc in cursor:
+            yield separator + dumps(doc)
+            separator = ","
+        yield "]"
+    analytics = await overall_analytics(db, user_id, exported_at.date())
+    yield f',"analytics":{dumps(analytics.model_dump())}' + "}"
+
+
+@router.get("")
+async def export_data(
+    format: ExportFormat = ExportFormat.NDJSON,
+    db: AsyncIOMotorDatabase = Depends(get_database),
+    current_user: User = Depends(get_current_user),
+):
+    """Stream all of the current user's data.
+
+    ``ndjson`` emits a header line followed by one ``{"type", "data"}`` record
+    per habit, completion and category, and a final analytics record. ``json``
+    emits a single ``ExportData`` document. Both are read from database
+    cursors in batches, so memory use does not grow with history size.
+    """
+    exported_at = datetime.now(timezone.utc)
+    filename = f"habit-tracker-export-{exported_at.date().isoformat()}.{format.value}"
+    if format == ExportFormat.JSON:
+        body, media_type = (
+            stream_json(db, current_user.id, exported_at),
+            "application/json",
+        )
+    else:
+        body, media_type = (
+            stream_ndjson(db, current_user.id, exported_at),
+            "application/x-ndjson",
+        )
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
@@ -1,47 +1,162 @@
 """Habit management API routes."""
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from datetime import datetime, timezone
+from uuid import uuid4
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
 
+from app.core.config import get_settings
 from app.core.database import get_database
+from app.core.deps import conditional_get, get_current_user
+from app.core.pagination import PageParams, fetch_page
+from app.core.serialization import fast_response, model_projection
+from app.core.timing import TimedRoute
 from app.models.habit import (
+    CompletionBatch,
+    CompletionBatchResult,
+    CompletionBitmap,
+    CompletionBitmapEncoding,
+    CompletionOperationResult,
+    CompletionOperationStatus,
+    CompletionRecord,
+    CompletionToggle,
     Habit,
     HabitCreate,
     HabitUpdate,
-    CompletionRecord,
-    CompletionToggle,
+    HabitWithCompletions,
+)
+from app.models.job import Job
+from app.models.user import User
+from app.services.bitmaps import (
+    build_bitmap,
+    current_streak,
+    days_in_year,
+    encode_base64,
+    encode_rle,
+    load_bitmaps,
+    longest_run,
+)
+from app.services.categories import habit_category_changed
+from app.services.completions import completion_changed, completions_rewritten
+from app.services.habit_stats import create_habit_stats, get_habit_stats
+from app.services.jobs import enqueue
+from app.services.rollups import (
+    habit_archive_changed,
+    record_habit_delta,
+    recount_completions,
+)
+from app.services.sync import record_change, record_deletion
+
+router = APIRouter(prefix="/habits", tags=["habits"], route_class=TimedRoute)
+
+DATE_PATTERN = r"^\d{4}-\d{2}-\d{2}$"
+HABIT_SORT = ["created_at", "id"]
+DUPLICATE_KEY = 11000
+
+
+@router.get(
+    "",
+    response_model=list[HabitWithCompletions],
+    response_model_exclude_unset=True,
+    dependencies=[Depends(conditional_get)],
 )
+async def get_habits(
+    response: Response,
+    include: str | None = Query(
+        None, description="Comma-separated extras: completions, stats"
+    ),
+    date_from: str | None = Query(None, alias="from", pattern=DATE_PATTERN),
+    date_to: str | None = Query(None, alias="to", pattern=DATE_PATTERN),
+    page: PageParams = Depends(),
+    db: AsyncIOMotorDatabase = Depends(get_database),
+    current_user: User = Depends(get_current_user),
+):
+    """Get a page of the current user's habits, oldest first.
 
-router = APIRouter(prefix="/habits", tags=["habits"])
+    ``include=completions`` attaches each habit's completions within the
+    optional ``from``/``to`` window and ``include=stats`` fills in the
+    ``HabitWithStats`` fields, so the dashboard loads in a single request.
+    Further pages are fetched with the ``X-Next-Cursor`` header value.
+    """
+    extras = {part.strip() for part in include.split(",")} if include else set()
+    unknown = extras - {"completions", "stats"}
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown include value(s): {', '.join(sorted(unknown))}",
+        )
 
+    habits = await fetch_page(
+        db.habits,
+        {"user_id": current_user.id},
+        HABIT_SORT,
+        page,
+        response,
+        model_projection(Habit),
+    )
+    if not habits or not extras:
+        return fast_response(habits, response)
 
-@router.get("", response_model=list[Habit])
-async def get_habits(db: AsyncIOMotorDatabase = Depends(get_database)):
-    """Get all habits."""
-    habits = await db.habits.find({}, {"_id": 0}).to_list(1000)
-    return habits
+    habit_ids = [habit["id"] for habit in habits]
+
+    if "completions" in extras:
+        query: dict = {"user_id": current_user.id, "habit_id": {"$in": habit_ids}}
+        if date_from or date_to:
+            query["date"] = {}
+            if date_from:
+                query["date"]["$gte"] = date_from
+            if date_to:
+                query["date"]["$lte"] = date_to
+
+        by_habit: dict[str, list[dict]] = {habit_id: [] for habit_id in habit_ids}
+        cursor = db.completions.find(query, model_projection(CompletionRecord))
+        async for completion in cursor.sort([("habit_id", 1), ("date", 1)]):
+            by_habit[completion["habit_id"]].append(completion)
+        for habit in habits:
+            habit["completions"] = by_habit[habit["id"]]
+
+    if "stats" in extras:
+        today = datetime.now(timezone.utc).date()
+        stats = await get_habit_stats(db, current_user.id, habit_ids, today)
+        for habit in habits:
+            habit.update(stats[habit["id"]])
+
+    return fast_response(habits, response)
 
 
 @router.post("", response_model=Habit, status_code=status.HTTP_201_CREATED)
 async def create_habit(
     habit_in: HabitCreate,
     db: AsyncIOMotorDatabase = Depends(get_database),
+    current_user: User = Depends(get_current_user),
 ):
     """Create a new habit."""
-    habit = Habit(**habit_in.model_dump())
+    habit = Habit(**habit_in.model_dump(), user_id=current_user.id)
     doc = habit.model_dump()
     doc["created_at"] = doc["created_at"].isoformat()
     await db.habits.insert_one(doc)
+    await create_habit_stats(db, current_user.id, habit.id)
+    await record_habit_delta(db, current_user.id, doc, 1)
+    await habit_category_changed(db, current_user.id, None, doc)
+    await record_change(db, current_user.id, "habits", {"id": habit.id})
     return habit
 
 
-@router.get("/{habit_id}", response_model=Habit)
+@router.get(
+    "/{habit_id}", response_model=Habit, dependencies=[Depends(conditional_get)]
+)
 async def get_habit(
     habit_id: str,
     db: AsyncIOMotorDatabase = Depends(get_database),
+    current_user: User = Depends(get_current_user),
 ):
     """Get a specific habit by ID."""
-    habit = await db.habits.find_one({"id": habit_id}, {"_id": 0})
+    habit = await db.habits.find_one(
+        {"user_id": current_user.id, "id": habit_id}, {"_id": 0}
+    )
     if not habit:
         raise HTTPException(status_code=404, detail="Habit not found")
     return habit
@@ -52,65 +167,300 @@ async def update_habit(
     habit_id: str,
     habit_in: HabitUpdate,
     db: AsyncIOMotorDatabase = Depends(get_database),
+    current_user: User = Depends(get_current_user),
 ):
     """Update a habit."""
     update_data = habit_in.model_dump(exclude_unset=True)
     if not update_data:
         raise HTTPException(status_code=400, detail="No fields to update")
 
-    result = await db.habits.update_one({"id": habit_id}, {"$set": update_data})
-    if result.matched_count == 0:
+    before = await db.habits.find_one_and_update(
+        {"user_id": current_user.id, "id": habit_id},
+        {"$set": update_data},
+        projection={"_id": 0},
+        return_document=ReturnDocument.BEFORE,
+    )
+    if before is None:
         raise HTTPException(status_code=404, detail="Habit not found")
 
-    habit = await db.habits.find_one({"id": habit_id}, {"_id": 0})
+    habit = {**before, **update_data}
+    if habit == before:
+        return habit
+    archived = habit.get("is_archived", False)
+    if archived != before.get("is_archived", False):
+        await habit_archive_changed(db, current_user.id, habit, archived)
+    await habit_category_changed(db, current_user.id, before, habit)
+    await record_change(db, current_user.id, "habits", {"id": habit_id})
     return habit
 
 
-@router.delete("/{habit_id}", status_code=status.HTTP_204_NO_CONTENT)
+@router.get(
+    "/{habit_id}/bitmap",
+    response_model=CompletionBitmap,
+    dependencies=[Depends(conditional_get)],
+)
+async def get_completion_bitmap(
+    habit_id: str,
+    year: int | None = Query(None, ge=1970, le=9999),
+    encoding: CompletionBitmapEncoding = CompletionBitmapEncoding.BASE64,
+    db: AsyncIOMotorDatabase = Depends(get_database),
+    current_user: User = Depends(get_current_user),
+):
+    """Get a year of completions as a bitmap (bit ``i`` is day-of-year ``i+1``).
+
+    ``base64`` encodes the little-endian bitmap bytes; ``rle`` lists
+    alternating run lengths starting with days not completed.
+    """
+    habit = await db.habits.find_one(
+        {"user_id": current_user.id, "id": habit_id}, {"_id": 1}
+    )
+    if not habit:
+        raise HTTPException(status_code=404, detail="Habit not found")
+
+    today = datetime.now(timezone.utc).date()
+    year = year or today.year
+    years = sorted({year, today.year, today.year - 1})
+    stored = get_settings().completion_bitmaps_enabled
+    bitmaps = await load_bitmaps(db, current_user.id, habit_id, years) if stored else {}
+    for missing in set(years) - bitmaps.keys():
+        bitmaps[missing] = await build_bitmap(
+            db, current_user.id, habit_id, missing, store=stored
+        )
+
+    bits = bitmaps[year]
+    if encoding == CompletionBitmapEncoding.RLE:
+        data: str | list[int] = encode_rle(bits, year)
+    else:
+        data = encode_base64(bits, year)
+
+    return CompletionBitmap(
+        habit_id=habit_id,
+        year=year,
+        days=days_in_year(year),
+        encoding=encoding,
+        data=data,
+        total_completions=bin(bits).count("1"),
+        longest_streak=longest_run(bits),
+        current_streak=current_streak(bitmaps, today),
+    )
+
+
+@router.delete("/{habit_id}", response_model=Job, status_code=status.HTTP_202_ACCEPTED)
 async def delete_habit(
     habit_id: str,
     db: AsyncIOMotorDatabase = Depends(get_database),
+    current_user: User = Depends(get_current_user),
 ):
-    """Delete a habit and its completions."""
-    result = await db.habits.delete_one({"id": habit_id})
-    if result.deleted_count == 0:
+    """Delete a habit; its completions are removed by a background job."""
+    habit = await db.habits.find_one_and_delete(
+        {"user_id": current_user.id, "id": habit_id},
+        {"_id": 0, "is_archived": 1, "category": 1, "created_at": 1},
+    )
+    if habit is None:
         raise HTTPException(status_code=404, detail="Habit not found")
-    # Clean up completions
-    await db.completions.delete_many({"habit_id": habit_id})
+    await habit_category_changed(db, current_user.id, habit, None)
+    if not habit.get("is_archived", False):
+        # Its completions leave the rollups as the job deletes them.
+        await record_habit_delta(db, current_user.id, habit, -1)
+    # The tombstone also tells syncing clients to drop the habit's completions.
+    await record_deletion(db, current_user.id, "habits", habit_id)
+    return await enqueue(db, current_user.id, "delete_habit", {"habit_id": habit_id})
 
 
 @router.post("/completions/toggle", response_model=CompletionRecord)
 async def toggle_completion(
     toggle: CompletionToggle,
     db: AsyncIOMotorDatabase = Depends(get_database),
+    current_user: User = Depends(get_current_user),
 ):
     """Toggle habit completion for a specific date."""
-    existing = await db.completions.find_one(
+    habit = await db.habits.find_one(
+        {"user_id": current_user.id, "id": toggle.habit_id},
+        {"_id": 0, "is_archived": 1},
+    )
+    if habit is None:
+        raise HTTPException(status_code=404, detail="Habit not found")
+
+    query = {
+        "user_id": current_user.id,
+        "habit_id": toggle.habit_id,
+        "date": toggle.date,
+    }
+    # A single pipeline update flips ``completed`` (a missing document upserts
+    # as completed) so concurrent clicks can never read stale state or insert
+    # duplicate records.
+    update = [
+        {
+            "$set": {
+                "id": {"$ifNull": ["$id", str(uuid4())]},
+                "completed": {"$not": [{"$ifNull": ["$completed", False]}]},
+                "notes": {"$ifNull": ["$notes", None]},
+                "client_ts": "$$NOW",
+            }
+        }
+    ]
+    try:
+        record = await db.completions.find_one_and_update(
+            query,
+            update,
+            projection={"_id": 0},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+    except DuplicateKeyError:
+        # Two upserts raced to insert the same record; the loser now matches it.
+        record = await db.completions.find_one_and_update(
+            query,
+            update,
+            projection={"_id": 0},
+            return_document=ReturnDocument.AFTER,
+        )
+
+    await completion_changed(
+        db,
+        current_user.id,
+        toggle.habit_id,
+        toggle.date,
+        record["completed"],
+        archived=habit.get("is_archived", False),
+    )
+    await record_change(
+        db,
+        current_user.id,
+        "completions",
         {"habit_id": toggle.habit_id, "date": toggle.date},
-        {"_id": 0},
     )
+    return record
 
-    if existing:
-        new_completed = not existing.get("completed", False)
-        await db.completions.update_one(
-            {"habit_id": toggle.habit_id, "date": toggle.date},
-            {"$set": {"completed": new_completed}},
+
+@router.post("/completions/batch", response_model=CompletionBatchResult)
+async def batch_completions(
+    batch: CompletionBatch,
+    db: AsyncIOMotorDatabase = Depends(get_database),
+    current_user: User = Depends(get_current_user),
+):
+    """Apply queued set/unset operations, last writer wins per habit and date.
+
+    Each record keeps the ``client_ts`` of the operation that last wrote it
+    (toggles stamp the server time). An operation only replaces a record with
+    an older stamp; otherwise it is reported as ``stale``. All operations are
+    written with a single unordered ``bulk_write`` of upserts.
+    """
+    results = [
+        CompletionOperationResult(
+            index=index,
+            habit_id=operation.habit_id,
+            date=operation.date,
+            status=CompletionOperationStatus.APPLIED,
         )
-        existing["completed"] = new_completed
-        return existing
-    else:
-        record = CompletionRecord(habit_id=toggle.habit_id, date=toggle.date)
-        await db.completions.insert_one(record.model_dump())
-        return record
+        for index, operation in enumerate(batch.operations)
+    ]
+
+    habit_ids = list({operation.habit_id for operation in batch.operations})
+    owned = {
+        habit["id"]
+        async for habit in db.habits.find(
+            {"user_id": current_user.id, "id": {"$in": habit_ids}},
+            {"_id": 0, "id": 1},
+        )
+    }
 
+    # Only the newest operation per record is sent; earlier ones are stale.
+    latest: dict[tuple[str, str], int] = {}
+    for index, operation in enumerate(batch.operations):
+        if operation.habit_id not in owned:
+            results[index].status = CompletionOperationStatus.REJECTED
+            results[index].error = "Habit not found"
+            continue
+        key = (operation.habit_id, operation.date)
+        previous = latest.get(key)
+        if previous is None:
+            latest[key] = index
+        elif batch.operations[previous].client_ts <= operation.client_ts:
+            latest[key] = index
+            results[previous].status = CompletionOperationStatus.STALE
+        else:
+            results[index].status = CompletionOperationStatus.STALE
 
-@router.get("/completions/{habit_id}", response_model=list[CompletionRecord])
+    indexes = list(latest.values())
+    requests = []
+    for index in indexes:
+        operation = batch.operations[index]
+        requests.append(
+            UpdateOne(
+                {
+                    "user_id": current_user.id,
+                    "habit_id": operation.habit_id,
+                    "date": operation.date,
+                    "$or": [
+                        {"client_ts": {"$exists": False}},
+                        {"client_ts": {"$lt": operation.client_ts}},
+                    ],
+                },
+                {
+                    "$set": {
+                        "completed": operation.completed,
+                        "client_ts": operation.client_ts,
+                    },
+                    "$setOnInsert": {"id": str(uuid4()), "notes": None},
+                },
+                upsert=True,
+            )
+        )
+
+    if requests:
+        try:
+            await db.completions.bulk_write(requests, ordered=False)
+        except BulkWriteError as exc:
+            for error in exc.details.get("writeErrors", []):
+                result = results[indexes[error["index"]]]
+                if error["code"] == DUPLICATE_KEY:
+                    # The record exists with a newer stamp, so the filter missed
+                    # and the upsert collided with it.
+                    result.status = CompletionOperationStatus.STALE
+                else:
+                    result.status = CompletionOperationStatus.REJECTED
+                    result.error = error["errmsg"][:200]
+
+    summary = CompletionBatchResult(results=results)
+    touched, dates, written = set(), set(), []
+    for result in results:
+        if result.status == CompletionOperationStatus.APPLIED:
+            summary.applied += 1
+            touched.add(result.habit_id)
+            dates.add(result.date)
+            written.append({"habit_id": result.habit_id, "date": result.date})
+        elif result.status == CompletionOperationStatus.STALE:
+            summary.stale += 1
+        else:
+            summary.rejected += 1
+
+    await completions_rewritten(db, current_user.id, list(touched))
+    await recount_completions(db, current_user.id, sorted(dates))
+    if written:
+        await record_change(db, current_user.id, "completions", {"$or": written})
+    return summary
+
+
+@router.get(
+    "/completions/{habit_id}",
+    response_model=list[CompletionRecord],
+    dependencies=[Depends(conditional_get)],
+)
 async def get_completions(
     habit_id: str,
+    response: Response,
+    page: PageParams = Depends(),
     db: AsyncIOMotorDatabase = Depends(get_database),
+    current_user: User = Depends(get_current_user),
 ):
-    """Get all completions for a habit."""
-    completions = await db.completions.find(
-        {"habit_id": habit_id}, {"_id": 0}
-    ).to_list(1000)
-    return completions
+    """Get a page of completions for a habit, ordered by date."""
+    completions = await fetch_page(
+        db.completions,
+        {"user_id": current_user.id, "habit_id": habit_id},
+        ["date"],
+        page,
+        response,
+        model_projection(CompletionRecord),
+    )
+    return fast_response(completions, response)
@@ -0,0 +1,49 @@
+"""Data import API routes."""
+
+from enum import Enum
+
+from fastapi import APIRouter, Depends, Request
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from app.core.database import get_database
+from app.core.deps import get_current_user
+from app.core.timing import TimedRoute
+from app.models.transfer import ImportResult
+from app.models.user import User
+from app.services.importer import Importer, import_csv, import_ndjson, iter_lines
+
+router = APIRouter(prefix="/import", tags=["import"], route_class=TimedRoute)
+
+
+class ImportFormat(str, Enum):
+    """Supported import encodings."""
+
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+
+@router.post("", response_model=ImportResult)
+async def import_data(
+    request: Request,
+    format: ImportFormat | None = None,
+    db: AsyncIOMotorDatabase = Depends(get_database),
+    current_user: User = Depends(get_current_user),
+):
+    """Import habits, completions and categories from NDJSON or CSV.
+
+    NDJSON uses the ``GET /api/export`` line format. The format is taken from
+    ``format`` or, failing that, the ``Content-Type`` header. The body is
+    parsed as it streams in and written with batched upserts; the response
+    reports each batch and the first rejected lines.
+    """
+    if format is None:
+        content_type = request.headers.get("content-type", "")
+        format = ImportFormat.CSV if "csv" in content_type else ImportFormat.NDJSON
+
+    importer = Importer(db, current_user.id)
+    lines = iter_lines(request.stream())
+    if format == ImportFormat.CSV:
+        await import_csv(importer, lines)
+    else:
+        await import_ndjson(importer, lines)
+    return await importer.finish()
@@ -0,0 +1,41 @@
+"""Background job API routes."""
+
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from app.core.database import get_database
+from app.core.deps import get_optional_user
+from app.core.timing import TimedRoute
+from app.models.job import Job
+from app.models.user import User
+from app.services.jobs import get_job, get_job_by_token
+
+router = APIRouter(prefix="/jobs", tags=["jobs"], route_class=TimedRoute)
+
+
+@router.get("/{job_id}", response_model=Job)
+async def get_job_status(
+    job_id: str,
+    x_job_token: str | None = Header(None),
+    db: AsyncIOMotorDatabase = Depends(get_database),
+    current_user: User | None = Depends(get_optional_user),
+):
+    """Get the status and progress of a background job.
+
+    Readable by its owner, or with the ``status_token`` it was queued with
+    in an ``X-Job-Token`` header (for jobs such as account deletion that
+    outlive the owner's credentials).
+    """
+    if x_job_token:
+        job = await get_job_by_token(db, job_id, x_job_token)
+    elif current_user is not None:
+        job = await get_job(db, current_user.id, job_id)
+    else:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
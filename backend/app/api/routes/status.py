@@ -1,25 +1,80 @@
 """Status/health check API routes."""
 
-from datetime import datetime
-from fastapi import APIRouter, Depends
+from datetime import datetime, timedelta, timezone
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from motor.motor_asyncio import AsyncIOMotorDatabase
 
 from app.core.database import get_database
-from app.models.status import StatusCheck, StatusCheckCreate
+from app.core.pagination import PageParams, fetch_page
+from app.core.serialization import fast_response, model_projection
+from app.core.timing import TimedRoute
+from app.models.status import (
+    StatusBucketUnit,
+    StatusCheck,
+    StatusCheckBucket,
+    StatusCheckCreate,
+    assume_utc,
+)
+from app.services.status_checks import (
+    BUCKET_WIDTHS,
+    COLLECTION,
+    MAX_BUCKETS,
+    downsample,
+    range_query,
+)
 
-router = APIRouter(prefix="/status", tags=["status"])
+router = APIRouter(prefix="/status", tags=["status"], route_class=TimedRoute)
 
 
 @router.get("", response_model=list[StatusCheck])
-async def get_status_checks(db: AsyncIOMotorDatabase = Depends(get_database)):
-    """Get all status checks."""
-    status_checks = await db.status_checks.find({}, {"_id": 0}).to_list(1000)
-
+async def get_status_checks(
+    response: Response,
+    page: PageParams = Depends(),
+    start: datetime | None = Query(None, alias="from"),
+    end: datetime | None = Query(None, alias="to"),
+    client_name: str | None = None,
+    db: AsyncIOMotorDatabase = Depends(get_database),
+):
+    """Get a page of status checks in ``[from, to)``, oldest first."""
+    status_checks = await fetch_page(
+        db[COLLECTION],
+        range_query(start, end, client_name),
+        ["timestamp", "id"],
+        page,
+        response,
+        model_projection(StatusCheck),
+    )
     for check in status_checks:
-        if isinstance(check.get("timestamp"), str):
-            check["timestamp"] = datetime.fromisoformat(check["timestamp"])
+        check["timestamp"] = assume_utc(check["timestamp"])
+    return fast_response(status_checks, response)
+
+
+@router.get("/series", response_model=list[StatusCheckBucket])
+async def get_status_series(
+    start: datetime | None = Query(None, alias="from"),
+    end: datetime | None = Query(None, alias="to"),
+    client_name: str | None = None,
+    bucket: StatusBucketUnit = StatusBucketUnit.MINUTE,
+    db: AsyncIOMotorDatabase = Depends(get_database),
+):
+    """Count status checks per client and minute or hour in ``[from, to)``.
 
-    return status_checks
+    ``to`` defaults to now and ``from`` to one day before ``to``.
+    """
+    end = assume_utc(end) if end else datetime.now(timezone.utc)
+    start = assume_utc(start) if start else end - timedelta(days=1)
+    if start >= end:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="'from' must be before 'to'",
+        )
+    if (end - start) / BUCKET_WIDTHS[bucket] > MAX_BUCKETS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Range spans more than {MAX_BUCKETS} buckets",
+        )
+    return await downsample(db, start, end, client_name, bucket)
 
 
 @router.post("", response_model=StatusCheck)
@@ -29,7 +84,5 @@ async def create_status_check(
 ):
     """Create a new status check."""
     status_obj = StatusCheck(**input_data.model_dump())
-    doc = status_obj.model_dump()
-    doc["timestamp"] = doc["timestamp"].isoformat()
-    await db.status_checks.insert_one(doc)
+    await db[COLLECTION].insert_one(status_obj.model_dump())
     return status_obj
@@ -0,0 +1,47 @@
+"""Delta sync API routes."""
+
+from datetime import datetime, timezone
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from app.core.database import get_database
+from app.core.deps import conditional_get, get_current_user
+from app.core.pagination import MAX_LIMIT, decode_cursor
+from app.core.timing import TimedRoute
+from app.models.sync import SyncChanges
+from app.models.user import User
+from app.services.sync import MAX_CURSOR_AGE, changes_since
+
+router = APIRouter(prefix="/sync", tags=["sync"], route_class=TimedRoute)
+
+
+@router.get("", response_model=SyncChanges, dependencies=[Depends(conditional_get)])
+async def sync(
+    since: str | None = Query(None, description="Cursor from a previous sync"),
+    limit: int = Query(MAX_LIMIT, ge=1, le=MAX_LIMIT),
+    db: AsyncIOMotorDatabase = Depends(get_database),
+    current_user: User = Depends(get_current_user),
+):
+    """Get habits, completions and deletions changed after ``since``.
+
+    Omit ``since`` for the full current state. Store the returned ``cursor``
+    and pass it as ``since`` on the next sync, straight away while
+    ``has_more`` is set. A cursor older than 30 days is refused with
+    ``410 Gone``; the client must then sync from scratch.
+    """
+    version = None
+    if since:
+        version, issued = decode_cursor(since, 2)
+        if not isinstance(version, int) or not (
+            isinstance(issued, datetime) and issued.tzinfo
+        ):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor"
+            )
+        if datetime.now(timezone.utc) - issued > MAX_CURSOR_AGE:
+            raise HTTPException(
+                status_code=status.HTTP_410_GONE,
+                detail="Sync cursor expired; resync required",
+            )
+    return await changes_since(db, current_user.id, version, limit)
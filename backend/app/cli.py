@@ -0,0 +1,236 @@
+"""Maintenance commands.
+
+Usage: ``python -m app.cli <command> [options]``
+"""
+
+import argparse
+import asyncio
+import logging
+from collections.abc import AsyncIterator
+from datetime import datetime, timezone
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from app.core.config import get_settings
+from app.core.database import (
+    close_database_connection,
+    connect_to_database,
+    get_database,
+)
+from app.core.indexes import INDEXES, ensure_indexes
+from app.services.analytics import habit_streaks
+from app.services.bitmaps import bitmap_from_dates, save_bitmap
+from app.services.categories import rebuild_category_counts
+from app.services.habit_stats import (
+    RECENT_DAYS,
+    compute_stats,
+    rebuild_habit_stats,
+    stats_differ,
+)
+from app.services.rollups import rebuild_rollups
+from app.services.status_checks import (
+    COLLECTION,
+    ensure_status_collection,
+    migrate_status_checks,
+)
+
+logger = logging.getLogger(__name__)
+
+
+async def iter_user_habits(
+    db: AsyncIOMotorDatabase, user_id: str | None
+) -> AsyncIterator[tuple[str, list[str]]]:
+    """Yield ``(user_id, habit_ids)`` for every user (or just one)."""
+    query = {"user_id": user_id} if user_id else {}
+    pipeline: list[dict] = [
+        {"$match": query},
+        {"$group": {"_id": "$user_id", "habit_ids": {"$push": "$id"}}},
+    ]
+    async for row in db.habits.aggregate(pipeline, allowDiskUse=True):
+        yield row["_id"], row["habit_ids"]
+
+
+async def rebuild_stats_command(args: argparse.Namespace) -> int:
+    """Recompute ``habit_stats`` from ``completions``, or verify it with --verify."""
+    db = get_database()
+    today = datetime.now(timezone.utc).date()
+    habits = mismatched = 0
+
+    async for user_id, habit_ids in iter_user_habits(db, args.user):
+        habits += len(habit_ids)
+        if not args.verify:
+            await rebuild_habit_stats(db, user_id, habit_ids, today)
+            continue
+
+        rows = await habit_streaks(db, user_id, habit_ids, today, RECENT_DAYS)
+        stored = {
+            doc["habit_id"]: doc
+            async for doc in db.habit_stats.find({"user_id": user_id}, {"_id": 0})
+        }
+        for habit_id in habit_ids:
+            doc = stored.get(habit_id)
+            if doc is not None and doc.get("dirty"):
+                continue  # Already scheduled for a rebuild on read.
+            differing = stats_differ(
+                doc, compute_stats(rows.get(habit_id), today), today
+            )
+            if differing:
+                mismatched += 1
+                logger.warning(
+                    "habit %s (user %s): stale %s",
+                    habit_id,
+                    user_id,
+                    ", ".join(differing),
+                )
+
+    action = "Verified" if args.verify else "Rebuilt"
+    logger.info("%s stats for %d habits, %d mismatched", action, habits, mismatched)
+    return 1 if mismatched else 0
+
+
+async def rebuild_bitmaps_command(args: argparse.Namespace) -> int:
+    """Rebuild ``completion_bitmaps`` from ``completions``."""
+    db = get_database()
+    written = 0
+
+    async for user_id, habit_ids in iter_user_habits(db, args.user):
+        await db.completion_bitmaps.delete_many({"user_id": user_id})
+        pipeline = [
+            {
+                "$match": {
+                    "user_id": user_id,
+                    "habit_id": {"$in": habit_ids},
+                    "completed": True,
+                }
+            },
+            {
+                "$group": {
+                    "_id": {
+                        "habit_id": "$habit_id",
+                        "year": {"$substr": ["$date", 0, 4]},
+                    },
+                    "dates": {"$push": "$date"},
+                }
+            },
+        ]
+        async for row in db.completions.aggregate(pipeline):
+            year = int(row["_id"]["year"])
+            bits = bitmap_from_dates(row["dates"], year)
+            await save_bitmap(db, user_id, row["_id"]["habit_id"], year, bits)
+            written += 1
+
+    logger.info("Rebuilt %d completion bitmaps", written)
+    return 0
+
+
+async def rebuild_rollups_command(args: argparse.Namespace) -> int:
+    """Backfill ``daily_rollups`` from ``habits`` and ``completions``."""
+    db = get_database()
+    query = {"id": args.user} if args.user else {}
+    users = written = 0
+
+    async for user in db.users.find(query, {"_id": 0, "id": 1}):
+        written += await rebuild_rollups(db, user["id"])
+        users += 1
+
+    logger.info("Rebuilt %d daily rollups for %d users", written, users)
+    return 0
+
+
+async def rebuild_categories_command(args: argparse.Namespace) -> int:
+    """Backfill category documents and habit counts from ``habits``."""
+    db = get_database()
+    query = {"id": args.user} if args.user else {}
+    users = written = 0
+
+    async for user in db.users.find(query, {"_id": 0, "id": 1}):
+        written += await rebuild_category_counts(db, user["id"])
+        users += 1
+
+    logger.info("Recounted %d categories for %d users", written, users)
+    return 0
+
+
+async def migrate_status_command(args: argparse.Namespace) -> int:
+    """Convert ``status_checks`` into a time-series collection."""
+    db = get_database()
+    copied = await migrate_status_checks(db, get_settings(), args.batch_size)
+    await ensure_indexes(
+        db, [spec for spec in INDEXES if spec.collection == COLLECTION]
+    )
+    logger.info("Copied %d status checks into the time-series collection", copied)
+    return 0
+
+
+COMMANDS = {
+    "rebuild-habit-stats": rebuild_stats_command,
+    "rebuild-completion-bitmaps": rebuild_bitmaps_command,
+    "rebuild-daily-rollups": rebuild_rollups_command,
+    "rebuild-category-counts": rebuild_categories_command,
+    "migrate-status-checks": migrate_status_command,
+}
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Build the command-line parser."""
+    parser = argparse.ArgumentParser(prog="python -m app.cli")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+
+    rebuild = subcommands.add_parser(
+        "rebuild-habit-stats", help="Recompute or verify materialized habit stats"
+    )
+    rebuild.add_argument("--user", help="Only process this user id")
+    rebuild.add_argument(
+        "--verify",
+        action="store_true",
+        help="Compare stored stats against a fresh computation without writing",
+    )
+
+    bitmaps = subcommands.add_parser(
+        "rebuild-completion-bitmaps", help="Rebuild completion bitmaps"
+    )
+    bitmaps.add_argument("--user", help="Only process this user id")
+
+    rollups = subcommands.add_parser(
+        "rebuild-daily-rollups", help="Backfill per-user daily rollups"
+    )
+    rollups.add_argument("--user", help="Only process this user id")
+
+    categories = subcommands.add_parser(
+        "rebuild-category-counts", help="Backfill categories and their habit counts"
+    )
+    categories.add_argument("--user", help="Only process this user id")
+
+    status_checks = subcommands.add_parser(
+        "migrate-status-checks",
+        help="Move status checks into a time-series collection with retention",
+    )
+    status_checks.add_argument(
+        "--batch-size", type=int, default=1000, help="Checks copied per insert"
+    )
+
+    return parser
+
+
+async def run(args: argparse.Namespace) -> int:
+    """Connect to the database and run the selected command."""
+    await connect_to_database()
+    try:
+        await ensure_status_collection(get_database(), get_settings())
+        await ensure_indexes(get_database())
+        return await COMMANDS[args.command](args)
+    finally:
+        await close_database_connection()
+
+
+def main() -> None:
+    """Entry point for ``python -m app.cli``."""
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    )
+    raise SystemExit(asyncio.run(run(build_parser().parse_args())))
+
+
+if __name__ == "__main__":
+    main()
@@ -17,6 +17,20 @@ class Settings(BaseSettings):
     mongo_url: str
     db_name: str
 
+    # MongoDB client (unset values keep the driver defaults)
+    mongo_max_pool_size: int = 100
+    mongo_min_pool_size: int = 0
+    mongo_max_idle_time_ms: int | None = None
+    mongo_wait_queue_timeout_ms: int | None = None
+    mongo_connect_timeout_ms: int | None = None
+    mongo_server_selection_timeout_ms: int | None = None
+    mongo_socket_timeout_ms: int | None = None
+    mongo_compressors: str = ""  # e.g. "zstd,snappy,zlib"
+    mongo_read_preference: str = "primary"
+    mongo_write_concern: str | None = None  # "majority" or a node count
+    mongo_journal: bool | None = None
+    ready_timeout_seconds: float = 2.0
+
     # CORS
     cors_origins: str = "*"
 
@@ -26,6 +40,48 @@ class Settings(BaseSettings):
     access_token_expire_minutes: int = 30
     refresh_token_expire_days: int = 7
 
+    # Password hashing
+    bcrypt_rounds: int = 12
+    password_hash_workers: int = 4
+    password_hash_max_pending: int = 32
+    password_hash_queue_timeout_seconds: float = 5.0
+
+    # Authenticated-principal cache (0 disables). Invalidation is per process,
+    # so a deleted account stays authenticated on other workers for up to the
+    # TTL; it is capped at the access-token lifetime.
+    auth_cache_ttl_seconds: int = 60
+    auth_cache_max_entries: int = 10_000
+
+    # Completion storage
+    completion_bitmaps_enabled: bool = True
+
+    # Render list responses without response_model re-validation
+    fast_responses: bool = False
+
+    # Habit reminders (reminder times are UTC)
+    reminders_enabled: bool = True
+    reminder_sink: str = "log"  # "log" or "webhook"
+    reminder_webhook_url: str | None = None
+    reminder_batch_size: int = 1000
+    reminder_lease_seconds: int = 60
+    reminder_catchup_minutes: int = 5
+
+    # Background jobs (cascade deletes, account deletion, rollup rebuilds)
+    jobs_enabled: bool = True
+    job_workers: int = 2
+    job_poll_interval_seconds: float = 1.0
+    job_lease_seconds: int = 60
+    job_max_attempts: int = 3
+    job_chunk_size: int = 1000
+
+    # Status checks are kept this many days (0 keeps them forever)
+    status_retention_days: int = 30
+
+    # Request timing: Server-Timing header and slow-query log (0 disables)
+    server_timing_enabled: bool = True
+    slow_query_ms: int = 100
+    slow_query_explain: bool = True
+
     @property
     def cors_origins_list(self) -> list[str]:
         """Parse CORS origins from comma-separated string."""
@@ -39,4 +95,4 @@ class Settings(BaseSettings):
 @lru_cache
 def get_settings() -> Settings:
     """Get cached settings instance."""
-    return Settings()
+    return Settings()  # type: ignore[call-arg]  # Required values come from the env.
@@ -1,8 +1,91 @@
 """Database connection and lifecycle management."""
 
+import threading
+from collections import Counter
+
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from pymongo import monitoring
+
+from app.core.config import Settings, get_settings
+from app.core.metrics import command_metrics
+from app.core.timing import command_timings
+
+
+class PoolStats(monitoring.ConnectionPoolListener):
+    """Live connection pool counters gathered from pymongo pool events.
+
+    Events fire on the driver's worker threads, so updates take a lock.
+    """
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.counters: Counter[str] = Counter()
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def _add(self, **deltas: int) -> None:
+        with self.lock:
+            self.counters.update(deltas)
+
+    def pool_created(self, event: monitoring.PoolCreatedEvent) -> None:
+        pass
+
+    def pool_ready(self, event: monitoring.PoolReadyEvent) -> None:
+        pass
+
+    def pool_cleared(self, event: monitoring.PoolClearedEvent) -> None:
+        self._add(cleared=1)
 
-from app.core.config import get_settings
+    def pool_closed(self, event: monitoring.PoolClosedEvent) -> None:
+        pass
+
+    def connection_created(self, event: monitoring.ConnectionCreatedEvent) -> None:
+        self._add(open=1)
+
+    def connection_ready(self, event: monitoring.ConnectionReadyEvent) -> None:
+        pass
+
+    def connection_closed(self, event: monitoring.ConnectionClosedEvent) -> None:
+        self._add(open=-1)
+
+    def connection_check_out_started(
+        self, event: monitoring.ConnectionCheckOutStartedEvent
+    ) -> None:
+        self._add(waiting=1)
+
+    def connection_check_out_failed(
+        self, event: monitoring.ConnectionCheckOutFailedEvent
+    ) -> None:
+        self._add(waiting=-1, check_out_failures=1)
+
+    def connection_checked_out(
+        self, event: monitoring.ConnectionCheckedOutEvent
+    ) -> None:
+        with self.lock:
+            self.counters.update(waiting=-1, checked_out=1, check_outs=1)
+            wait = event.duration or 0.0
+            self.wait_seconds += wait
+            self.max_wait_seconds = max(self.max_wait_seconds, wait)
+
+    def connection_checked_in(self, event: monitoring.ConnectionCheckedInEvent) -> None:
+        self._add(checked_out=-1)
+
+    def snapshot(self) -> dict:
+        """Current counters plus average and worst check-out wait."""
+        with self.lock:
+            counters = dict(self.counters)
+            wait, max_wait = self.wait_seconds, self.max_wait_seconds
+        check_outs = counters.get("check_outs", 0)
+        return {
+            "open": counters.get("open", 0),
+            "checked_out": counters.get("checked_out", 0),
+            "waiting": counters.get("waiting", 0),
+            "check_outs": check_outs,
+            "check_out_failures": counters.get("check_out_failures", 0),
+            "cleared": counters.get("cleared", 0),
+            "avg_wait_ms": round(wait / check_outs * 1000, 3) if check_outs else 0.0,
+            "max_wait_ms": round(max_wait * 1000, 3),
+        }
 
 
 class Database:
@@ -13,17 +96,45 @@ class Database:
 
 
 db_instance = Database()
+pool_stats = PoolStats()
+
+
+def client_options(settings: Settings) -> dict:
+    """Keyword arguments for ``AsyncIOMotorClient`` from settings."""
+    options = {
+        "maxPoolSize": settings.mongo_max_pool_size,
+        "minPoolSize": settings.mongo_min_pool_size,
+        "maxIdleTimeMS": settings.mongo_max_idle_time_ms,
+        "waitQueueTimeoutMS": settings.mongo_wait_queue_timeout_ms,
+        "connectTimeoutMS": settings.mongo_connect_timeout_ms,
+        "serverSelectionTimeoutMS": settings.mongo_server_selection_timeout_ms,
+        "socketTimeoutMS": settings.mongo_socket_timeout_ms,
+        "readPreference": settings.mongo_read_preference,
+        "journal": settings.mongo_journal,
+    }
+    if settings.mongo_compressors:
+        options["compressors"] = settings.mongo_compressors
+    if settings.mongo_write_concern:
+        w = settings.mongo_write_concern
+        options["w"] = int(w) if w.isdigit() else w
+    return {key: value for key, value in options.items() if value is not None}
 
 
 async def connect_to_database() -> None:
     """Initialize database connection."""
     settings = get_settings()
-    db_instance.client = AsyncIOMotorClient(settings.mongo_url)
+    db_instance.client = AsyncIOMotorClient(
+        settings.mongo_url,
+        event_listeners=[pool_stats, command_metrics, command_timings],
+        **client_options(settings),
+    )
     db_instance.db = db_instance.client[settings.db_name]
+    command_timings.client = db_instance.client.delegate
 
 
 async def close_database_connection() -> None:
     """Close database connection."""
+    command_timings.client = None
     if db_instance.client:
         db_instance.client.close()
 
@@ -1,21 +1,57 @@
 """Dependency injection utilities."""
 
-from fastapi import Depends, HTTPException, status
+import time
+from datetime import datetime, timezone
+
+from fastapi import Depends, HTTPException, Request, Response, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from motor.motor_asyncio import AsyncIOMotorDatabase
 
+from app.core.cache import TTLCache
+from app.core.config import get_settings
 from app.core.database import get_database
 from app.core.security import decode_access_token
+from app.core.timing import span
 from app.models.user import User
+from app.services.data_version import etag_matches, get_data_version, make_etag
 
 security = HTTPBearer(auto_error=False)
 
+# Resolved principals keyed by access token, so the hot path skips both JWT
+# decoding and the user lookup. Entries never outlive the token's expiry, and
+# the TTL is capped at the access-token lifetime: ``invalidate_user`` only
+# reaches this process, so other workers keep accepting a deleted account's
+# tokens for up to ``auth_cache_ttl_seconds``.
+principal_cache = TTLCache(
+    maxsize=get_settings().auth_cache_max_entries,
+    ttl=min(
+        get_settings().auth_cache_ttl_seconds,
+        get_settings().access_token_expire_minutes * 60,
+    ),
+)
+
+
+def invalidate_user(user_id: str) -> None:
+    """Drop this process's cached principals for a user whose record changed.
+
+    Other workers drop theirs when the cache TTL runs out.
+    """
+    principal_cache.discard_where(lambda user: user.id == user_id)
+
 
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials | None = Depends(security),
     db: AsyncIOMotorDatabase = Depends(get_database),
 ) -> User:
     """Get current authenticated user from JWT token."""
+    with span("auth"):
+        return await authenticate(credentials, db)
+
+
+async def authenticate(
+    credentials: HTTPAuthorizationCredentials | None, db: AsyncIOMotorDatabase
+) -> User:
+    """Resolve bearer credentials to a user, raising 401 if they are invalid."""
     if not credentials:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -23,7 +59,12 @@ async def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    payload = decode_access_token(credentials.credentials)
+    token = credentials.credentials
+    cached: User | None = principal_cache.get(token)
+    if cached is not None:
+        return cached
+
+    payload = decode_access_token(token)
     if not payload:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -45,7 +86,10 @@ async def get_current_user(
             detail="User not found",
         )
 
-    return User(**user)
+    principal = User(**user)
+    if "exp" in payload:
+        principal_cache.set(token, principal, ttl=payload["exp"] - time.time())
+    return principal
 
 
 async def get_optional_user(
@@ -60,3 +104,30 @@ async def get_optional_user(
         return await get_current_user(credentials, db)
     except HTTPException:
         return None
+
+
+async def conditional_get(
+    request: Request,
+    response: Response,
+    current_user: User = Depends(get_current_user),
+    db: AsyncIOMotorDatabase = Depends(get_database),
+) -> str:
+    """Set an ``ETag`` from the user's data version and honour ``If-None-Match``.
+
+    Runs before the route body, so a matching request is answered with
+    ``304 Not Modified`` without querying habits or completions. The UTC date
+    is part of the tag because derived fields such as streaks change daily.
+    """
+    version = await get_data_version(db, current_user.id)
+    etag = make_etag(
+        current_user.id,
+        version,
+        request.url.path,
+        str(request.query_params),
+        datetime.now(timezone.utc).date().isoformat(),
+    )
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+    return etag
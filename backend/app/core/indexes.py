@@ -0,0 +1,144 @@
+"""Declarative MongoDB index registry.
+
+Every index the application relies on is declared in ``INDEXES`` and applied
+at startup by ``ensure_indexes``. Creating an index that already exists with
+the same definition is a no-op, so applying the registry is idempotent; an
+index whose definition changed is dropped and rebuilt.
+"""
+
+import logging
+from dataclasses import dataclass, field
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ASCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger(__name__)
+
+# Server error codes raised when an index exists with a different definition.
+INDEX_OPTIONS_CONFLICT = 85
+INDEX_KEY_SPECS_CONFLICT = 86
+
+
+@dataclass(frozen=True)
+class IndexSpec:
+    """A single index declaration."""
+
+    collection: str
+    keys: tuple[tuple[str, int], ...]
+    unique: bool = False
+    expire_after_seconds: int | None = None
+    options: dict = field(default_factory=dict)
+
+    @property
+    def name(self) -> str:
+        """Index name, derived from the key pattern like the server does."""
+        return "_".join(f"{key}_{direction}" for key, direction in self.keys)
+
+    def to_model(self) -> IndexModel:
+        """Build the pymongo ``IndexModel`` for this declaration."""
+        kwargs = dict(self.options)
+        if self.unique:
+            kwargs["unique"] = True
+        if self.expire_after_seconds is not None:
+            kwargs["expireAfterSeconds"] = self.expire_after_seconds
+        return IndexModel(list(self.keys), name=self.name, **kwargs)
+
+
+INDEXES: list[IndexSpec] = [
+    # Users are looked up by email on login and by id on every request.
+    IndexSpec("users", (("email", ASCENDING),), unique=True),
+    IndexSpec("users", (("id", ASCENDING),), unique=True),
+    # Habit queries are always scoped to one user.
+    IndexSpec("habits", (("id", ASCENDING),), unique=True),
+    IndexSpec(
+        "habits",
+        (("user_id", ASCENDING), ("created_at", ASCENDING), ("id", ASCENDING)),
+    ),
+    IndexSpec("habits", (("user_id", ASCENDING), ("id", ASCENDING))),
+    # The reminder scheduler streams one minute's enabled reminders by id.
+    IndexSpec(
+        "habits",
+        (
+            ("reminder_enabled", ASCENDING),
+            ("reminder_time", ASCENDING),
+            ("id", ASCENDING),
+        ),
+    ),
+    # Delta syncs read one user's changes after a data version.
+    IndexSpec("habits", (("user_id", ASCENDING), ("sync_version", ASCENDING))),
+    IndexSpec("completions", (("user_id", ASCENDING), ("sync_version", ASCENDING))),
+    IndexSpec("tombstones", (("user_id", ASCENDING), ("sync_version", ASCENDING))),
+    # Tombstones outlive the 30-day sync cursor (``MAX_CURSOR_AGE`` in
+    # ``app.services.sync``) by a day.
+    IndexSpec(
+        "tombstones", (("deleted_at", ASCENDING),), expire_after_seconds=31 * 86_400
+    ),
+    # At most one completion record per habit and date.
+    IndexSpec(
+        "completions",
+        (("user_id", ASCENDING), ("habit_id", ASCENDING), ("date", ASCENDING)),
+        unique=True,
+    ),
+    # Per-day analytics scan one user's completions by date.
+    IndexSpec("completions", (("user_id", ASCENDING), ("date", ASCENDING))),
+    # Categories are listed by name and hold their active habit count.
+    IndexSpec("categories", (("user_id", ASCENDING), ("name", ASCENDING)), unique=True),
+    IndexSpec("categories", (("user_id", ASCENDING), ("id", ASCENDING))),
+    IndexSpec(
+        "habit_stats", (("user_id", ASCENDING), ("habit_id", ASCENDING)), unique=True
+    ),
+    IndexSpec(
+        "daily_rollups", (("user_id", ASCENDING), ("date", ASCENDING)), unique=True
+    ),
+    IndexSpec(
+        "completion_bitmaps",
+        (("user_id", ASCENDING), ("habit_id", ASCENDING), ("year", ASCENDING)),
+        unique=True,
+    ),
+    # Refresh tokens are found by digest, revoked per family, deleted with
+    # their account and expire by TTL.
+    IndexSpec("refresh_tokens", (("token_hash", ASCENDING),), unique=True),
+    IndexSpec("refresh_tokens", (("family_id", ASCENDING),)),
+    IndexSpec("refresh_tokens", (("user_id", ASCENDING),)),
+    IndexSpec("refresh_tokens", (("expires_at", ASCENDING),), expire_after_seconds=0),
+    # Per-minute reminder leases are only needed while their slot is current.
+    IndexSpec(
+        "reminder_slots", (("created_at", ASCENDING),), expire_after_seconds=86_400
+    ),
+    # Workers claim due queued jobs and jobs with expired leases; finished
+    # jobs are kept for a week so their owners can still read the outcome.
+    IndexSpec("jobs", (("id", ASCENDING),), unique=True),
+    IndexSpec("jobs", (("status", ASCENDING), ("run_after", ASCENDING))),
+    IndexSpec("jobs", (("status", ASCENDING), ("lease_until", ASCENDING))),
+    IndexSpec("jobs", (("finished_at", ASCENDING),), expire_after_seconds=604_800),
+    # Status checks are paged by time and read in ranges per client.
+    IndexSpec("status_checks", (("timestamp", ASCENDING), ("id", ASCENDING))),
+    IndexSpec("status_checks", (("client_name", ASCENDING), ("timestamp", ASCENDING))),
+]
+
+
+async def ensure_indexes(
+    db: AsyncIOMotorDatabase, indexes: list[IndexSpec] | None = None
+) -> None:
+    """Create every registered index, rebuilding ones whose definition changed."""
+    for spec in INDEXES if indexes is None else indexes:
+        collection = db[spec.collection]
+        try:
+            await collection.create_indexes([spec.to_model()])
+        except OperationFailure as exc:
+            if exc.code not in (INDEX_OPTIONS_CONFLICT, INDEX_KEY_SPECS_CONFLICT):
+                raise
+            logger.warning(
+                "Rebuilding index %s.%s: %s", spec.collection, spec.name, exc
+            )
+            await _drop_conflicting(db, spec)
+            await collection.create_indexes([spec.to_model()])
+
+
+async def _drop_conflicting(db: AsyncIOMotorDatabase, spec: IndexSpec) -> None:
+    """Drop any existing index sharing the spec's name or key pattern."""
+    keys = dict(spec.keys)
+    async for index in db[spec.collection].list_indexes():
+        if index["name"] == spec.name or dict(index["key"]) == keys:
+            await db[spec.collection].drop_index(index["name"])
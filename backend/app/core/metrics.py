@@ -0,0 +1,230 @@
+"""In-process metrics exposed in Prometheus text format.
+
+Request latencies are recorded by ``MetricsMiddleware`` under the matched
+route template (``/api/habits/{habit_id}``, never the raw path), and MongoDB
+command durations by the ``CommandMetrics`` listener per collection and
+command. Histograms use fixed buckets, so an observation is a bisect and
+two additions; series are keyed by small tuples created on first use.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from collections.abc import Sequence
+
+from pymongo import monitoring
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Upper bounds in seconds; +Inf is implicit.
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COMMAND_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1.0)
+
+
+class Histogram:
+    """Cumulative-on-render histogram over fixed bucket bounds."""
+
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def render(self, name: str, labels: str) -> list[str]:
+        lines = []
+        total = 0
+        for bound, count in zip((*self.bounds, "+Inf"), self.counts):
+            total += count
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {total}')
+        lines.append(f"{name}_sum{{{labels}}} {self.sum}")
+        lines.append(f"{name}_count{{{labels}}} {self.count}")
+        return lines
+
+
+def escape(value: str) -> str:
+    """Escape a Prometheus label value."""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Metrics:
+    """Request and MongoDB command series for this process.
+
+    Command events arrive on driver threads, so every update takes the lock.
+    """
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.requests: dict[tuple[str, str, int], int] = defaultdict(int)
+        self.request_latency: dict[tuple[str, str], Histogram] = {}
+        self.commands: dict[tuple[str, str], Histogram] = {}
+        self.command_failures: dict[tuple[str, str], int] = defaultdict(int)
+
+    def observe_request(
+        self, method: str, route: str, status: int, seconds: float
+    ) -> None:
+        key = (method, route)
+        with self.lock:
+            self.requests[(method, route, status)] += 1
+            histogram = self.request_latency.get(key)
+            if histogram is None:
+                histogram = self.request_latency[key] = Histogram(REQUEST_BUCKETS)
+            histogram.observe(seconds)
+
+    def observe_command(
+        self, collection: str, command: str, seconds: float, failed: bool
+    ) -> None:
+        key = (collection, command)
+        with self.lock:
+            histogram = self.commands.get(key)
+            if histogram is None:
+                histogram = self.commands[key] = Histogram(COMMAND_BUCKETS)
+            histogram.observe(seconds)
+            if failed:
+                self.command_failures[key] += 1
+
+    def render(self, extra: Sequence[str] = ()) -> str:
+        """All series in Prometheus text exposition format."""
+        lines = [
+            "# HELP http_requests_total HTTP requests by route and status.",
+            "# TYPE http_requests_total counter",
+        ]
+        with self.lock:
+            for (method, route, status), count in sorted(self.requests.items()):
+                lines.append(
+                    f'http_requests_total{{method="{method}",'
+                    f'route="{escape(route)}",status="{status}"}} {count}'
+                )
+            lines += [
+                "# HELP http_request_duration_seconds HTTP request latency.",
+                "# TYPE http_request_duration_seconds histogram",
+            ]
+            for (method, route), histogram in sorted(self.request_latency.items()):
+                lines += histogram.render(
+                    "http_request_duration_seconds",
+                    f'method="{method}",route="{escape(route)}"',
+                )
+            lines += [
+                "# HELP mongodb_command_duration_seconds MongoDB command latency.",
+                "# TYPE mongodb_command_duration_seconds histogram",
+            ]
+            for (collection, command), histogram in sorted(self.commands.items()):
+                lines += histogram.render(
+                    "mongodb_command_duration_seconds",
+                    f'collection="{escape(collection)}",command="{command}"',
+                )
+            lines += [
+                "# HELP mongodb_command_failures_total Failed MongoDB commands.",
+                "# TYPE mongodb_command_failures_total counter",
+            ]
+            for (collection, command), count in sorted(self.command_failures.items()):
+                lines.append(
+                    f'mongodb_command_failures_total{{collection="{escape(collection)}"'
+                    f',command="{command}"}} {count}'
+                )
+        lines += extra
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+
+
+class CommandMetrics(monitoring.CommandListener):
+    """Records MongoDB command durations per collection and command."""
+
+    def __init__(self, registry: Metrics = metrics) -> None:
+        self.registry = registry
+        # Started commands by (connection, request id) -> (collection, command).
+        self.pending: dict[tuple, tuple[str, str]] = {}
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        target = event.command.get(event.command_name)
+        if not isinstance(target, str):
+            # getMore names its collection separately; admin commands have none.
+            target = event.command.get("collection", "")
+        key = (event.connection_id, event.request_id)
+        self.pending[key] = (target, event.command_name)
+
+    def _finish(
+        self,
+        event: monitoring.CommandSucceededEvent | monitoring.CommandFailedEvent,
+        failed: bool,
+    ) -> None:
+        labels = self.pending.pop((event.connection_id, event.request_id), None)
+        if labels is not None:
+            self.registry.observe_command(
+                *labels, event.duration_micros / 1_000_000, failed
+            )
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        self._finish(event, failed=False)
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        self._finish(event, failed=True)
+
+
+command_metrics = CommandMetrics()
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing each HTTP request under its route template."""
+
+    def __init__(self, app: ASGIApp, registry: Metrics = metrics) -> None:
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            self.registry.observe_request(
+                scope["method"],
+                route_template(scope),
+                status,
+                time.perf_counter() - started,
+            )
+
+
+def route_template(scope: Scope) -> str:
+    """Path template of the route that handled ``scope``.
+
+    The router stores the matched route in the (shared) scope. Depending on
+    the FastAPI version its ``path`` may omit the prefixes of the routers it
+    was included through; those are taken from the request path, since every
+    path parameter here matches exactly one segment.
+    """
+    template: str | None = getattr(scope.get("route"), "path", None)
+    if template is None:
+        return "unmatched"
+    path = scope["path"]
+    missing = path.count("/") - template.count("/")
+    if missing > 0:
+        template = "/".join(path.split("/")[: missing + 1]) + template
+    return template
+
+
+def gauge_lines(name: str, help: str, values: dict[str, int | float]) -> list[str]:
+    """Render a labelled gauge family, one series per ``values`` entry."""
+    lines = [f"# HELP {name} {help}", f"# TYPE {name} gauge"]
+    for label, value in values.items():
+        lines.append(f'{name}{{kind="{label}"}} {value}')
+    return lines
@@ -0,0 +1,108 @@
+"""Keyset (cursor) pagination helpers.
+
+List endpoints sort on a unique compound key and return the key of the last
+item as an opaque cursor in the ``X-Next-Cursor`` response header. The next
+page is fetched with ``after=<cursor>``, which becomes an indexed range
+predicate instead of a ``skip``, so every page costs O(limit).
+"""
+
+import base64
+import json
+from datetime import datetime
+from typing import Any
+
+from fastapi import HTTPException, Query, Response, status
+from motor.motor_asyncio import AsyncIOMotorCollection
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+
+
+class PageParams:
+    """``limit``/``after`` query parameters shared by paginated routes."""
+
+    def __init__(
+        self,
+        limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+        after: str | None = Query(None, description="Cursor from X-Next-Cursor"),
+    ):
+        self.limit = limit
+        self.after = after
+
+
+def _encode_value(value: Any) -> dict[str, str]:
+    """Tag datetimes so they decode back to datetimes, not strings."""
+    if isinstance(value, datetime):
+        return {"$date": value.isoformat()}
+    raise TypeError(f"Cannot encode {type(value).__name__} in a cursor")
+
+
+def _decode_value(obj: dict) -> Any:
+    if obj.keys() == {"$date"} and isinstance(obj["$date"], str):
+        return datetime.fromisoformat(obj["$date"])
+    return obj
+
+
+def encode_cursor(values: list) -> str:
+    """Encode sort-key values as an opaque cursor."""
+    raw = json.dumps(values, separators=(",", ":"), default=_encode_value).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> list:
+    """Decode a cursor holding ``size`` sort-key values."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded), object_hook=_decode_value)
+    except (ValueError, TypeError):
+        values = None
+    if not isinstance(values, list) or len(values) != size:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor"
+        )
+    return values
+
+
+def after_filter(fields: list[str], values: list) -> dict:
+    """Range predicate selecting documents sorted after ``values``.
+
+    For ascending keys ``(a, b)`` this is ``a >= va AND (a > va OR b > vb)``:
+    the leading bound narrows the index scan and the ``$or`` only skips the
+    entries tied on ``a``.
+    """
+    if len(fields) == 1:
+        return {fields[0]: {"$gt": values[0]}}
+    clauses = []
+    for position, field in enumerate(fields):
+        clause = {fields[i]: values[i] for i in range(1, position)}
+        clause[field] = {"$gt": values[position]}
+        clauses.append(clause)
+    return {fields[0]: {"$gte": values[0]}, "$or": clauses}
+
+
+async def fetch_page(
+    collection: AsyncIOMotorCollection,
+    query: dict,
+    fields: list[str],
+    page: PageParams,
+    response: Response,
+    projection: dict | None = None,
+) -> list[dict]:
+    """Fetch one page sorted ascending on ``fields``.
+
+    Sets the ``X-Next-Cursor`` header when more documents follow.
+    """
+    if page.after:
+        values = decode_cursor(page.after, len(fields))
+        query = {**query, **after_filter(fields, values)}
+    cursor = collection.find(query, projection or {"_id": 0}).sort(
+        [(field, 1) for field in fields]
+    )
+    docs: list[dict] = await cursor.limit(page.limit + 1).to_list(page.limit + 1)
+    if len(docs) > page.limit:
+        docs = docs[: page.limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(
+            [docs[-1][field] for field in fields]
+        )
+    return docs
@@ -1,46 +1,140 @@
 """Security utilities for authentication."""
 
+import asyncio
+import hashlib
+import secrets
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
+from typing import Any, cast
 
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 
 from app.core.config import get_settings
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=get_settings().bcrypt_rounds,
+    # Hashes below the configured cost are upgraded on the next login.
+    bcrypt__min_rounds=get_settings().bcrypt_rounds,
+)
 
 ALGORITHM = "HS256"
 
 
+class PasswordHasherBusy(Exception):
+    """Raised when the password hashing queue is saturated."""
+
+
+class PasswordHasher:
+    """Runs bcrypt on a dedicated thread pool behind an admission queue.
+
+    At most ``workers`` hashes run at once; up to ``max_pending`` callers wait
+    for a slot, each for at most ``queue_timeout`` seconds. Anything beyond
+    that is rejected with ``PasswordHasherBusy`` instead of piling up, so a
+    login burst cannot stall the event loop or grow latency without bound.
+    """
+
+    def __init__(self, workers: int, max_pending: int, queue_timeout: float):
+        self.max_pending = max_pending
+        self.queue_timeout = queue_timeout
+        self.waiting = 0
+        self._slots = asyncio.Semaphore(workers)
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="password-hash"
+        )
+
+    async def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        """Run ``func(*args)`` on the hashing pool."""
+        if self._slots.locked() and self.waiting >= self.max_pending:
+            raise PasswordHasherBusy()
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+        except TimeoutError:
+            raise PasswordHasherBusy() from None
+        finally:
+            self.waiting -= 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, func, *args)
+        finally:
+            self._slots.release()
+
+    def shutdown(self) -> None:
+        """Stop the worker threads."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+password_hasher = PasswordHasher(
+    workers=get_settings().password_hash_workers,
+    max_pending=get_settings().password_hash_max_pending,
+    queue_timeout=get_settings().password_hash_queue_timeout_seconds,
+)
+
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against its hash."""
-    return pwd_context.verify(plain_password, hashed_password)
+    return cast(bool, pwd_context.verify(plain_password, hashed_password))
 
 
 def get_password_hash(password: str) -> str:
     """Hash a password."""
-    return pwd_context.hash(password)
+    return cast(str, pwd_context.hash(password))
+
+
+async def hash_password_async(password: str) -> str:
+    """Hash a password off the event loop."""
+    return cast(str, await password_hasher.run(pwd_context.hash, password))
+
+
+async def verify_password_async(
+    plain_password: str, hashed_password: str
+) -> tuple[bool, str | None]:
+    """Verify a password off the event loop.
+
+    Returns ``(valid, new_hash)`` where ``new_hash`` is set when the stored
+    hash uses an outdated cost and should be replaced.
+    """
+    result = await password_hasher.run(
+        pwd_context.verify_and_update, plain_password, hashed_password
+    )
+    return cast(tuple[bool, str | None], result)
 
 
 def create_access_token(data: dict, expires_delta: timedelta | None = None) -> str:
     """Create a JWT access token."""
     settings = get_settings()
     to_encode = data.copy()
-    
+
     if expires_delta:
         expire = datetime.now(timezone.utc) + expires_delta
     else:
-        expire = datetime.now(timezone.utc) + timedelta(days=7)
-    
+        expire = datetime.now(timezone.utc) + timedelta(
+            minutes=settings.access_token_expire_minutes
+        )
+
     to_encode.update({"exp": expire})
-    return jwt.encode(to_encode, settings.secret_key, algorithm=ALGORITHM)
+    return cast(str, jwt.encode(to_encode, settings.secret_key, algorithm=ALGORITHM))
+
+
+def generate_refresh_token() -> str:
+    """Create an opaque, URL-safe refresh token."""
+    return secrets.token_urlsafe(32)
+
+
+def hash_refresh_token(token: str) -> str:
+    """Digest under which a refresh token is stored."""
+    return hashlib.sha256(token.encode()).hexdigest()
 
 
 def decode_access_token(token: str) -> dict | None:
     """Decode and validate a JWT token."""
     settings = get_settings()
     try:
-        payload = jwt.decode(token, settings.secret_key, algorithms=[ALGORITHM])
+        payload: dict = jwt.decode(token, settings.secret_key, algorithms=[ALGORITHM])
         return payload
     except JWTError:
         return None
@@ -0,0 +1,76 @@
+"""Fast JSON rendering for list endpoints.
+
+Documents are validated by their Pydantic models when they are written, so
+re-validating every stored dict against ``response_model`` on each read is
+redundant work that grows with the page size. With ``fast_responses``
+enabled, list routes project documents down to their model's fields and
+encode them straight to bytes (with orjson when it is installed), skipping
+FastAPI's validate-then-serialize pass. Stored values are emitted as they
+are, e.g. ISO timestamps keep the ``+00:00`` suffix they were saved with.
+"""
+
+import json
+from datetime import date, datetime
+from typing import Any
+
+from fastapi import Response
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+from app.core.config import get_settings
+
+try:
+    import orjson
+
+    HAS_ORJSON = True
+except ImportError:  # pragma: no cover - optional dependency
+    HAS_ORJSON = False
+
+# Headers the rendered response computes for itself.
+OWN_HEADERS = {"content-length", "content-type"}
+
+
+def _default(value: Any) -> str:
+    """Encode values the standard ``json`` module does not handle."""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """Encode ``content`` as compact UTF-8 JSON."""
+    if HAS_ORJSON:
+        return orjson.dumps(content)
+    return json.dumps(
+        content, default=_default, ensure_ascii=False, separators=(",", ":")
+    ).encode()
+
+
+def model_projection(model: type[BaseModel]) -> dict:
+    """Mongo projection returning exactly the fields of ``model``."""
+    return {"_id": 0, **{name: 1 for name in model.model_fields}}
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response rendered with :func:`dumps`."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def fast_response(content: Any, response: Response) -> Any:
+    """Render ``content`` directly when ``fast_responses`` is enabled.
+
+    A route returning a ``Response`` bypasses the one FastAPI injects, so
+    headers already set on ``response`` (cursors, ETags) are copied over.
+    When disabled, ``content`` is returned unchanged for FastAPI to validate
+    against the route's ``response_model``.
+    """
+    if not get_settings().fast_responses:
+        return content
+    headers = {
+        key: value for key, value in response.headers.items() if key not in OWN_HEADERS
+    }
+    return FastJSONResponse(
+        content, status_code=response.status_code or 200, headers=headers
+    )
@@ -0,0 +1,285 @@
+"""Request timing spans and the slow-query log.
+
+``ServerTimingMiddleware`` starts a ``RequestTimings`` for each request in a
+context variable and reports it in a ``Server-Timing`` header:
+
+* ``auth`` - resolving the current user (``get_current_user``)
+* ``db`` - MongoDB commands, from the ``CommandTimings`` listener
+* ``render`` - response validation and serialization after the endpoint
+  returns, measured by ``TimedRoute``
+* ``total`` - until the response headers are sent
+
+Motor runs driver calls on executor threads with a copy of the caller's
+context, so the listener sees the request's timings object. Commands slower
+than ``slow_query_ms`` are logged with their ``explain("executionStats")``,
+which is captured on a background thread through the synchronous client.
+Only the shape of a logged command is kept: its collection, field names and
+operators, with every value (emails, token digests, ids) replaced by ``?``,
+in the command and in the filters and index bounds of its explain.
+"""
+
+import functools
+import inspect
+import json
+import logging
+import threading
+import time
+from collections.abc import Callable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any
+
+from fastapi.routing import APIRoute
+from pymongo import MongoClient, monitoring
+from pymongo.errors import PyMongoError
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import get_settings
+
+slow_query_logger = logging.getLogger("app.slow_queries")
+
+EXPLAINABLE = {
+    "find",
+    "aggregate",
+    "count",
+    "distinct",
+    "findAndModify",
+    "update",
+    "delete",
+}
+DRIVER_FIELDS = {"$db", "lsid", "$clusterTime", "txnNumber", "$readPreference"}
+# Slow commands waiting for an explain beyond this are logged without one.
+MAX_PENDING_EXPLAINS = 8
+# Explain fields that echo the command's values.
+EXPLAIN_VALUE_FIELDS = {"filter", "indexBounds", "parsedQuery"}
+
+
+class RequestTimings:
+    """Durations accumulated by one request, in seconds."""
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.durations: dict[str, float] = {}
+        self.counts: dict[str, int] = {}
+        self.endpoint_done: float | None = None
+
+    def add(self, name: str, seconds: float) -> None:
+        self.durations[name] = self.durations.get(name, 0.0) + seconds
+        self.counts[name] = self.counts.get(name, 0) + 1
+
+    def header(self) -> str:
+        """``Server-Timing`` header value as of now."""
+        now = time.perf_counter()
+        parts = []
+        for name, seconds in self.durations.items():
+            part = f"{name};dur={seconds * 1000:.1f}"
+            if name == "db":
+                part += f';desc="{self.counts[name]} commands"'
+            parts.append(part)
+        if self.endpoint_done is not None:
+            parts.append(f"render;dur={(now - self.endpoint_done) * 1000:.1f}")
+        parts.append(f"total;dur={(now - self.started) * 1000:.1f}")
+        return ", ".join(parts)
+
+
+current_timings: ContextVar[RequestTimings | None] = ContextVar(
+    "current_timings", default=None
+)
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """Add the duration of the block to the current request's ``name``."""
+    timings = current_timings.get()
+    if timings is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, time.perf_counter() - started)
+
+
+class TimedRoute(APIRoute):
+    """Route that marks when its endpoint returns, to time rendering."""
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs: Any) -> None:
+        if inspect.iscoroutinefunction(endpoint):
+            endpoint = self.timed(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+
+    @staticmethod
+    def timed(endpoint: Callable) -> Callable:
+        @functools.wraps(endpoint)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                timings = current_timings.get()
+                if timings is not None:
+                    timings.endpoint_done = time.perf_counter()
+
+        return wrapper
+
+
+class ServerTimingMiddleware:
+    """ASGI middleware collecting spans and sending them as ``Server-Timing``."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not get_settings().server_timing_enabled:
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings()
+        token = current_timings.set(timings)
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", timings.header().encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_timings.reset(token)
+
+
+class CommandTimings(monitoring.CommandListener):
+    """Adds command durations to the request's ``db`` span and logs slow ones."""
+
+    def __init__(self) -> None:
+        # Started explainable commands by (connection, request id).
+        self.pending: dict[tuple, tuple[str, dict]] = {}
+        self.explainer = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="slow-query-explain"
+        )
+        self.explain_slots = threading.BoundedSemaphore(MAX_PENDING_EXPLAINS)
+        # Synchronous client used for explains, set while connected.
+        self.client: MongoClient | None = None
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        if event.command_name in EXPLAINABLE:
+            command = {
+                key: value
+                for key, value in event.command.items()
+                if key not in DRIVER_FIELDS
+            }
+            key = (event.connection_id, event.request_id)
+            self.pending[key] = (event.database_name, command)
+
+    def _finish(
+        self, event: monitoring.CommandSucceededEvent | monitoring.CommandFailedEvent
+    ) -> None:
+        seconds = event.duration_micros / 1_000_000
+        timings = current_timings.get()
+        if timings is not None:
+            timings.add("db", seconds)
+        pending = self.pending.pop((event.connection_id, event.request_id), None)
+        threshold = get_settings().slow_query_ms
+        if pending is not None and threshold and seconds * 1000 >= threshold:
+            self.slow(event.command_name, *pending, seconds)
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        self._finish(event)
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        self._finish(event)
+
+    def slow(self, name: str, database: str, command: dict, seconds: float) -> None:
+        """Log a slow command, explaining it in the background if enabled."""
+        client = self.client
+        if (
+            client is None
+            or not get_settings().slow_query_explain
+            or not self.explain_slots.acquire(blocking=False)
+        ):
+            log_slow_query(name, command, seconds, None)
+            return
+        self.explainer.submit(self.explain, client, name, database, command, seconds)
+
+    def explain(
+        self,
+        client: MongoClient,
+        name: str,
+        database: str,
+        command: dict,
+        seconds: float,
+    ) -> None:
+        try:
+            try:
+                plan = client[database].command(
+                    {"explain": command, "verbosity": "executionStats"}
+                )
+                explain = plan.get("executionStats", plan)
+            except PyMongoError as exc:
+                explain = {"error": str(exc)[:200]}
+            log_slow_query(name, command, seconds, explain)
+        finally:
+            self.explain_slots.release()
+
+    def shutdown(self) -> None:
+        self.explainer.shutdown(wait=False, cancel_futures=True)
+
+
+def query_shape(value: Any) -> Any:
+    """``value`` with every literal replaced by ``"?"``.
+
+    Field names and operators are kept; a list keeps one entry per distinct
+    shape, so an ``$in`` of emails becomes ``["?"]``.
+    """
+    if isinstance(value, dict):
+        return {key: query_shape(item) for key, item in value.items()}
+    if isinstance(value, list):
+        shapes: list = []
+        for item in value:
+            shape = query_shape(item)
+            if shape not in shapes:
+                shapes.append(shape)
+        return shapes
+    return "?"
+
+
+def command_shape(command: dict) -> dict:
+    """A command with only its name and collection left unredacted."""
+    name, *_ = command
+    return {
+        key: value if key == name else query_shape(value)
+        for key, value in command.items()
+    }
+
+
+def explain_shape(explain: Any) -> Any:
+    """Explain output with the filters and index bounds it echoes redacted."""
+    if isinstance(explain, dict):
+        return {
+            key: (
+                query_shape(value)
+                if key in EXPLAIN_VALUE_FIELDS
+                else explain_shape(value)
+            )
+            for key, value in explain.items()
+        }
+    if isinstance(explain, list):
+        return [explain_shape(item) for item in explain]
+    return explain
+
+
+def log_slow_query(name: str, command: dict, seconds: float, explain: Any) -> None:
+    """Write one slow-query log record as JSON, with its values redacted."""
+    record = {"command": command_shape(command), "explain": explain_shape(explain)}
+    slow_query_logger.warning(
+        "slow %s (%.1f ms): %s",
+        name,
+        seconds * 1000,
+        json.dumps(record, default=str, sort_keys=True),
+    )
+
+
+command_timings = CommandTimings()
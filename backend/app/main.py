@@ -3,12 +3,25 @@
 import logging
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, status
+from fastapi.responses import JSONResponse
 from starlette.middleware.cors import CORSMiddleware
 
 from app.api.router import api_router
 from app.core.config import get_settings
-from app.core.database import close_database_connection, connect_to_database
+from app.core.database import (
+    close_database_connection,
+    connect_to_database,
+    get_database,
+)
+from app.core.indexes import ensure_indexes
+from app.core.metrics import MetricsMiddleware
+from app.core.pagination import NEXT_CURSOR_HEADER
+from app.core.security import PasswordHasherBusy, password_hasher
+from app.core.timing import ServerTimingMiddleware, command_timings
+from app.services.jobs import JobWorkerPool
+from app.services.reminders import ReminderScheduler, make_sink
+from app.services.status_checks import ensure_status_collection
 
 # Configure logging
 logging.basicConfig(
@@ -21,15 +34,35 @@ logger = logging.getLogger(__name__)
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan manager for startup/shutdown events."""
+    settings = get_settings()
     # Startup
     logger.info("Connecting to database...")
     await connect_to_database()
     logger.info("Database connected")
+    await ensure_status_collection(get_database(), settings)
+    await ensure_indexes(get_database())
+    logger.info("Database indexes ensured")
+    scheduler = None
+    if settings.reminders_enabled:
+        scheduler = ReminderScheduler(get_database(), make_sink(settings), settings)
+        scheduler.start()
+        logger.info("Reminder scheduler started")
+    workers = None
+    if settings.jobs_enabled:
+        workers = JobWorkerPool(get_database(), settings)
+        workers.start()
+        logger.info("Started %d job worker(s)", settings.job_workers)
     yield
     # Shutdown
+    if workers is not None:
+        await workers.stop()
+    if scheduler is not None:
+        await scheduler.stop()
     logger.info("Closing database connection...")
     await close_database_connection()
     logger.info("Database connection closed")
+    password_hasher.shutdown()
+    command_timings.shutdown()
 
 
 def create_app() -> FastAPI:
@@ -49,8 +82,22 @@ def create_app() -> FastAPI:
         allow_origins=settings.cors_origins_list,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=[NEXT_CURSOR_HEADER, "ETag", "Server-Timing"],
     )
 
+    app.add_middleware(ServerTimingMiddleware)
+    # Outermost, so latencies include CORS handling and error responses
+    app.add_middleware(MetricsMiddleware)
+
+    @app.exception_handler(PasswordHasherBusy)
+    async def password_hasher_busy_handler(request: Request, exc: PasswordHasherBusy):
+        """Shed login/registration load instead of queueing without bound."""
+        return JSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            content={"detail": "Authentication is busy, please retry shortly"},
+            headers={"Retry-After": "1"},
+        )
+
     # Include API routes
     app.include_router(api_router)
 
@@ -1,10 +1,20 @@
 """Habit-related Pydantic models."""
 
-from datetime import datetime, timezone
+from datetime import date, datetime, timezone
 from enum import Enum
+from typing import Annotated
 from uuid import uuid4
 
-from pydantic import BaseModel, ConfigDict, Field
+from pydantic import AfterValidator, BaseModel, ConfigDict, Field
+
+
+def valid_day(value: str) -> str:
+    """Reject ``YYYY-MM-DD`` strings that name no calendar day."""
+    date.fromisoformat(value)
+    return value
+
+
+Day = Annotated[str, Field(pattern=r"^\d{4}-\d{2}-\d{2}$"), AfterValidator(valid_day)]
 
 
 class HabitFrequency(str, Enum):
@@ -72,7 +82,7 @@ class CompletionToggle(BaseModel):
     """Schema for toggling habit completion."""
 
     habit_id: str
-    date: str = Field(..., pattern=r"^\d{4}-\d{2}-\d{2}$")
+    date: Day
 
 
 class CompletionRecord(BaseModel):
@@ -88,11 +98,79 @@ class CompletionRecord(BaseModel):
     notes: str | None = Field(None, max_length=500)
 
 
+class HabitWithCompletions(HabitWithStats):
+    """Habit bundled with its completions for a date window."""
+
+    completions: list[CompletionRecord] = Field(default_factory=list)
+
+
+class CompletionBitmapEncoding(str, Enum):
+    """Wire formats for completion bitmaps."""
+
+    BASE64 = "base64"
+    RLE = "rle"
+
+
+class CompletionBitmap(BaseModel):
+    """One year of completions for a habit as a compact bitmap."""
+
+    habit_id: str
+    year: int
+    days: int
+    encoding: CompletionBitmapEncoding
+    data: str | list[int]
+    total_completions: int
+    longest_streak: int
+    current_streak: int
+
+
+class CompletionOperation(BaseModel):
+    """A queued set/unset of a completion, stamped by the client."""
+
+    habit_id: str
+    date: Day
+    completed: bool
+    client_ts: datetime
+
+
+class CompletionBatch(BaseModel):
+    """Completion operations replayed in one request."""
+
+    operations: list[CompletionOperation] = Field(..., min_length=1, max_length=1000)
+
+
+class CompletionOperationStatus(str, Enum):
+    """Outcome of one batched completion operation."""
+
+    APPLIED = "applied"
+    STALE = "stale"
+    REJECTED = "rejected"
+
+
+class CompletionOperationResult(BaseModel):
+    """Per-operation result of a completion batch, in request order."""
+
+    index: int
+    habit_id: str
+    date: str
+    status: CompletionOperationStatus
+    error: str | None = None
+
+
+class CompletionBatchResult(BaseModel):
+    """Summary of a completion batch."""
+
+    applied: int = 0
+    stale: int = 0
+    rejected: int = 0
+    results: list[CompletionOperationResult] = Field(default_factory=list)
+
+
 class CompletionCreate(BaseModel):
     """Schema for creating a completion."""
 
     habit_id: str
-    date: str = Field(..., pattern=r"^\d{4}-\d{2}-\d{2}$")
+    date: Day
     notes: str | None = Field(None, max_length=500)
 
 
@@ -106,6 +184,7 @@ class Category(BaseModel):
     name: str = Field(..., min_length=1, max_length=50)
     color: str = Field(default="gray", max_length=50)
     icon: str | None = Field(None, max_length=50)
+    habit_count: int = 0
 
 
 class CategoryCreate(BaseModel):
@@ -114,3 +193,11 @@ class CategoryCreate(BaseModel):
     name: str = Field(..., min_length=1, max_length=50)
     color: str = Field(default="gray", max_length=50)
     icon: str | None = Field(None, max_length=50)
+
+
+class CategoryUpdate(BaseModel):
+    """Schema for updating a category."""
+
+    name: str | None = Field(None, min_length=1, max_length=50)
+    color: str | None = Field(None, max_length=50)
+    icon: str | None = Field(None, max_length=50)
@@ -0,0 +1,37 @@
+"""Background job models."""
+
+from datetime import datetime
+from enum import Enum
+
+from pydantic import BaseModel, ConfigDict
+
+
+class JobStatus(str, Enum):
+    """Lifecycle of a background job."""
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+
+class Job(BaseModel):
+    """Status of a background job as reported to its owner."""
+
+    model_config = ConfigDict(extra="ignore")
+
+    id: str
+    kind: str
+    status: JobStatus
+    progress: int = 0
+    attempts: int = 0
+    error: str | None = None
+    created_at: datetime
+    updated_at: datetime
+    finished_at: datetime | None = None
+
+
+class JobReceipt(Job):
+    """A queued job with the token its status can be read with, shown once."""
+
+    status_token: str
@@ -1,9 +1,21 @@
 """Status check models (health/monitoring)."""
 
 from datetime import datetime, timezone
+from enum import Enum
+from typing import Annotated
 from uuid import uuid4
 
-from pydantic import BaseModel, ConfigDict, Field
+from pydantic import AfterValidator, BaseModel, ConfigDict, Field
+
+
+def assume_utc(value: datetime) -> datetime:
+    """Attach UTC to the naive datetimes MongoDB returns."""
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+UTCDatetime = Annotated[datetime, AfterValidator(assume_utc)]
 
 
 class StatusCheckCreate(BaseModel):
@@ -19,4 +31,21 @@ class StatusCheck(BaseModel):
 
     id: str = Field(default_factory=lambda: str(uuid4()))
     client_name: str
-    timestamp: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    timestamp: UTCDatetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+
+class StatusBucketUnit(str, Enum):
+    """Downsampling resolutions for status check ranges."""
+
+    MINUTE = "minute"
+    HOUR = "hour"
+
+
+class StatusCheckBucket(BaseModel):
+    """Status checks of one client within one minute or hour."""
+
+    client_name: str
+    start: UTCDatetime
+    count: int
+    first_seen: UTCDatetime
+    last_seen: UTCDatetime
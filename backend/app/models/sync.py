@@ -0,0 +1,25 @@
+"""Delta sync models."""
+
+from pydantic import BaseModel, Field
+
+from app.models.habit import CompletionRecord, Habit
+
+
+class Tombstone(BaseModel):
+    """A record deleted since the sync cursor."""
+
+    collection: str
+    id: str
+
+
+class SyncChanges(BaseModel):
+    """Records changed after a sync cursor, plus the cursor to resume from.
+
+    ``has_more`` is set when the next sync from ``cursor`` has more changes.
+    """
+
+    cursor: str
+    has_more: bool = False
+    habits: list[Habit] = Field(default_factory=list)
+    completions: list[CompletionRecord] = Field(default_factory=list)
+    deleted: list[Tombstone] = Field(default_factory=list)
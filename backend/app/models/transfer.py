@@ -0,0 +1,37 @@
+"""Data import models."""
+
+from pydantic import BaseModel, ConfigDict, Field
+
+from app.models.habit import CompletionCreate
+
+
+class CompletionImport(CompletionCreate):
+    """Completion record accepted by the import endpoint."""
+
+    model_config = ConfigDict(extra="ignore")
+
+    completed: bool = True
+
+
+class ImportBatchResult(BaseModel):
+    """Outcome of one bulk write during an import."""
+
+    batch: int
+    collection: str
+    received: int
+    inserted: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    errors: list[str] = Field(default_factory=list)
+
+
+class ImportResult(BaseModel):
+    """Summary of an import request."""
+
+    lines: int
+    habits: int = 0
+    completions: int = 0
+    categories: int = 0
+    skipped: int = 0
+    errors: list[str] = Field(default_factory=list)
+    batches: list[ImportBatchResult] = Field(default_factory=list)
@@ -46,6 +46,14 @@ class Token(BaseModel):
 
     access_token: str
     token_type: str = "bearer"
+    expires_in: int | None = None
+    refresh_token: str | None = None
+
+
+class RefreshRequest(BaseModel):
+    """Schema for exchanging or revoking a refresh token."""
+
+    refresh_token: str = Field(..., min_length=1)
 
 
 class TokenData(BaseModel):
@@ -0,0 +1,214 @@
+"""Aggregation pipelines behind the analytics endpoints.
+
+Completion history never leaves MongoDB: streaks, totals and rates are folded
+into one small result document per habit (or per day) on the server. Streaks
+use the gaps-and-islands technique: within a habit, consecutive days have a
+constant ``day number - row number``, so grouping on that difference yields
+one document per streak.
+
+Requires MongoDB 5.2+ for ``$setWindowFields`` and ``$top``.
+"""
+
+from datetime import date, timedelta
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from app.models.analytics import DailyStats
+from app.services.rollups import daily_totals
+
+MS_PER_DAY = 86_400_000
+HABIT_FIELDS = {
+    "_id": 0,
+    "id": 1,
+    "name": 1,
+    "category": 1,
+    "is_archived": 1,
+    "created_at": 1,
+}
+
+
+def habit_streaks_pipeline(
+    user_id: str, habit_ids: list[str], today: date, recent_days: int = 0
+) -> list:
+    """Build a pipeline yielding streak and total figures per habit.
+
+    With ``recent_days`` set, each result also lists the completed dates of
+    that many trailing days (grouped per streak) under ``recent``.
+    """
+    yesterday = (today - timedelta(days=1)).isoformat()
+    since_7d = (today - timedelta(days=6)).isoformat()
+    since_30d = (today - timedelta(days=29)).isoformat()
+    end = today.isoformat()
+
+    def in_window(start: str) -> dict:
+        return {
+            "$sum": {
+                "$cond": [
+                    {"$and": [{"$gte": ["$date", start]}, {"$lte": ["$date", end]}]},
+                    1,
+                    0,
+                ]
+            }
+        }
+
+    return [
+        {
+            "$match": {
+                "user_id": user_id,
+                "habit_id": {"$in": habit_ids},
+                "completed": True,
+            }
+        },
+        {
+            "$setWindowFields": {
+                "partitionBy": "$habit_id",
+                "sortBy": {"date": 1},
+                "output": {"row": {"$documentNumber": {}}},
+            }
+        },
+        {
+            "$set": {
+                "island": {
+                    "$subtract": [
+                        {
+                            "$toLong": {
+                                "$divide": [
+                                    {
+                                        "$toLong": {
+                                            "$dateFromString": {
+                                                "dateString": "$date",
+                                                "format": "%Y-%m-%d",
+                                            }
+                                        }
+                                    },
+                                    MS_PER_DAY,
+                                ]
+                            }
+                        },
+                        "$row",
+                    ]
+                }
+            }
+        },
+        {
+            "$group": {
+                "_id": {"habit_id": "$habit_id", "island": "$island"},
+                "start": {"$min": "$date"},
+                "end": {"$max": "$date"},
+                "length": {"$sum": 1},
+                "completed_7d": in_window(since_7d),
+                "completed_30d": in_window(since_30d),
+                **recent_dates(today, recent_days),
+            }
+        },
+        {
+            "$group": {
+                "_id": "$_id.habit_id",
+                "total_completions": {"$sum": "$length"},
+                "completed_7d": {"$sum": "$completed_7d"},
+                "completed_30d": {"$sum": "$completed_30d"},
+                **({"recent": {"$push": "$recent"}} if recent_days else {}),
+                "best": {
+                    "$top": {
+                        "sortBy": {"length": -1, "end": -1},
+                        "output": {
+                            "start": "$start",
+                            "end": "$end",
+                            "length": "$length",
+                        },
+                    }
+                },
+                "latest": {
+                    "$top": {
+                        "sortBy": {"end": -1},
+                        "output": {
+                            "start": "$start",
+                            "end": "$end",
+                            "length": "$length",
+                        },
+                    }
+                },
+            }
+        },
+        {
+            "$project": {
+                "_id": 0,
+                "habit_id": "$_id",
+                "total_completions": 1,
+                "completed_7d": 1,
+                "completed_30d": 1,
+                "longest_streak": "$best.length",
+                "best_streak_start": "$best.start",
+                "best_streak_end": "$best.end",
+                "latest_streak_start": "$latest.start",
+                "latest_streak_end": "$latest.end",
+                "latest_streak": "$latest.length",
+                **({"recent": 1} if recent_days else {}),
+                "current_streak": {
+                    "$cond": [
+                        {"$gte": ["$latest.end", yesterday]},
+                        "$latest.length",
+                        0,
+                    ]
+                },
+            }
+        },
+    ]
+
+
+def recent_dates(today: date, days: int) -> dict:
+    """Accumulator collecting completed dates from the trailing ``days`` days."""
+    if not days:
+        return {}
+    since = (today - timedelta(days=days - 1)).isoformat()
+    return {
+        "recent": {
+            "$push": {"$cond": [{"$gte": ["$date", since]}, "$date", "$$REMOVE"]}
+        }
+    }
+
+
+async def habit_streaks(
+    db: AsyncIOMotorDatabase,
+    user_id: str,
+    habit_ids: list[str],
+    today: date,
+    recent_days: int = 0,
+) -> dict[str, dict]:
+    """Run the streak pipeline and index its results by habit id."""
+    pipeline = habit_streaks_pipeline(user_id, habit_ids, today, recent_days)
+    return {row["habit_id"]: row async for row in db.completions.aggregate(pipeline)}
+
+
+async def daily_stats(
+    db: AsyncIOMotorDatabase,
+    user_id: str,
+    habits: list[dict],
+    start: date,
+    end: date,
+) -> list[DailyStats]:
+    """Per-day completion stats for every day in ``[start, end]``, from rollups.
+
+    ``habits`` only needs ``is_archived``; it gives the current active habit
+    count that the rollups' habit deltas are applied to.
+    """
+    active = sum(1 for habit in habits if not habit.get("is_archived", False))
+    return [
+        DailyStats(
+            date=day,
+            completed_count=completed,
+            total_habits=total,
+            completion_rate=percentage(completed, total),
+        )
+        for day, completed, total in await daily_totals(db, user_id, active, start, end)
+    ]
+
+
+async def get_user_habits(db: AsyncIOMotorDatabase, user_id: str) -> list[dict]:
+    """Load the habit fields analytics needs for one user."""
+    return await db.habits.find({"user_id": user_id}, HABIT_FIELDS).to_list(None)
+
+
+def percentage(part: int, whole: int) -> float:
+    """Return ``part / whole`` as a percentage rounded to one decimal."""
+    return round(part / whole * 100, 1) if whole else 0.0
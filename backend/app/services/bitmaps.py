@@ -0,0 +1,214 @@
+"""Compact per-year completion bitmaps.
+
+A habit's completions for one year fit in a single 366-bit integer where bit
+``i`` is set when day-of-year ``i + 1`` was completed. In MongoDB the bitmap is
+stored as ``WORDS`` 32-bit words in a ``words`` subdocument keyed by word
+index, so the toggle path can flip one bit atomically with ``$bit`` (a missing
+word counts as zero).
+
+Bitmaps are a derived cache of ``completions``, which stay the source of
+truth for notes, sync versions and last-writer-wins stamps. A bitmap document
+only ever exists whole: a toggle in a year without one builds it from
+``completions`` instead of upserting a document holding a single day.
+
+Streaks and totals are computed with integer bit operations rather than by
+walking dates.
+"""
+
+import base64
+from datetime import date, timedelta
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.errors import DuplicateKeyError
+
+WORD_BITS = 32
+WORDS = 12  # 384 bits, enough for 366 days
+WORD_MASK = (1 << WORD_BITS) - 1
+
+
+def days_in_year(year: int) -> int:
+    """Number of days in ``year``."""
+    return (date(year + 1, 1, 1) - date(year, 1, 1)).days
+
+
+def day_bit(day: date) -> int:
+    """Bit position of ``day`` within its year's bitmap."""
+    return day.timetuple().tm_yday - 1
+
+
+def bit_update(day: date, completed: bool) -> dict:
+    """``$bit`` operand that sets or clears ``day`` in its word."""
+    word, offset = divmod(day_bit(day), WORD_BITS)
+    mask = 1 << offset
+    operation = {"or": mask} if completed else {"and": WORD_MASK ^ mask}
+    return {f"words.{word}": operation}
+
+
+def words_to_int(words: dict | None) -> int:
+    """Assemble the stored words into one bitmap integer."""
+    bits = 0
+    for index, value in (words or {}).items():
+        bits |= (value & WORD_MASK) << (int(index) * WORD_BITS)
+    return bits
+
+
+def int_to_words(bits: int) -> dict:
+    """Split a bitmap integer into its non-zero stored words."""
+    words = {}
+    for index in range(WORDS):
+        value = (bits >> (index * WORD_BITS)) & WORD_MASK
+        if value:
+            words[str(index)] = value
+    return words
+
+
+def bitmap_from_dates(dates: list[str], year: int) -> int:
+    """Build a year's bitmap from ``YYYY-MM-DD`` strings."""
+    bits = 0
+    for value in dates:
+        day = date.fromisoformat(value)
+        if day.year == year:
+            bits |= 1 << day_bit(day)
+    return bits
+
+
+def longest_run(bits: int) -> int:
+    """Length of the longest run of set bits.
+
+    Each ``bits & (bits >> 1)`` shortens every run by one, so the number of
+    iterations until zero is the longest run.
+    """
+    length = 0
+    while bits:
+        bits &= bits >> 1
+        length += 1
+    return length
+
+
+def run_ending_at(bits: int, position: int) -> int:
+    """Length of the run of set bits ending at (and including) ``position``."""
+    if position < 0 or not (bits >> position) & 1:
+        return 0
+    window = (1 << (position + 1)) - 1
+    gaps = ~bits & window
+    return position + 1 - gaps.bit_length()
+
+
+def current_streak(bitmaps: dict[int, int], today: date) -> int:
+    """Streak ending today (or yesterday while today is open).
+
+    ``bitmaps`` maps years to bitmaps; a streak reaching January 1st carries
+    on into the previous year when that year is present.
+    """
+    end = today
+    if not (bitmaps.get(today.year, 0) >> day_bit(today)) & 1:
+        end = today - timedelta(days=1)
+
+    streak = 0
+    year, position = end.year, day_bit(end)
+    while True:
+        run = run_ending_at(bitmaps.get(year, 0), position)
+        streak += run
+        year -= 1
+        if run != position + 1 or year not in bitmaps:
+            return streak
+        position = days_in_year(year) - 1
+
+
+def encode_base64(bits: int, year: int) -> str:
+    """Little-endian bytes of the bitmap, base64 encoded."""
+    size = (days_in_year(year) + 7) // 8
+    return base64.b64encode(bits.to_bytes(size, "little")).decode("ascii")
+
+
+def encode_rle(bits: int, year: int) -> list[int]:
+    """Alternating run lengths starting with unset days, covering the year."""
+    runs = []
+    current, length = 0, 0
+    for position in range(days_in_year(year)):
+        bit = (bits >> position) & 1
+        if bit == current:
+            length += 1
+        else:
+            runs.append(length)
+            current, length = bit, 1
+    runs.append(length)
+    return runs
+
+
+async def record_bitmap(
+    db: AsyncIOMotorDatabase, user_id: str, habit_id: str, day: str, completed: bool
+) -> None:
+    """Set or clear ``day`` in the habit's bitmap for that year.
+
+    Must run after the completion itself was written. Without a bitmap for
+    the year, one is built from ``completions``, which include this write.
+    """
+    parsed = date.fromisoformat(day)
+    query = {"user_id": user_id, "habit_id": habit_id, "year": parsed.year}
+    update = {"$bit": bit_update(parsed, completed)}
+    result = await db.completion_bitmaps.update_one(query, update)
+    if result.matched_count:
+        return
+    bits = await build_bitmap(db, user_id, habit_id, parsed.year, store=False)
+    try:
+        await db.completion_bitmaps.insert_one({**query, "words": int_to_words(bits)})
+    except DuplicateKeyError:
+        # A concurrent toggle built it first, maybe before this write landed;
+        # setting or clearing a bit is idempotent, so apply it again.
+        await db.completion_bitmaps.update_one(query, update)
+
+
+async def load_bitmaps(
+    db: AsyncIOMotorDatabase, user_id: str, habit_id: str, years: list[int]
+) -> dict[int, int]:
+    """Load stored bitmaps for ``years``; years without a document are absent."""
+    cursor = db.completion_bitmaps.find(
+        {"user_id": user_id, "habit_id": habit_id, "year": {"$in": years}},
+        {"_id": 0, "year": 1, "words": 1},
+    )
+    return {doc["year"]: words_to_int(doc.get("words")) async for doc in cursor}
+
+
+async def build_bitmap(
+    db: AsyncIOMotorDatabase,
+    user_id: str,
+    habit_id: str,
+    year: int,
+    store: bool = True,
+) -> int:
+    """Build a year's bitmap from ``completions``, storing it unless told not to."""
+    cursor = db.completions.find(
+        {
+            "user_id": user_id,
+            "habit_id": habit_id,
+            "date": {"$gte": f"{year:04d}-01-01", "$lte": f"{year:04d}-12-31"},
+            "completed": True,
+        },
+        {"_id": 0, "date": 1},
+    )
+    bits = bitmap_from_dates([doc["date"] async for doc in cursor], year)
+    if store:
+        await save_bitmap(db, user_id, habit_id, year, bits)
+    return bits
+
+
+async def save_bitmap(
+    db: AsyncIOMotorDatabase, user_id: str, habit_id: str, year: int, bits: int
+) -> None:
+    """Replace the stored bitmap of one habit and year."""
+    await db.completion_bitmaps.replace_one(
+        {"user_id": user_id, "habit_id": habit_id, "year": year},
+        {
+            "user_id": user_id,
+            "habit_id": habit_id,
+            "year": year,
+            "words": int_to_words(bits),
+        },
+        upsert=True,
+    )
+
+
+async def delete_bitmaps(db: AsyncIOMotorDatabase, user_id: str, habit_id: str) -> None:
+    """Remove every bitmap of a deleted habit."""
+    await db.completion_bitmaps.delete_many({"user_id": user_id, "habit_id": habit_id})
@@ -0,0 +1,111 @@
+"""Habit categories and their denormalized habit counts.
+
+Habits refer to their category by name. Each ``categories`` document keeps
+``habit_count``, the number of active (unarchived) habits in it, which the
+habit routes ``$inc`` whenever a habit enters or leaves a category. A habit
+naming a category that does not exist yet creates it, so every counted
+category has a document, and listing categories or breaking habits down by
+category reads only the ``(user_id, name)`` index range of one user.
+
+Imports and the CLI backfill recount a user's categories from ``habits``.
+"""
+
+from uuid import uuid4
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+from app.models.habit import Category
+
+UNCATEGORIZED = "uncategorized"
+
+
+def counted_category(habit: dict | None) -> str | None:
+    """The category a habit counts towards, if any."""
+    if habit is None or habit.get("is_archived", False):
+        return None
+    return habit.get("category") or None
+
+
+def new_category() -> dict:
+    """Fields of a category created implicitly by a habit."""
+    return {"id": str(uuid4()), "color": Category.model_fields["color"].default}
+
+
+async def adjust_habit_count(
+    db: AsyncIOMotorDatabase, user_id: str, name: str, delta: int
+) -> None:
+    """Add ``delta`` to a category's habit count, creating it if needed."""
+    query = {"user_id": user_id, "name": name}
+    update = {"$inc": {"habit_count": delta}}
+    try:
+        await db.categories.update_one(
+            query, {**update, "$setOnInsert": new_category()}, upsert=True
+        )
+    except DuplicateKeyError:
+        # A concurrent request created it first.
+        await db.categories.update_one(query, update)
+
+
+async def habit_category_changed(
+    db: AsyncIOMotorDatabase, user_id: str, before: dict | None, after: dict | None
+) -> None:
+    """Move a habit's count between categories after it was written.
+
+    ``before`` is ``None`` for a new habit and ``after`` for a deleted one.
+    """
+    old, new = counted_category(before), counted_category(after)
+    if old == new:
+        return
+    if old is not None:
+        await adjust_habit_count(db, user_id, old, -1)
+    if new is not None:
+        await adjust_habit_count(db, user_id, new, 1)
+
+
+async def category_counts(db: AsyncIOMotorDatabase, user_id: str) -> dict[str, int]:
+    """Active habits per category name, omitting empty categories."""
+    return {
+        doc["name"]: doc["habit_count"]
+        async for doc in db.categories.find(
+            {"user_id": user_id, "habit_count": {"$gt": 0}},
+            {"_id": 0, "name": 1, "habit_count": 1},
+        )
+    }
+
+
+async def rebuild_category_counts(db: AsyncIOMotorDatabase, user_id: str) -> int:
+    """Recount every category of a user from ``habits``.
+
+    Returns the number of categories written.
+    """
+    pipeline = [
+        {
+            "$match": {
+                "user_id": user_id,
+                "is_archived": {"$ne": True},
+                "category": {"$nin": [None, ""]},
+            }
+        },
+        {"$group": {"_id": "$category", "count": {"$sum": 1}}},
+    ]
+    counts = {row["_id"]: row["count"] async for row in db.habits.aggregate(pipeline)}
+    existing = await db.categories.distinct("name", {"user_id": user_id})
+    names = set(counts) | set(existing)
+    if names:
+        await db.categories.bulk_write(
+            [
+                UpdateOne(
+                    {"user_id": user_id, "name": name},
+                    {
+                        "$set": {"habit_count": counts.get(name, 0)},
+                        "$setOnInsert": new_category(),
+                    },
+                    upsert=True,
+                )
+                for name in sorted(names)
+            ],
+            ordered=False,
+        )
+    return len(names)
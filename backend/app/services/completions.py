@@ -0,0 +1,50 @@
+"""Derived data maintained whenever a completion changes.
+
+Every write path that creates, flips or removes a completion record calls
+``completion_changed`` so materialized views stay in step with the
+``completions`` collection. Bulk writes call ``completions_rewritten``
+instead, which invalidates the views for a later rebuild.
+"""
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from app.core.config import get_settings
+from app.services.bitmaps import record_bitmap
+from app.services.habit_stats import record_toggle
+from app.services.rollups import record_completion
+
+
+async def completion_changed(
+    db: AsyncIOMotorDatabase,
+    user_id: str,
+    habit_id: str,
+    day: str,
+    completed: bool,
+    archived: bool = False,
+) -> None:
+    """Propagate a completion of ``habit_id`` on ``day`` becoming ``completed``.
+
+    Daily rollups leave out completions of ``archived`` habits.
+    """
+    await record_toggle(db, user_id, habit_id, day, completed)
+    if not archived:
+        await record_completion(db, user_id, day, completed)
+    if get_settings().completion_bitmaps_enabled:
+        await record_bitmap(db, user_id, habit_id, day, completed)
+
+
+async def completions_rewritten(
+    db: AsyncIOMotorDatabase, user_id: str, habit_ids: list[str]
+) -> None:
+    """Invalidate derived data after a bulk write to these habits' completions.
+
+    Stats are marked dirty and rebuilt on next read; bitmaps are dropped and
+    rebuilt on demand.
+    """
+    if not habit_ids:
+        return
+    query = {"user_id": user_id, "habit_id": {"$in": habit_ids}}
+    await db.habit_stats.update_many(
+        query, {"$set": {"dirty": True}, "$inc": {"version": 1}}
+    )
+    await db.completion_bitmaps.delete_many(query)
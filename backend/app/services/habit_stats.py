@@ -0,0 +1,303 @@
+"""Materialized per-habit statistics.
+
+Each habit has one ``habit_stats`` document that the toggle path updates
+incrementally, so dashboard reads cost a single indexed lookup per user
+instead of a scan over completion history.
+
+The document tracks:
+
+* ``total_completions``;
+* the latest streak (``streak_start``/``streak_end``) and the longest one;
+* ``recent_mask``, a bitmap of the ``RECENT_DAYS`` days up to
+  ``recent_anchor`` (bit ``i`` set when ``anchor - i days`` was completed),
+  from which trailing completion rates are read in O(1).
+
+Toggles at the edge of the latest streak (the common case: today or
+yesterday) are applied in O(1). Edits that could merge or split older streaks
+cannot be resolved without history, and neither can toggles dated after the
+current UTC day, so they mark the document ``dirty`` and it is rebuilt from
+``completions`` on the next read. Concurrent writers are
+serialized with a compare-and-set on ``version``; a lost race also marks the
+document dirty.
+"""
+
+from datetime import date, datetime, timedelta, timezone
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.errors import DuplicateKeyError
+
+from app.services.analytics import habit_streaks
+
+RECENT_DAYS = 62
+RECENT_MASK = (1 << RECENT_DAYS) - 1
+
+STAT_FIELDS = (
+    "total_completions",
+    "streak_start",
+    "streak_end",
+    "longest_streak",
+    "longest_start",
+    "longest_end",
+    "recent_anchor",
+    "recent_mask",
+)
+
+
+def empty_stats() -> dict:
+    """Stats for a habit without completions."""
+    return {
+        "total_completions": 0,
+        "streak_start": None,
+        "streak_end": None,
+        "longest_streak": 0,
+        "longest_start": None,
+        "longest_end": None,
+        "recent_anchor": None,
+        "recent_mask": 0,
+        "dirty": False,
+    }
+
+
+def days_between(start: str, end: str) -> int:
+    """Number of days from ``start`` to ``end``."""
+    return (date.fromisoformat(end) - date.fromisoformat(start)).days
+
+
+def shift_day(day: str, days: int) -> str:
+    """Move a ``YYYY-MM-DD`` date by ``days`` days."""
+    return (date.fromisoformat(day) + timedelta(days=days)).isoformat()
+
+
+def set_recent(stats: dict, day: str, completed: bool) -> None:
+    """Record ``day`` in the trailing-days bitmap."""
+    anchor = stats["recent_anchor"]
+    mask = stats["recent_mask"]
+    if anchor is None or day > anchor:
+        shift = RECENT_DAYS if anchor is None else days_between(anchor, day)
+        mask = (mask << min(shift, RECENT_DAYS)) & RECENT_MASK
+        anchor = day
+    offset = days_between(day, anchor)
+    if offset < RECENT_DAYS:
+        bit = 1 << offset
+        mask = mask | bit if completed else mask & ~bit
+    stats["recent_anchor"] = anchor
+    stats["recent_mask"] = mask
+
+
+def apply_toggle(stats: dict, day: str, completed: bool, today: date) -> dict:
+    """Return ``stats`` updated for ``day`` becoming (un)completed."""
+    stats = {**empty_stats(), **stats}
+    stats["total_completions"] += 1 if completed else -1
+    set_recent(stats, day, completed)
+    if day > today.isoformat():
+        # Dated after today in UTC (a client ahead of UTC): leave the streak
+        # to the rebuild rather than move it into the future.
+        stats["dirty"] = True
+    if stats["dirty"]:
+        return stats
+
+    start, end = stats["streak_start"], stats["streak_end"]
+    longest = (stats["longest_start"], stats["longest_end"])
+    latest_is_longest = start is not None and (start, end) == longest
+
+    if completed:
+        if end is None or day > shift_day(end, 1):
+            start = end = day
+        elif day == shift_day(end, 1):
+            end = day
+        else:
+            # Extending the latest streak backwards or filling an older gap
+            # may join streaks we have no record of.
+            stats["dirty"] = True
+            return stats
+    else:
+        if start is None or day > end:
+            return stats
+        if day < start:
+            if longest[0] is not None and longest[0] <= day <= longest[1]:
+                stats["dirty"] = True
+            return stats
+        if start == end or (start < day < end) or latest_is_longest:
+            # The streak vanishes, splits, or the longest streak shrinks; the
+            # replacement comes from history.
+            stats["dirty"] = True
+            return stats
+        if day == end:
+            end = shift_day(end, -1)
+        else:
+            start = shift_day(start, 1)
+
+    stats["streak_start"], stats["streak_end"] = start, end
+    length = days_between(start, end) + 1
+    if length > stats["longest_streak"]:
+        stats["longest_streak"] = length
+        stats["longest_start"], stats["longest_end"] = start, end
+    return stats
+
+
+def read_stats(stats: dict | None, today: date) -> dict:
+    """Project a stats document onto the ``HabitWithStats`` fields."""
+    stats = {**empty_stats(), **(stats or {})}
+    yesterday = (today - timedelta(days=1)).isoformat()
+
+    current = 0
+    if stats["streak_end"] is not None and stats["streak_end"] >= yesterday:
+        current = days_between(stats["streak_start"], stats["streak_end"]) + 1
+
+    return {
+        "current_streak": current,
+        "longest_streak": stats["longest_streak"],
+        "completion_rate_30d": recent_rate(stats, today, 30),
+        "total_completions": stats["total_completions"],
+    }
+
+
+def mask_at(stats: dict, day: date) -> int:
+    """The trailing-days bitmap re-anchored on ``day``."""
+    anchor = stats["recent_anchor"]
+    if anchor is None:
+        return 0
+    mask: int = stats["recent_mask"]
+    age = days_between(anchor, day.isoformat())
+    if age >= 0:
+        return (mask << age) & RECENT_MASK
+    return mask >> -age
+
+
+def recent_rate(stats: dict, today: date, days: int) -> float:
+    """Percentage of the trailing ``days`` days (including today) completed."""
+    window = mask_at(stats, today) & ((1 << days) - 1)
+    return round(bin(window).count("1") / days * 100, 1)
+
+
+async def create_habit_stats(
+    db: AsyncIOMotorDatabase, user_id: str, habit_id: str
+) -> None:
+    """Create the stats document for a new habit."""
+    await db.habit_stats.insert_one(
+        {"user_id": user_id, "habit_id": habit_id, **empty_stats(), "version": 1}
+    )
+
+
+async def record_toggle(
+    db: AsyncIOMotorDatabase, user_id: str, habit_id: str, day: str, completed: bool
+) -> None:
+    """Apply a completion toggle to the habit's stats document."""
+    query = {"user_id": user_id, "habit_id": habit_id}
+    current = await db.habit_stats.find_one(query, {"_id": 0})
+    if current is not None:
+        today = datetime.now(timezone.utc).date()
+        updated = apply_toggle(current, day, completed, today)
+        result = await db.habit_stats.update_one(
+            {**query, "version": current["version"]},
+            {
+                "$set": {key: updated[key] for key in (*STAT_FIELDS, "dirty")},
+                "$inc": {"version": 1},
+            },
+        )
+        if result.modified_count:
+            return
+
+    # No document yet (history predates it) or another writer got there
+    # first: rebuild from completions on the next read.
+    await db.habit_stats.update_one(
+        query, {"$set": {"dirty": True}, "$inc": {"version": 1}}, upsert=True
+    )
+
+
+async def delete_habit_stats(
+    db: AsyncIOMotorDatabase, user_id: str, habit_id: str
+) -> None:
+    """Remove the stats document of a deleted habit."""
+    await db.habit_stats.delete_one({"user_id": user_id, "habit_id": habit_id})
+
+
+async def rebuild_habit_stats(
+    db: AsyncIOMotorDatabase, user_id: str, habit_ids: list[str], today: date
+) -> dict[str, dict]:
+    """Recompute stats documents for ``habit_ids`` from ``completions``.
+
+    Each document is only replaced if its ``version`` is still the one read
+    before aggregating; one a toggle changed meanwhile is left for that
+    toggle (or the next read) to settle. The recomputed stats are returned
+    either way.
+    """
+    if not habit_ids:
+        return {}
+    versions = {
+        doc["habit_id"]: doc.get("version")
+        async for doc in db.habit_stats.find(
+            {"user_id": user_id, "habit_id": {"$in": habit_ids}},
+            {"_id": 0, "habit_id": 1, "version": 1},
+        )
+    }
+    rows = await habit_streaks(db, user_id, habit_ids, today, RECENT_DAYS)
+    rebuilt = {}
+    for habit_id in habit_ids:
+        stats = compute_stats(rows.get(habit_id), today)
+        query = {"user_id": user_id, "habit_id": habit_id}
+        update = {"$set": stats, "$inc": {"version": 1}}
+        if habit_id in versions:
+            await db.habit_stats.update_one(
+                {**query, "version": versions[habit_id]}, update
+            )
+        else:
+            try:
+                await db.habit_stats.insert_one({**query, **stats, "version": 1})
+            except DuplicateKeyError:
+                pass  # Created by a concurrent toggle, which owns it now.
+        rebuilt[habit_id] = stats
+    return rebuilt
+
+
+def compute_stats(row: dict | None, today: date) -> dict:
+    """Build a stats document from one row of the streak pipeline."""
+    stats = empty_stats()
+    if not row:
+        return stats
+    stats.update(
+        total_completions=row["total_completions"],
+        streak_start=row["latest_streak_start"],
+        streak_end=row["latest_streak_end"],
+        longest_streak=row["longest_streak"],
+        longest_start=row["best_streak_start"],
+        longest_end=row["best_streak_end"],
+    )
+    for day in (day for island in row.get("recent", []) for day in island):
+        set_recent(stats, day, True)
+    if stats["recent_anchor"] is not None:
+        set_recent(stats, today.isoformat(), False)
+    return stats
+
+
+async def get_habit_stats(
+    db: AsyncIOMotorDatabase, user_id: str, habit_ids: list[str], today: date
+) -> dict[str, dict]:
+    """Load ``HabitWithStats`` fields for a user's habits.
+
+    Missing or dirty documents are rebuilt in one batch before returning.
+    """
+    docs = {
+        doc["habit_id"]: doc
+        async for doc in db.habit_stats.find({"user_id": user_id}, {"_id": 0})
+    }
+    stale = [
+        habit_id
+        for habit_id in habit_ids
+        if habit_id not in docs or docs[habit_id].get("dirty")
+    ]
+    docs.update(await rebuild_habit_stats(db, user_id, stale, today))
+    return {habit_id: read_stats(docs[habit_id], today) for habit_id in habit_ids}
+
+
+def stats_differ(stored: dict | None, expected: dict, today: date) -> list[str]:
+    """Return the stat fields where ``stored`` disagrees with ``expected``."""
+    stored = {**empty_stats(), **(stored or {})}
+    differing = [
+        key
+        for key in STAT_FIELDS
+        if key not in ("recent_anchor", "recent_mask") and stored[key] != expected[key]
+    ]
+    if mask_at(stored, today) != mask_at(expected, today):
+        differing.append("recent_mask")
+    return differing
@@ -0,0 +1,308 @@
+"""Batched data import.
+
+Records are validated one at a time as they are parsed and buffered per
+collection; every ``BATCH_SIZE`` records the buffers are written with
+unordered ``bulk_write`` calls of upserts, so re-importing the same file is
+idempotent and one bad record does not abort its batch. Each batch that
+changed anything bumps the user's data version and stamps it on the records
+it wrote, so delta syncs pick imported records up.
+"""
+
+import codecs
+import csv
+import json
+from collections import deque
+from collections.abc import AsyncIterator, Mapping
+from typing import Any
+from uuid import uuid4
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pydantic import ValidationError
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from app.models.habit import Category, Habit
+from app.models.transfer import CompletionImport, ImportBatchResult, ImportResult
+from app.services.categories import rebuild_category_counts
+from app.services.completions import completions_rewritten
+from app.services.data_version import bump_data_version
+from app.services.jobs import enqueue
+from app.services.rollups import invalidate_rollups
+from app.services.sync import record_change
+
+BATCH_SIZE = 1000
+MAX_ERRORS = 100
+COLLECTIONS = {"habit": "habits", "category": "categories", "completion": "completions"}
+
+# A pending upsert as (filter, update); built into an ``UpdateOne`` when written.
+Upsert = tuple[dict, dict]
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Split a stream of byte chunks into decoded lines."""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending.rstrip("\r")
+
+
+def describe(exc: ValidationError) -> str:
+    """Short description of the first validation error."""
+    error = exc.errors()[0]
+    location = ".".join(str(part) for part in error["loc"])
+    return f"{location}: {error['msg']}" if location else error["msg"]
+
+
+class Importer:
+    """Validates records for one user and writes them in batches."""
+
+    def __init__(self, db: AsyncIOMotorDatabase, user_id: str):
+        self.db = db
+        self.user_id = user_id
+        self.result = ImportResult(lines=0)
+        # Pending upserts per collection as (line, habit_id, upsert).
+        self.pending: dict[str, list[tuple[int, str | None, Upsert]]] = {
+            collection: [] for collection in COLLECTIONS.values()
+        }
+        self.habit_ids_by_name: dict[str, str] = {}
+        self.touched_habits: set[str] = set()
+
+    def reject(self, line: int, message: str) -> None:
+        """Record a line that could not be imported."""
+        self.result.skipped += 1
+        if len(self.result.errors) < MAX_ERRORS:
+            self.result.errors.append(f"line {line}: {message}")
+
+    async def add(self, line: int, record_type: str, data: dict) -> None:
+        """Validate one record and queue its upsert."""
+        collection = COLLECTIONS.get(record_type)
+        if collection is None:
+            self.reject(line, f"unknown record type {record_type!r}")
+            return
+        try:
+            if record_type == "habit":
+                habit_id, upsert = self.habit_upsert(data)
+            elif record_type == "category":
+                habit_id, upsert = None, self.category_upsert(data)
+            elif not data.get("habit_id") and data.get("habit_name"):
+                # Validate before resolving the name, which may create a habit.
+                record = CompletionImport(**{**data, "habit_id": ""})
+                record.habit_id = await self.habit_id_for(line, data["habit_name"])
+                habit_id, upsert = self.completion_upsert(record)
+            else:
+                habit_id, upsert = self.completion_upsert(CompletionImport(**data))
+        except ValidationError as exc:
+            self.reject(line, describe(exc))
+            return
+
+        self.pending[collection].append((line, habit_id, upsert))
+        if len(self.pending[collection]) >= BATCH_SIZE:
+            await self.flush()
+
+    def habit_upsert(self, data: dict) -> tuple[str, Upsert]:
+        habit = Habit(**{**data, "user_id": self.user_id})
+        doc = habit.model_dump(exclude={"id", "user_id"})
+        doc["created_at"] = doc["created_at"].isoformat()
+        self.habit_ids_by_name.setdefault(habit.name, habit.id)
+        return habit.id, ({"user_id": self.user_id, "id": habit.id}, {"$set": doc})
+
+    def category_upsert(self, data: dict) -> Upsert:
+        category = Category(**{**data, "user_id": self.user_id})
+        return (
+            {"user_id": self.user_id, "name": category.name},
+            {
+                "$set": {"color": category.color, "icon": category.icon},
+                "$setOnInsert": {"id": category.id},
+            },
+        )
+
+    def completion_upsert(self, record: CompletionImport) -> tuple[str, Upsert]:
+        query = {
+            "user_id": self.user_id,
+            "habit_id": record.habit_id,
+            "date": record.date,
+        }
+        return record.habit_id, (
+            query,
+            {
+                "$set": {"completed": record.completed, "notes": record.notes},
+                "$setOnInsert": {"id": str(uuid4())},
+            },
+        )
+
+    async def habit_id_for(self, line: int, name: str) -> str:
+        """Resolve a habit name to an id, creating the habit if needed."""
+        if name not in self.habit_ids_by_name:
+            existing = await self.db.habits.find_one(
+                {"user_id": self.user_id, "name": name}, {"_id": 0, "id": 1}
+            )
+            if existing:
+                self.habit_ids_by_name[name] = existing["id"]
+            else:
+                habit_id, upsert = self.habit_upsert({"name": name})
+                self.pending["habits"].append((line, habit_id, upsert))
+        return self.habit_ids_by_name[name]
+
+    async def flush(self) -> None:
+        """Write every pending batch.
+
+        Habits are written first so completions in the same batch can refer to
+        them; completions for habits the user does not own are rejected.
+        """
+        for collection in ("habits", "categories", "completions"):
+            items, self.pending[collection] = self.pending[collection], []
+            if not items:
+                continue
+            if collection == "completions":
+                items = await self.owned(items)
+            if items:
+                await self.write(collection, items)
+
+    async def owned(self, items: list[tuple[int, str | None, Upsert]]) -> list:
+        """Drop completions whose habit does not belong to the user."""
+        habit_ids = list({habit_id for _, habit_id, _ in items})
+        cursor = self.db.habits.find(
+            {"user_id": self.user_id, "id": {"$in": habit_ids}}, {"_id": 0, "id": 1}
+        )
+        owned = {doc["id"] async for doc in cursor}
+        kept = []
+        for line, habit_id, upsert in items:
+            if habit_id in owned:
+                kept.append((line, habit_id, upsert))
+            else:
+                self.reject(line, f"unknown habit {habit_id!r}")
+        return kept
+
+    async def write(self, collection: str, items: list) -> None:
+        """Run one unordered bulk write and record its outcome."""
+        report = ImportBatchResult(
+            batch=len(self.result.batches) + 1,
+            collection=collection,
+            received=len(items),
+        )
+        operations = [
+            UpdateOne(query, update, upsert=True) for _, _, (query, update) in items
+        ]
+        try:
+            result = await self.db[collection].bulk_write(operations, ordered=False)
+            details: Mapping[str, Any] = result.bulk_api_result
+        except BulkWriteError as exc:
+            details = exc.details
+        failed = set()
+        for error in details.get("writeErrors", []):
+            failed.add(error["index"])
+            message = f"line {items[error['index']][0]}: {error['errmsg'][:200]}"
+            if len(report.errors) < MAX_ERRORS:
+                report.errors.append(message)
+
+        report.inserted = details.get("nUpserted", 0)
+        report.updated = details.get("nModified", 0)
+        report.unchanged = details.get("nMatched", 0) - report.updated
+        self.result.batches.append(report)
+
+        written = [item for index, item in enumerate(items) if index not in failed]
+        if report.inserted or report.updated:
+            changed = [query for _, _, (query, _) in written]
+            await record_change(self.db, self.user_id, collection, {"$or": changed})
+        self.result.skipped += len(failed)
+        setattr(
+            self.result, collection, getattr(self.result, collection) + len(written)
+        )
+        if collection != "categories":
+            self.touched_habits.update(habit_id for _, habit_id, _ in written)
+
+    async def finish(self) -> ImportResult:
+        """Flush remaining records and invalidate derived data they affect."""
+        await self.flush()
+        await completions_rewritten(self.db, self.user_id, list(self.touched_habits))
+        if self.result.habits or self.result.categories:
+            await rebuild_category_counts(self.db, self.user_id)
+        if self.result.batches:
+            await invalidate_rollups(self.db, self.user_id)
+            await enqueue(self.db, self.user_id, "rebuild_rollups")
+            # Cached reads of the stats rebuilt above must revalidate too.
+            await bump_data_version(self.db, self.user_id)
+        return self.result
+
+
+async def import_ndjson(importer: Importer, lines: AsyncIterator[str]) -> None:
+    """Import ``{"type": ..., "data": {...}}`` lines as written by the export."""
+    async for line in lines:
+        importer.result.lines += 1
+        number = importer.result.lines
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as exc:
+            importer.reject(number, f"invalid JSON ({exc.msg})")
+            continue
+        if not isinstance(record, dict):
+            importer.reject(number, "expected a JSON object")
+            continue
+        if record.get("type") in ("export", "analytics"):
+            continue  # Export header and summary lines carry no records.
+        if not isinstance(record.get("data"), dict):
+            importer.reject(number, "expected an object with 'type' and 'data'")
+            continue
+        await importer.add(number, str(record.get("type")), record["data"])
+
+
+class LineFeed:
+    """Iterator handing queued lines to a ``csv.reader`` one at a time."""
+
+    def __init__(self) -> None:
+        self.lines: deque[str] = deque()
+
+    def __iter__(self) -> "LineFeed":
+        return self
+
+    def __next__(self) -> str:
+        if not self.lines:
+            raise StopIteration
+        return self.lines.popleft()
+
+
+async def import_csv(importer: Importer, lines: AsyncIterator[str]) -> None:
+    """Import CSV rows with a header line.
+
+    A ``type`` column selects the record type and defaults to ``completion``;
+    completions may name their habit with ``habit_name`` instead of
+    ``habit_id``, in which case missing habits are created. Empty cells fall
+    back to model defaults. Quoted fields may span lines; a row is parsed once
+    its quotes balance and errors refer to its first line.
+    """
+    feed = LineFeed()
+    reader = csv.reader(feed)
+    header: list[str] | None = None
+    quotes = 0
+    number = 0
+    async for line in lines:
+        importer.result.lines += 1
+        if not feed.lines:
+            number = importer.result.lines
+            if not line.strip():
+                continue
+        feed.lines.append(line + "\n")
+        quotes += line.count('"')
+        if quotes % 2:
+            continue  # Inside a quoted field; the row continues on the next line.
+        quotes = 0
+        row = next(reader)
+        if header is None:
+            header = [column.strip().lower() for column in row]
+            continue
+        if len(row) != len(header):
+            importer.reject(number, f"expected {len(header)} columns, got {len(row)}")
+            continue
+        data = {key: value for key, value in zip(header, row) if value != ""}
+        record_type = data.pop("type", "completion")
+        await importer.add(number, record_type, data)
+    if feed.lines:
+        importer.reject(number, "unterminated quoted field")
@@ -0,0 +1,352 @@
+"""Durable background jobs.
+
+Work too slow for a request - cascade deletes, account deletion, rollup
+rebuilds - is queued as a ``jobs`` document and the request returns the job
+at once; its owner polls ``GET /api/jobs/{id}``. A job that outlives its
+owner's credentials (account deletion) is queued with a status token, which
+the caller receives once and presents instead. A pool of ``job_workers``
+asyncio tasks claims queued jobs with ``find_one_and_update``, which takes a
+lease for ``job_lease_seconds``. Handlers work in chunks of
+``job_chunk_size`` documents and checkpoint after each one, which renews the
+lease and records progress; a job whose worker died is claimed again once
+its lease runs out. Handlers must therefore be idempotent.
+
+A failed attempt is retried with exponential backoff until
+``job_max_attempts`` is reached, after which the job is marked failed.
+Finished jobs expire after a week through a TTL index on ``finished_at``.
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import secrets
+import socket
+from collections.abc import Awaitable, Callable
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReturnDocument
+
+from app.core.config import Settings
+from app.models.job import Job, JobStatus
+from app.services.bitmaps import delete_bitmaps
+from app.services.habit_stats import delete_habit_stats
+from app.services.rollups import ensure_rollups, recount_completions
+
+logger = logging.getLogger(__name__)
+
+JOB_FIELDS = {"_id": 0, **{name: 1 for name in Job.model_fields}}
+# Collections holding a user's data, largest first. The ``users`` document
+# itself is deleted by the request that queues the job.
+USER_COLLECTIONS = (
+    "completions",
+    "completion_bitmaps",
+    "daily_rollups",
+    "habit_stats",
+    "tombstones",
+    "categories",
+    "habits",
+    "refresh_tokens",
+)
+
+
+class LeaseLost(Exception):
+    """Raised when another worker has taken over a job."""
+
+
+class JobContext:
+    """A claimed job as seen by its handler."""
+
+    def __init__(
+        self, db: AsyncIOMotorDatabase, job: dict, owner: str, lease: timedelta
+    ):
+        self.db = db
+        self.job = job
+        self.owner = owner
+        self.lease = lease
+
+    @property
+    def user_id(self) -> str:
+        user_id: str = self.job["user_id"]
+        return user_id
+
+    @property
+    def params(self) -> dict:
+        params: dict = self.job.get("params", {})
+        return params
+
+    async def checkpoint(self, done: int) -> None:
+        """Add ``done`` to the job's progress and renew the lease."""
+        now = datetime.now(timezone.utc)
+        result = await self.db.jobs.update_one(
+            {"id": self.job["id"], "owner": self.owner},
+            {
+                "$set": {"lease_until": now + self.lease, "updated_at": now},
+                "$inc": {"progress": done},
+            },
+        )
+        if result.matched_count == 0:
+            raise LeaseLost(self.job["id"])
+
+
+Handler = Callable[[JobContext, int], Awaitable[None]]
+HANDLERS: dict[str, Handler] = {}
+
+
+def handler(kind: str) -> Callable[[Handler], Handler]:
+    """Register the handler for jobs of ``kind``."""
+
+    def register(func: Handler) -> Handler:
+        HANDLERS[kind] = func
+        return func
+
+    return register
+
+
+def token_digest(token: str) -> str:
+    """Digest under which a job status token is stored."""
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+async def enqueue(
+    db: AsyncIOMotorDatabase,
+    user_id: str,
+    kind: str,
+    params: dict | None = None,
+    with_token: bool = False,
+) -> dict:
+    """Queue a job to run as soon as a worker is free.
+
+    With ``with_token`` the returned job carries a ``status_token`` that reads
+    its status without logging in; only its digest is stored.
+    """
+    if kind not in HANDLERS:
+        raise ValueError(f"Unknown job kind: {kind}")
+    now = datetime.now(timezone.utc)
+    job = {
+        "id": str(uuid4()),
+        "user_id": user_id,
+        "kind": kind,
+        "params": params or {},
+        "status": JobStatus.QUEUED.value,
+        "progress": 0,
+        "attempts": 0,
+        "error": None,
+        "run_after": now,
+        "created_at": now,
+        "updated_at": now,
+        "finished_at": None,
+    }
+    token = secrets.token_urlsafe(32) if with_token else None
+    if token is not None:
+        job["token_hash"] = token_digest(token)
+    await db.jobs.insert_one(job)
+    job.pop("_id", None)
+    job.pop("token_hash", None)
+    if token is not None:
+        job["status_token"] = token
+    return job
+
+
+async def get_job(db: AsyncIOMotorDatabase, user_id: str, job_id: str) -> dict | None:
+    """One of a user's jobs, or ``None``."""
+    return await db.jobs.find_one({"id": job_id, "user_id": user_id}, JOB_FIELDS)
+
+
+async def get_job_by_token(
+    db: AsyncIOMotorDatabase, job_id: str, token: str
+) -> dict | None:
+    """A job whose status token is ``token``, or ``None``."""
+    return await db.jobs.find_one(
+        {"id": job_id, "token_hash": token_digest(token)}, JOB_FIELDS
+    )
+
+
+def retry_delay(attempts: int) -> timedelta:
+    """Backoff before the next attempt: 2, 4, 8... seconds, capped at 5 minutes."""
+    return timedelta(seconds=min(2**attempts, 300))
+
+
+async def delete_chunked(
+    ctx: JobContext,
+    collection: str,
+    query: dict,
+    chunk_size: int,
+    on_chunk: Callable[[list[dict]], Awaitable[None]] | None = None,
+    fields: dict | None = None,
+) -> None:
+    """Delete the documents matching ``query`` ``chunk_size`` at a time.
+
+    ``on_chunk`` sees each chunk's documents (``_id`` plus ``fields``) once
+    they are deleted.
+    """
+    projection = {"_id": 1, **(fields or {})}
+    while True:
+        docs = (
+            await ctx.db[collection]
+            .find(query, projection)
+            .limit(chunk_size)
+            .to_list(chunk_size)
+        )
+        if not docs:
+            return
+        await ctx.db[collection].delete_many({"_id": {"$in": [d["_id"] for d in docs]}})
+        if on_chunk is not None:
+            await on_chunk(docs)
+        await ctx.checkpoint(len(docs))
+
+
+@handler("delete_habit")
+async def delete_habit_data(ctx: JobContext, chunk_size: int) -> None:
+    """Remove a deleted habit's completions and derived data."""
+    habit_id = ctx.params["habit_id"]
+
+    async def recount(docs: list[dict]) -> None:
+        dates = sorted({doc["date"] for doc in docs if doc.get("completed")})
+        await recount_completions(ctx.db, ctx.user_id, dates)
+
+    await delete_chunked(
+        ctx,
+        "completions",
+        {"user_id": ctx.user_id, "habit_id": habit_id},
+        chunk_size,
+        on_chunk=recount,
+        fields={"date": 1, "completed": 1},
+    )
+    await delete_habit_stats(ctx.db, ctx.user_id, habit_id)
+    await delete_bitmaps(ctx.db, ctx.user_id, habit_id)
+
+
+@handler("delete_account")
+async def delete_account_data(ctx: JobContext, chunk_size: int) -> None:
+    """Remove every document belonging to a deleted account."""
+    for collection in USER_COLLECTIONS:
+        await delete_chunked(ctx, collection, {"user_id": ctx.user_id}, chunk_size)
+
+
+@handler("rebuild_rollups")
+async def rebuild_user_rollups(ctx: JobContext, chunk_size: int) -> None:
+    """Rebuild a user's daily rollups unless a read already did."""
+    await ensure_rollups(ctx.db, ctx.user_id)
+
+
+class JobWorkerPool:
+    """Runs queued jobs on ``job_workers`` background tasks."""
+
+    def __init__(self, db: AsyncIOMotorDatabase, settings: Settings):
+        self.db = db
+        self.workers = settings.job_workers
+        self.poll_interval = settings.job_poll_interval_seconds
+        self.lease = timedelta(seconds=settings.job_lease_seconds)
+        self.max_attempts = settings.job_max_attempts
+        self.chunk_size = settings.job_chunk_size
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid4().hex[:8]}"
+        self.tasks: list[asyncio.Task] = []
+
+    def start(self) -> None:
+        self.tasks = [
+            asyncio.create_task(self.run(), name=f"job-worker-{n}")
+            for n in range(self.workers)
+        ]
+
+    async def stop(self) -> None:
+        for task in self.tasks:
+            task.cancel()
+        # A job interrupted here is picked up again when its lease expires.
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+
+    async def run(self) -> None:
+        """Run jobs while there are any, polling when the queue is empty."""
+        while True:
+            try:
+                job = await self.claim()
+            except Exception:
+                logger.exception("Claiming a job failed")
+                job = None
+            if job is None:
+                await asyncio.sleep(self.poll_interval)
+                continue
+            try:
+                await self.execute(job)
+            except Exception:
+                # Recording the outcome failed; the job runs again once its
+                # lease expires.
+                logger.exception("Running job %s (%s) failed", job["id"], job["kind"])
+
+    async def claim(self) -> dict | None:
+        """Lease the oldest runnable job: queued and due, or abandoned."""
+        now = datetime.now(timezone.utc)
+        job: dict | None = await self.db.jobs.find_one_and_update(
+            {
+                "$or": [
+                    {"status": JobStatus.QUEUED.value, "run_after": {"$lte": now}},
+                    {"status": JobStatus.RUNNING.value, "lease_until": {"$lte": now}},
+                ]
+            },
+            {
+                "$set": {
+                    "status": JobStatus.RUNNING.value,
+                    "owner": self.owner,
+                    "lease_until": now + self.lease,
+                    "updated_at": now,
+                },
+                "$inc": {"attempts": 1},
+            },
+            sort=[("run_after", 1)],
+            return_document=ReturnDocument.AFTER,
+        )
+        return job
+
+    async def execute(self, job: dict) -> None:
+        """Run a claimed job and record how it ended."""
+        func = HANDLERS.get(job["kind"])
+        try:
+            if func is None:
+                raise ValueError(f"Unknown job kind: {job['kind']}")
+            if job["attempts"] > self.max_attempts:
+                # Its workers kept dying before they could record a failure.
+                raise RuntimeError("Lease expired too many times")
+            await func(
+                JobContext(self.db, job, self.owner, self.lease), self.chunk_size
+            )
+        except LeaseLost:
+            logger.warning("Lost the lease on job %s", job["id"])
+            return
+        except Exception as exc:
+            logger.exception("Job %s (%s) failed", job["id"], job["kind"])
+            await self.failed(job, exc)
+            return
+        await self.finish(job, {"status": JobStatus.SUCCEEDED.value})
+
+    async def failed(self, job: dict, exc: Exception) -> None:
+        """Retry a failed attempt later, or give up after the last one."""
+        error = f"{type(exc).__name__}: {exc}"[:500]
+        if job["attempts"] >= self.max_attempts or job["kind"] not in HANDLERS:
+            await self.finish(job, {"status": JobStatus.FAILED.value, "error": error})
+            return
+        now = datetime.now(timezone.utc)
+        await self.db.jobs.update_one(
+            {"id": job["id"], "owner": self.owner},
+            {
+                "$set": {
+                    "status": JobStatus.QUEUED.value,
+                    "error": error,
+                    "run_after": now + retry_delay(job["attempts"]),
+                    "updated_at": now,
+                },
+                "$unset": {"owner": "", "lease_until": ""},
+            },
+        )
+
+    async def finish(self, job: dict, fields: dict) -> None:
+        now = datetime.now(timezone.utc)
+        await self.db.jobs.update_one(
+            {"id": job["id"], "owner": self.owner},
+            {
+                "$set": {**fields, "updated_at": now, "finished_at": now},
+                "$unset": {"owner": "", "lease_until": ""},
+            },
+        )
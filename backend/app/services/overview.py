@@ -0,0 +1,55 @@
+"""Account-wide analytics summary.
+
+Combines the habit list with materialized per-habit stats, daily rollups and
+category counters, so none of its inputs grow with the completion history.
+"""
+
+from datetime import date, timedelta
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from app.models.analytics import DailyStats, OverallAnalytics
+from app.services.analytics import daily_stats, get_user_habits, percentage
+from app.services.categories import UNCATEGORIZED, category_counts
+from app.services.habit_stats import get_habit_stats
+
+
+async def overall_analytics(
+    db: AsyncIOMotorDatabase, user_id: str, today: date
+) -> OverallAnalytics:
+    """Totals, recent completion rates and the best current streak of a user.
+
+    Reads the user's habits, their materialized stats and at most 30 daily
+    rollups, so the cost does not grow with the completion history.
+    """
+    habits = await get_user_habits(db, user_id)
+    stats = await get_habit_stats(db, user_id, [habit["id"] for habit in habits], today)
+    days = await daily_stats(db, user_id, habits, today - timedelta(days=29), today)
+
+    archived = sum(1 for habit in habits if habit.get("is_archived", False))
+    by_category = await category_counts(db, user_id)
+    uncategorized = len(habits) - archived - sum(by_category.values())
+    if uncategorized > 0:
+        by_category[UNCATEGORIZED] = by_category.get(UNCATEGORIZED, 0) + uncategorized
+
+    names = {habit["id"]: habit["name"] for habit in habits}
+    best_id = max(
+        stats, key=lambda habit_id: stats[habit_id]["current_streak"], default=None
+    )
+    best = stats[best_id]["current_streak"] if best_id else 0
+
+    def window_rate(window: list[DailyStats]) -> float:
+        completed = sum(day.completed_count for day in window)
+        return percentage(completed, sum(day.total_habits for day in window))
+
+    return OverallAnalytics(
+        total_habits=len(habits),
+        active_habits=len(habits) - archived,
+        archived_habits=archived,
+        total_completions=sum(row["total_completions"] for row in stats.values()),
+        overall_completion_rate_7d=window_rate(days[-7:]),
+        overall_completion_rate_30d=window_rate(days),
+        current_best_streak_habit=names.get(best_id) if best else None,
+        current_best_streak=best,
+        habits_by_category=by_category,
+    )
@@ -0,0 +1,84 @@
+"""Rotating refresh tokens.
+
+Each login starts a token *family*. Exchanging a refresh token marks it used
+and issues its successor in the same family. Presenting an already-used token
+means it was copied, so the whole family is revoked and its holder has to log
+in again. Only SHA-256 digests are stored, and a TTL index on ``expires_at``
+removes expired tokens.
+"""
+
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from app.core.config import get_settings
+from app.core.security import generate_refresh_token, hash_refresh_token
+
+
+class RefreshTokenError(Exception):
+    """Raised when a refresh token cannot be exchanged."""
+
+
+async def issue_refresh_token(
+    db: AsyncIOMotorDatabase, user_id: str, family_id: str | None = None
+) -> str:
+    """Create and store a refresh token, starting a new family by default."""
+    now = datetime.now(timezone.utc)
+    token = generate_refresh_token()
+    await db.refresh_tokens.insert_one(
+        {
+            "token_hash": hash_refresh_token(token),
+            "user_id": user_id,
+            "family_id": family_id or str(uuid4()),
+            "created_at": now,
+            "expires_at": now
+            + timedelta(days=get_settings().refresh_token_expire_days),
+            "used_at": None,
+            "revoked": False,
+        }
+    )
+    return token
+
+
+async def rotate_refresh_token(db: AsyncIOMotorDatabase, token: str) -> tuple[str, str]:
+    """Exchange a refresh token for its successor.
+
+    Returns ``(user_id, new_token)``.
+    """
+    now = datetime.now(timezone.utc)
+    token_hash = hash_refresh_token(token)
+    current = await db.refresh_tokens.find_one_and_update(
+        {
+            "token_hash": token_hash,
+            "used_at": None,
+            "revoked": False,
+            "expires_at": {"$gt": now},
+        },
+        {"$set": {"used_at": now}},
+    )
+    if current is None:
+        stale = await db.refresh_tokens.find_one({"token_hash": token_hash})
+        if stale is not None and stale["used_at"] is not None:
+            await revoke_family(db, stale["family_id"])
+            raise RefreshTokenError("Refresh token reuse detected")
+        raise RefreshTokenError("Invalid or expired refresh token")
+
+    new_token = await issue_refresh_token(db, current["user_id"], current["family_id"])
+    return current["user_id"], new_token
+
+
+async def revoke_family(db: AsyncIOMotorDatabase, family_id: str) -> None:
+    """Revoke every token descended from the same login."""
+    await db.refresh_tokens.update_many(
+        {"family_id": family_id}, {"$set": {"revoked": True}}
+    )
+
+
+async def revoke_refresh_token(db: AsyncIOMotorDatabase, token: str) -> None:
+    """Revoke the family of a refresh token (logout)."""
+    doc = await db.refresh_tokens.find_one(
+        {"token_hash": hash_refresh_token(token)}, {"family_id": 1}
+    )
+    if doc is not None:
+        await revoke_family(db, doc["family_id"])
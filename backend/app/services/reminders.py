@@ -0,0 +1,194 @@
+"""Habit reminder scheduler.
+
+Reminder times are ``HH:MM`` in UTC, so each minute of the day is one slot
+of a 1440-slot timing wheel. Rather than holding individual reminders in
+memory, the scheduler wakes once a minute and streams the slot's habits
+from the ``(reminder_enabled, reminder_time, id)`` index in ``id`` order,
+``reminder_batch_size`` at a time, handing each batch to a sink. Memory
+stays bounded by the batch size however many reminders are enabled.
+
+Workers coordinate through one ``reminder_slots`` document per minute,
+which acts as a lease: only its owner delivers the slot, and it records the
+last delivered habit id after every batch. A worker that dies mid-slot
+loses its lease, and the next worker resumes after the checkpoint, so a
+reminder is delivered once unless a worker dies between delivering a batch
+and recording it. Slots missed while no worker was running are caught up
+for ``reminder_catchup_minutes``.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import socket
+import urllib.request
+from datetime import datetime, timedelta, timezone
+from typing import Protocol
+from uuid import uuid4
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from app.core.config import Settings
+
+logger = logging.getLogger(__name__)
+
+SLOT_FORMAT = "%Y-%m-%dT%H:%M"
+REMINDER_FIELDS = {"_id": 0, "id": 1, "user_id": 1, "name": 1, "reminder_time": 1}
+
+
+class ReminderSink(Protocol):
+    """Destination for due reminders."""
+
+    async def deliver(self, slot: str, reminders: list[dict]) -> None: ...
+
+
+class LogSink:
+    """Writes reminder batches to the application log."""
+
+    async def deliver(self, slot: str, reminders: list[dict]) -> None:
+        logger.info("Reminder slot %s: %d reminder(s)", slot, len(reminders))
+
+
+class WebhookSink:
+    """POSTs each reminder batch as JSON to a URL."""
+
+    def __init__(self, url: str, timeout: float = 10.0):
+        self.url = url
+        self.timeout = timeout
+
+    async def deliver(self, slot: str, reminders: list[dict]) -> None:
+        body = json.dumps({"slot": slot, "reminders": reminders}).encode()
+        request = urllib.request.Request(
+            self.url, data=body, headers={"Content-Type": "application/json"}
+        )
+        await asyncio.to_thread(self._post, request)
+
+    def _post(self, request: urllib.request.Request) -> None:
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+
+def make_sink(settings: Settings) -> ReminderSink:
+    """Build the sink selected by ``reminder_sink``."""
+    if settings.reminder_sink == "webhook":
+        if not settings.reminder_webhook_url:
+            raise ValueError("REMINDER_WEBHOOK_URL is required for the webhook sink")
+        return WebhookSink(settings.reminder_webhook_url)
+    return LogSink()
+
+
+def due_slots(now: datetime, catchup_minutes: int) -> list[str]:
+    """Slot ids from ``catchup_minutes`` ago up to the current minute."""
+    current = now.replace(second=0, microsecond=0)
+    return [
+        (current - timedelta(minutes=offset)).strftime(SLOT_FORMAT)
+        for offset in range(catchup_minutes, -1, -1)
+    ]
+
+
+class ReminderScheduler:
+    """Delivers due reminders once a minute from a background task."""
+
+    def __init__(
+        self, db: AsyncIOMotorDatabase, sink: ReminderSink, settings: Settings
+    ):
+        self.db = db
+        self.sink = sink
+        self.batch_size = settings.reminder_batch_size
+        self.lease = timedelta(seconds=settings.reminder_lease_seconds)
+        self.catchup_minutes = settings.reminder_catchup_minutes
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid4().hex[:8]}"
+        self.task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        self.task = asyncio.create_task(self.run(), name="reminder-scheduler")
+
+    async def stop(self) -> None:
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+    async def run(self) -> None:
+        """Process due slots, then sleep until the next minute starts."""
+        while True:
+            now = datetime.now(timezone.utc)
+            for slot in due_slots(now, self.catchup_minutes):
+                try:
+                    await self.run_slot(slot)
+                except Exception:
+                    # The lease stays ours; the next pass resumes the slot.
+                    logger.exception("Reminder slot %s failed", slot)
+            now = datetime.now(timezone.utc)
+            await asyncio.sleep(60 - now.second - now.microsecond / 1_000_000)
+
+    async def claim(self, slot: str) -> dict | None:
+        """Take or renew the lease on an unfinished slot."""
+        now = datetime.now(timezone.utc)
+        try:
+            state: dict | None = await self.db.reminder_slots.find_one_and_update(
+                {
+                    "_id": slot,
+                    "done": False,
+                    "$or": [{"lease_until": {"$lte": now}}, {"owner": self.owner}],
+                },
+                {
+                    "$set": {"owner": self.owner, "lease_until": now + self.lease},
+                    "$setOnInsert": {"last_id": "", "sent": 0, "created_at": now},
+                },
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+        except DuplicateKeyError:
+            # Finished, or leased by another worker.
+            return None
+        return state
+
+    async def run_slot(self, slot: str) -> int:
+        """Deliver a slot's remaining reminders; returns how many were sent."""
+        state = await self.claim(slot)
+        if state is None:
+            return 0
+
+        query = {
+            "reminder_enabled": True,
+            "reminder_time": slot[-5:],
+            "is_archived": {"$ne": True},
+        }
+        last_id, sent = state["last_id"], 0
+        while True:
+            batch = (
+                await self.db.habits.find(
+                    {**query, "id": {"$gt": last_id}}, REMINDER_FIELDS
+                )
+                .sort("id", 1)
+                .limit(self.batch_size)
+                .to_list(self.batch_size)
+            )
+            if not batch:
+                break
+            await self.sink.deliver(slot, batch)
+            last_id, sent = batch[-1]["id"], sent + len(batch)
+            checkpoint = await self.db.reminder_slots.update_one(
+                {"_id": slot, "owner": self.owner},
+                {
+                    "$set": {
+                        "last_id": last_id,
+                        "lease_until": datetime.now(timezone.utc) + self.lease,
+                    },
+                    "$inc": {"sent": len(batch)},
+                },
+            )
+            if checkpoint.matched_count == 0:
+                logger.warning("Lost the lease on reminder slot %s", slot)
+                return sent
+
+        await self.db.reminder_slots.update_one(
+            {"_id": slot, "owner": self.owner}, {"$set": {"done": True}}
+        )
+        return sent
@@ -0,0 +1,258 @@
+"""Per-user daily rollups.
+
+One ``daily_rollups`` document per user and day holds ``completed_count``
+(completions of active habits dated that day) and ``habit_delta`` (active
+habits created that day). A day's ``total_habits`` is the user's current
+active habit count minus the deltas recorded after it, so a date-range read
+of rollups yields ``DailyStats`` without scanning ``completions``.
+
+Archived habits count towards neither figure, on any day: archiving a habit
+takes its creation off ``habit_delta`` and re-counts the days it was
+completed on, and unarchiving puts both back. Deleting does the same, with
+the completions re-counted as the deletion job removes them. A day's
+completion rate therefore never counts completions of habits outside its
+total.
+
+Single writes ``$inc`` the affected day. Bulk writes re-count the dates they
+touched, and imports mark the user's rollups unbuilt and queue a
+``rebuild_rollups`` job; a read that comes first rebuilds them itself.
+``rebuild_rollups`` also backs the CLI backfill. Dates are UTC.
+
+Every write to a day also increments its ``version``, and every
+invalidation the user's ``rollups_gen``, so a rebuild can tell which of the
+figures it computed were overtaken by writes made while it ran.
+"""
+
+from collections.abc import Mapping
+from datetime import date, datetime, timedelta, timezone
+from typing import Any
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError
+
+
+def utc_today() -> str:
+    """Today's date in UTC as ``YYYY-MM-DD``."""
+    return datetime.now(timezone.utc).date().isoformat()
+
+
+def created_day(habit: dict) -> str:
+    """UTC date a habit was created on."""
+    return str(habit.get("created_at") or utc_today())[:10]
+
+
+async def active_habit_ids(db: AsyncIOMotorDatabase, user_id: str) -> list[str]:
+    """Ids of a user's unarchived habits."""
+    return await db.habits.distinct(
+        "id", {"user_id": user_id, "is_archived": {"$ne": True}}
+    )
+
+
+async def record_completion(
+    db: AsyncIOMotorDatabase, user_id: str, day: str, completed: bool
+) -> None:
+    """Count a completion on ``day`` becoming ``completed`` (or not)."""
+    await db.daily_rollups.update_one(
+        {"user_id": user_id, "date": day},
+        {"$inc": {"completed_count": 1 if completed else -1, "version": 1}},
+        upsert=True,
+    )
+
+
+async def record_habit_delta(
+    db: AsyncIOMotorDatabase, user_id: str, habit: dict, delta: int
+) -> None:
+    """Count ``habit`` as gaining (+1) or losing (-1) active status."""
+    await db.daily_rollups.update_one(
+        {"user_id": user_id, "date": created_day(habit)},
+        {"$inc": {"habit_delta": delta, "version": 1}},
+        upsert=True,
+    )
+
+
+async def habit_archive_changed(
+    db: AsyncIOMotorDatabase, user_id: str, habit: dict, archived: bool
+) -> None:
+    """Take an archived habit out of the rollups, or put it back."""
+    await record_habit_delta(db, user_id, habit, -1 if archived else 1)
+    dates = await db.completions.distinct(
+        "date", {"user_id": user_id, "habit_id": habit["id"], "completed": True}
+    )
+    await recount_completions(db, user_id, sorted(dates))
+
+
+async def recount_completions(
+    db: AsyncIOMotorDatabase, user_id: str, dates: list[str]
+) -> None:
+    """Recompute ``completed_count`` for ``dates`` after a bulk write."""
+    if not dates:
+        return
+    pipeline: list[dict] = [
+        {
+            "$match": {
+                "user_id": user_id,
+                "habit_id": {"$in": await active_habit_ids(db, user_id)},
+                "date": {"$in": dates},
+                "completed": True,
+            }
+        },
+        {"$group": {"_id": "$date", "count": {"$sum": 1}}},
+    ]
+    counts = {
+        row["_id"]: row["count"] async for row in db.completions.aggregate(pipeline)
+    }
+    await db.daily_rollups.bulk_write(
+        [
+            UpdateOne(
+                {"user_id": user_id, "date": day},
+                {
+                    "$set": {"completed_count": counts.get(day, 0)},
+                    "$inc": {"version": 1},
+                },
+                upsert=True,
+            )
+            for day in dates
+        ],
+        ordered=False,
+    )
+
+
+async def invalidate_rollups(db: AsyncIOMotorDatabase, user_id: str) -> None:
+    """Have a user's rollups rebuilt on their next read."""
+    await db.users.update_one(
+        {"id": user_id},
+        {"$set": {"rollups_built": False}, "$inc": {"rollups_gen": 1}},
+    )
+
+
+async def rebuild_rollups(db: AsyncIOMotorDatabase, user_id: str) -> int:
+    """Recompute every rollup of a user from habits and completions.
+
+    The user's ``rollups_gen`` is stamped and every day's ``version`` read
+    before aggregating. Each day is then written with its own ``$set``,
+    conditional on its version being unchanged (or, for a new day, on it
+    still not existing), and days that existed before the rebuild and no
+    longer have any figures are zeroed. If any write lost that race, the
+    rollups are left unbuilt for the next read to rebuild rather than
+    overwrite the concurrent ``$inc``; they are only marked built if no
+    invalidation or other rebuild stamped the user meanwhile.
+    Returns the number of documents written.
+    """
+    user = await db.users.find_one_and_update(
+        {"id": user_id},
+        {"$inc": {"rollups_gen": 1}},
+        projection={"_id": 0, "rollups_gen": 1},
+        return_document=ReturnDocument.AFTER,
+    )
+    if user is None:
+        return 0
+    versions = {
+        doc["date"]: doc.get("version")
+        async for doc in db.daily_rollups.find(
+            {"user_id": user_id}, {"_id": 0, "date": 1, "version": 1}
+        )
+    }
+    rollups = {day: {"completed_count": 0, "habit_delta": 0} for day in versions}
+
+    habit_ids = []
+    async for habit in db.habits.find(
+        {"user_id": user_id, "is_archived": {"$ne": True}},
+        {"_id": 0, "id": 1, "created_at": 1},
+    ):
+        habit_ids.append(habit["id"])
+        day = rollups.setdefault(
+            created_day(habit), {"completed_count": 0, "habit_delta": 0}
+        )
+        day["habit_delta"] += 1
+    pipeline: list[dict] = [
+        {
+            "$match": {
+                "user_id": user_id,
+                "habit_id": {"$in": habit_ids},
+                "completed": True,
+            }
+        },
+        {"$group": {"_id": "$date", "count": {"$sum": 1}}},
+    ]
+    async for row in db.completions.aggregate(pipeline):
+        day = rollups.setdefault(row["_id"], {"completed_count": 0, "habit_delta": 0})
+        day["completed_count"] = row["count"]
+
+    written, clean = 0, True
+    if rollups:
+        requests = [
+            (
+                UpdateOne(
+                    {"user_id": user_id, "date": day, "version": versions[day]},
+                    {"$set": figures, "$inc": {"version": 1}},
+                )
+                if day in versions
+                else UpdateOne(
+                    {"user_id": user_id, "date": day},
+                    {"$setOnInsert": {**figures, "version": 1}},
+                    upsert=True,
+                )
+            )
+            for day, figures in rollups.items()
+        ]
+        try:
+            result = await db.daily_rollups.bulk_write(requests, ordered=False)
+            counts: Mapping[str, Any] = result.bulk_api_result
+        except BulkWriteError as exc:
+            counts = exc.details  # A concurrent write inserted a new day first.
+        written = counts["nModified"] + counts["nUpserted"]
+        clean = counts["nModified"] == len(versions) and counts["nUpserted"] == (
+            len(rollups) - len(versions)
+        )
+    await db.users.update_one(
+        {"id": user_id, "rollups_gen": user["rollups_gen"]},
+        {"$set": {"rollups_built": clean}},
+    )
+    return written
+
+
+async def ensure_rollups(db: AsyncIOMotorDatabase, user_id: str) -> None:
+    """Build a user's rollups if they were never built or were invalidated."""
+    user = await db.users.find_one({"id": user_id}, {"_id": 0, "rollups_built": 1})
+    if user is not None and not user.get("rollups_built"):
+        await rebuild_rollups(db, user_id)
+
+
+async def daily_totals(
+    db: AsyncIOMotorDatabase,
+    user_id: str,
+    active_habits: int,
+    start: date,
+    end: date,
+) -> list[tuple[str, int, int]]:
+    """``(date, completed_count, total_habits)`` for every day in ``[start, end]``.
+
+    Reads the rollups from ``start`` onwards: those in range give the counts
+    and the later ones walk ``active_habits`` back to each day's total.
+    """
+    await ensure_rollups(db, user_id)
+    docs = await (
+        db.daily_rollups.find(
+            {"user_id": user_id, "date": {"$gte": start.isoformat()}}, {"_id": 0}
+        )
+        .sort("date", -1)
+        .to_list(None)
+    )
+
+    completed = {doc["date"]: doc.get("completed_count", 0) for doc in docs}
+    later = iter(docs)
+    pending = next(later, None)
+    total = active_habits
+    totals = []
+    day = end
+    while day >= start:
+        key = day.isoformat()
+        # Undo the habit changes made after this day.
+        while pending is not None and pending["date"] > key:
+            total -= pending.get("habit_delta", 0)
+            pending = next(later, None)
+        totals.append((key, max(completed.get(key, 0), 0), max(total, 0)))
+        day -= timedelta(days=1)
+    totals.reverse()
+    return totals
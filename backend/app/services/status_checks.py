@@ -0,0 +1,192 @@
+"""Status check storage.
+
+``status_checks`` is a MongoDB time-series collection with ``timestamp`` as
+its time field and ``client_name`` as its meta field, so each client's
+checks are stored together in compressed buckets and the server removes
+buckets older than ``status_retention_days``. Timestamps are native BSON
+datetimes, and range reads are downsampled on the server with
+``$dateTrunc`` into per-minute or per-hour counts.
+
+``ensure_status_collection`` creates the collection at startup and keeps
+its retention in line with the settings. A ``status_checks`` created as a
+regular collection, with ISO string timestamps, is left alone until it is
+converted with ``python -m app.cli migrate-status-checks``.
+"""
+
+import logging
+from datetime import datetime, timedelta
+from typing import Any
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.errors import CollectionInvalid
+
+from app.core.config import Settings
+from app.models.status import StatusBucketUnit
+
+logger = logging.getLogger(__name__)
+
+COLLECTION = "status_checks"
+LEGACY_COLLECTION = "status_checks_legacy"
+TIMESERIES = {
+    "timeField": "timestamp",
+    "metaField": "client_name",
+    "granularity": "seconds",
+}
+BUCKET_WIDTHS = {
+    StatusBucketUnit.MINUTE: timedelta(minutes=1),
+    StatusBucketUnit.HOUR: timedelta(hours=1),
+}
+# Most buckets per client a single range read may produce.
+MAX_BUCKETS = 10_000
+
+
+def retention_seconds(settings: Settings) -> int | None:
+    """Seconds status checks are kept for, or ``None`` to keep them forever."""
+    if settings.status_retention_days <= 0:
+        return None
+    return settings.status_retention_days * 86_400
+
+
+async def collection_info(db: AsyncIOMotorDatabase, name: str) -> dict[str, Any] | None:
+    """``listCollections`` entry of a collection, or ``None`` if it is missing."""
+    cursor = await db.list_collections(filter={"name": name})
+    infos = await cursor.to_list(1)
+    return dict(infos[0]) if infos else None
+
+
+async def create_status_collection(
+    db: AsyncIOMotorDatabase, settings: Settings
+) -> None:
+    """Create ``status_checks`` as a time-series collection."""
+    options: dict[str, Any] = {"timeseries": TIMESERIES}
+    expire = retention_seconds(settings)
+    if expire is not None:
+        options["expireAfterSeconds"] = expire
+    try:
+        await db.create_collection(COLLECTION, **options)
+    except CollectionInvalid:
+        pass  # Created concurrently by another process.
+
+
+async def ensure_status_collection(
+    db: AsyncIOMotorDatabase, settings: Settings
+) -> None:
+    """Create the time-series collection, or update its retention.
+
+    Must run before ``ensure_indexes``, which would otherwise create
+    ``status_checks`` as a regular collection.
+    """
+    info = await collection_info(db, COLLECTION)
+    if info is None:
+        await create_status_collection(db, settings)
+        return
+    if info.get("type") != "timeseries":
+        logger.warning(
+            "%s is a regular collection; convert it with "
+            "'python -m app.cli migrate-status-checks'",
+            COLLECTION,
+        )
+        return
+    expire = retention_seconds(settings)
+    if info.get("options", {}).get("expireAfterSeconds") != expire:
+        await db.command({"collMod": COLLECTION, "expireAfterSeconds": expire or "off"})
+
+
+async def migrate_status_checks(
+    db: AsyncIOMotorDatabase, settings: Settings, batch_size: int = 1000
+) -> int:
+    """Move a regular ``status_checks`` collection into a time-series one.
+
+    The old collection is renamed aside, the time-series collection created
+    in its place, and the checks copied over in batches with their ISO
+    timestamps parsed, after which the old collection is dropped. Checks
+    older than the retention period are expired by the server afterwards.
+    Returns the number of checks copied.
+    """
+    info = await collection_info(db, COLLECTION)
+    if info is not None and info.get("type") == "timeseries":
+        if await collection_info(db, LEGACY_COLLECTION) is None:
+            return 0  # Already migrated.
+        # Resume an interrupted migration; copies are not deduplicated.
+    elif info is not None:
+        await db[COLLECTION].rename(LEGACY_COLLECTION)
+        await create_status_collection(db, settings)
+    else:
+        await create_status_collection(db, settings)
+        return 0
+
+    copied = 0
+    batch = []
+    async for doc in db[LEGACY_COLLECTION].find({}, {"_id": 0}):
+        if isinstance(doc.get("timestamp"), str):
+            doc["timestamp"] = datetime.fromisoformat(doc["timestamp"])
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            await db[COLLECTION].insert_many(batch, ordered=False)
+            copied += len(batch)
+            batch = []
+    if batch:
+        await db[COLLECTION].insert_many(batch, ordered=False)
+        copied += len(batch)
+    await db[LEGACY_COLLECTION].drop()
+    return copied
+
+
+def range_query(
+    start: datetime | None, end: datetime | None, client_name: str | None
+) -> dict:
+    """Filter selecting checks in ``[start, end)``, optionally of one client."""
+    query: dict = {}
+    if client_name is not None:
+        query["client_name"] = client_name
+    bounds = {}
+    if start is not None:
+        bounds["$gte"] = start
+    if end is not None:
+        bounds["$lt"] = end
+    if bounds:
+        query["timestamp"] = bounds
+    return query
+
+
+def downsample_pipeline(
+    start: datetime, end: datetime, client_name: str | None, unit: StatusBucketUnit
+) -> list[dict]:
+    """Aggregation counting checks per client and ``unit`` in ``[start, end)``."""
+    return [
+        {"$match": range_query(start, end, client_name)},
+        {
+            "$group": {
+                "_id": {
+                    "client_name": "$client_name",
+                    "start": {"$dateTrunc": {"date": "$timestamp", "unit": unit.value}},
+                },
+                "count": {"$sum": 1},
+                "first_seen": {"$min": "$timestamp"},
+                "last_seen": {"$max": "$timestamp"},
+            }
+        },
+        {"$sort": {"_id.start": 1, "_id.client_name": 1}},
+        {
+            "$project": {
+                "_id": 0,
+                "client_name": "$_id.client_name",
+                "start": "$_id.start",
+                "count": 1,
+                "first_seen": 1,
+                "last_seen": 1,
+            }
+        },
+    ]
+
+
+async def downsample(
+    db: AsyncIOMotorDatabase,
+    start: datetime,
+    end: datetime,
+    client_name: str | None,
+    unit: StatusBucketUnit,
+) -> list[dict]:
+    """Per-client check counts for every ``unit`` of ``[start, end)`` with any."""
+    pipeline = downsample_pipeline(start, end, client_name, unit)
+    return await db[COLLECTION].aggregate(pipeline).to_list(None)
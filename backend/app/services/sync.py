@@ -0,0 +1,146 @@
+"""Delta sync over per-user data versions.
+
+Every habit or completion write that changed something bumps the user's
+``data_version`` once it has landed and stamps the new value on the
+documents it wrote as ``sync_version``; deletions leave a tombstone stamped
+the same way. A sync returns the documents stamped after the client's
+cursor, read through ``(user_id, sync_version)`` indexes, so its cost
+follows the number of changes rather than the size of the account.
+
+The cursor returned is the committed version read before querying: below
+it, every stamp has landed. Stamps above it may already be visible and are
+returned too, and again by the next sync; clients apply changes
+idempotently, so repeats are harmless while a missed write would not be.
+
+Changes are returned in pages of about ``limit`` documents that end on a
+version boundary, with ``has_more`` set while later versions remain. The
+cursor also carries the time it was issued: tombstones expire a day after
+``MAX_CURSOR_AGE`` (see ``app.core.indexes``), so an older cursor could
+miss deletions and the client must sync from scratch instead.
+"""
+
+from datetime import datetime, timedelta, timezone
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from app.core.pagination import encode_cursor
+from app.core.serialization import model_projection
+from app.models.habit import CompletionRecord, Habit
+from app.models.sync import SyncChanges
+from app.services.data_version import committed_version, committing_version
+
+MAX_CURSOR_AGE = timedelta(days=30)
+
+
+async def record_change(
+    db: AsyncIOMotorDatabase, user_id: str, collection: str, query: dict
+) -> int:
+    """Bump the data version after a write and stamp it on the written documents.
+
+    ``query`` selects the written documents within the user's ``collection``.
+    Returns the new version.
+    """
+    async with committing_version(db, user_id) as version:
+        await db[collection].update_many(
+            {"user_id": user_id, **query}, {"$max": {"sync_version": version}}
+        )
+    return version
+
+
+async def record_deletion(
+    db: AsyncIOMotorDatabase, user_id: str, collection: str, id: str
+) -> None:
+    """Bump the data version and leave a tombstone for a deleted document."""
+    async with committing_version(db, user_id) as version:
+        await db.tombstones.insert_one(
+            {
+                "user_id": user_id,
+                "collection": collection,
+                "id": id,
+                "sync_version": version,
+                "deleted_at": datetime.now(timezone.utc),
+            }
+        )
+
+
+def version_range(since: int | None, end: int | None) -> dict:
+    """``sync_version`` condition for ``(since, end]``.
+
+    Unstamped documents, from before delta sync, count as below every
+    version.
+    """
+    condition: dict = {}
+    if since is not None:
+        condition["$gt"] = since
+    if end is not None:
+        condition["$not"] = {"$gt": end}
+    return condition
+
+
+def sync_cursor(version: int) -> str:
+    """Cursor resuming after ``version``, stamped with the time it was issued."""
+    return encode_cursor([version, datetime.now(timezone.utc)])
+
+
+async def changes_since(
+    db: AsyncIOMotorDatabase, user_id: str, since: int | None, limit: int
+) -> SyncChanges:
+    """One page of habits, completions and deletions stamped after ``since``.
+
+    The page holds the changes of the oldest versions up to about ``limit``
+    documents; a version's documents are never split, so it may run over by
+    the documents of one write. Without ``since`` the full current state is
+    returned (no tombstones).
+    """
+    version = await committed_version(db, user_id)
+    sources = {
+        "habits": model_projection(Habit),
+        "completions": model_projection(CompletionRecord),
+    }
+    if since is not None:
+        sources["tombstones"] = {"_id": 0, "collection": 1, "id": 1}
+
+    async def read(end: int | None, length: int | None) -> dict[str, list[dict]]:
+        query: dict = {"user_id": user_id}
+        condition = version_range(since, end)
+        if condition:
+            query["sync_version"] = condition
+        pages = {}
+        for name, projection in sources.items():
+            cursor = db[name].find(query, {**projection, "sync_version": 1})
+            cursor = cursor.sort("sync_version", 1)
+            if length is not None:
+                cursor = cursor.limit(length)
+            pages[name] = await cursor.to_list(length)
+        return pages
+
+    pages = await read(None, limit + 1)
+    versions = sorted(
+        doc.get("sync_version") or 0 for docs in pages.values() for doc in docs
+    )
+    has_more = len(versions) > limit
+    if has_more:
+        # Every unread document is stamped at or after the limit-th version
+        # read, so re-reading up to it completes the page.
+        end = versions[limit - 1]
+        pages = await read(end, None)
+        later = {"user_id": user_id, "sync_version": {"$gt": end}}
+        has_more = versions[-1] > end
+        for name in sources:
+            has_more = has_more or bool(await db[name].find_one(later, {"_id": 1}))
+        version = min(version, end)
+        # A page ending above an in-flight stamp is repeated until it lands.
+        has_more = has_more and (since is None or version > since)
+
+    for docs in pages.values():
+        for doc in docs:
+            doc.pop("sync_version", None)
+    return SyncChanges.model_validate(
+        {
+            "cursor": sync_cursor(version),
+            "has_more": has_more,
+            "habits": pages["habits"],
+            "completions": pages["completions"],
+            "deleted": pages.get("tombstones", []),
+        }
+    )
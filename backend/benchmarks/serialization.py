@@ -0,0 +1,101 @@
+"""Per-item cost of rendering habit and completion lists.
+
+Compares FastAPI's default path (validate stored dicts against the
+response model, then serialize) with the ``fast_responses`` path that
+encodes the projected dicts directly::
+
+    python -m benchmarks.serialization [--repeat 5]
+"""
+
+import argparse
+import time
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from app.core.serialization import dumps, orjson
+from app.models.habit import CompletionRecord, Habit
+
+SIZES = [1_000, 10_000]
+
+
+def habit_docs(count: int) -> list[dict]:
+    """Habit documents as stored in MongoDB."""
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    return [
+        {
+            "id": str(uuid4()),
+            "user_id": "user",
+            "name": f"Habit {index}",
+            "color": "primary",
+            "category": "Health",
+            "description": None,
+            "frequency": "daily",
+            "target_days_per_week": 7,
+            "reminder_time": None,
+            "reminder_enabled": False,
+            "created_at": (start + timedelta(minutes=index)).isoformat(),
+            "is_archived": False,
+        }
+        for index in range(count)
+    ]
+
+
+def completion_docs(count: int) -> list[dict]:
+    """Completion documents as stored in MongoDB."""
+    start = datetime(2000, 1, 1).date()
+    return [
+        {
+            "id": str(uuid4()),
+            "user_id": "user",
+            "habit_id": "habit",
+            "date": (start + timedelta(days=index)).isoformat(),
+            "completed": True,
+            "notes": None,
+        }
+        for index in range(count)
+    ]
+
+
+def measure(render, docs: list[dict], repeat: int) -> float:
+    """Best per-item time of ``render(docs)`` in microseconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        render(docs)
+        best = min(best, time.perf_counter() - started)
+    return best / len(docs) * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"encoder: {'orjson' if orjson else 'json'}")
+    print(f"{'list':<12}{'items':>8}{'validate':>12}{'adapter':>12}{'fast':>12}")
+    for name, model, factory in [
+        ("habits", Habit, habit_docs),
+        ("completions", CompletionRecord, completion_docs),
+    ]:
+        adapter = TypeAdapter(list[model])
+
+        def validate(docs, adapter=adapter):
+            # What FastAPI does for a route returning dicts with response_model.
+            return dumps(jsonable_encoder(adapter.validate_python(docs)))
+
+        def adapter_dump(docs, adapter=adapter):
+            return adapter.dump_json(adapter.validate_python(docs))
+
+        for size in SIZES:
+            docs = factory(size)
+            row = [
+                measure(r, docs, args.repeat) for r in (validate, adapter_dump, dumps)
+            ]
+            print(f"{name:<12}{size:>8}" + "".join(f"{v:>10.2f}us" for v in row))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,18 @@
 """Pytest fixtures for API testing."""
 
+from datetime import datetime, timezone
+from uuid import uuid4
+
 import pytest
 from httpx import ASGITransport, AsyncClient
+from motor.motor_asyncio import AsyncIOMotorClient
 
+from app.core.config import get_settings
+from app.core.database import db_instance
+from app.core.deps import invalidate_user
+from app.core.security import create_access_token
 from app.main import app
+from tests.fakes import FakeDatabase
 
 
 @pytest.fixture
@@ -14,3 +23,87 @@ async def client():
         base_url="http://test",
     ) as ac:
         yield ac
+
+
+@pytest.fixture(autouse=True)
+def database():
+    """Attach a lazily-connecting database so dependencies can resolve.
+
+    Motor does not open a connection until the first operation, so routes
+    that fail before touching MongoDB (e.g. on authentication) work without
+    a running server.
+    """
+    settings = get_settings()
+    client = AsyncIOMotorClient(settings.mongo_url, serverSelectionTimeoutMS=500)
+    db_instance.client = client
+    db_instance.db = client[settings.db_name]
+    yield db_instance.db
+    client.close()
+    db_instance.client = None
+    db_instance.db = None
+
+
+@pytest.fixture
+def fake_db(database):
+    """Replace the database with an in-memory fake for routes that use it."""
+    fake = FakeDatabase()
+    db_instance.db = fake
+    return fake
+
+
+@pytest.fixture
+async def user(fake_db):
+    """A registered user in the fake database."""
+    user = {
+        "id": str(uuid4()),
+        "email": "tester@example.com",
+        "name": "Tester",
+        "hashed_password": "unused",
+        "created_at": datetime.now(timezone.utc),
+    }
+    await fake_db.users.insert_one(user)
+    return user
+
+
+@pytest.fixture
+async def auth_client(client, user):
+    """The test client, authenticated as ``user``."""
+    token = create_access_token({"sub": user["id"]})
+    client.headers["Authorization"] = f"Bearer {token}"
+    yield client
+    invalidate_user(user["id"])
+
+
+@pytest.fixture
+async def registered_client(client):
+    """The test client, logged in as a user stored in the attached database.
+
+    Unlike ``auth_client`` this works against whichever database a test
+    attached, including a live one.
+    """
+    user_id = str(uuid4())
+    await db_instance.db.users.insert_one(
+        {
+            "id": user_id,
+            "email": f"{user_id}@example.com",
+            "name": "Tester",
+            "hashed_password": "unused",
+            "created_at": datetime.now(timezone.utc),
+        }
+    )
+    token = create_access_token({"sub": user_id})
+    client.headers["Authorization"] = f"Bearer {token}"
+    yield client
+    invalidate_user(user_id)
+
+
+@pytest.fixture
+def create_habit(client):
+    """Create habits as the user ``client`` is logged in as."""
+
+    async def create(**fields) -> dict:
+        response = await client.post("/api/habits", json={"name": "Read", **fields})
+        assert response.status_code == 201
+        return response.json()
+
+    return create
@@ -0,0 +1,660 @@
+"""In-memory stand-in for the parts of Motor the routes use.
+
+Collections hold plain dicts and enforce ``_id`` and the unique indexes
+declared in ``app.core.indexes``, so duplicate-key paths behave as against
+MongoDB.
+Queries, updates (including pipeline updates) and aggregations support the
+operators this application issues; anything else raises
+``NotImplementedError`` so a test never passes on silently wrong semantics.
+Every filter a collection is queried or updated with is kept in its
+``queries`` log.
+"""
+
+import copy
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from typing import Any
+
+from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+from app.core.indexes import INDEXES
+
+MISSING = object()
+REMOVE = object()
+DUPLICATE_KEY = 11000
+EPOCH = datetime(1970, 1, 1)
+DATE_UNITS = {
+    "day": {"hour": 0, "minute": 0, "second": 0, "microsecond": 0},
+    "hour": {"minute": 0, "second": 0, "microsecond": 0},
+    "minute": {"second": 0, "microsecond": 0},
+}
+
+
+def get_path(doc: Any, path: str) -> Any:
+    """Value at a dotted ``path``, or ``MISSING``."""
+    for part in path.split("."):
+        if isinstance(doc, dict) and part in doc:
+            doc = doc[part]
+        else:
+            return MISSING
+    return doc
+
+
+def set_path(doc: dict, path: str, value: Any) -> None:
+    *parents, last = path.split(".")
+    for part in parents:
+        doc = doc.setdefault(part, {})
+    doc[last] = value
+
+
+def unset_path(doc: dict, path: str) -> None:
+    *parents, last = path.split(".")
+    for part in parents:
+        doc = doc.get(part, {})
+    doc.pop(last, None)
+
+
+def compare(op: str, value: Any, operand: Any) -> bool:
+    if value is MISSING or value is None:
+        return False
+    try:
+        if op == "$gt":
+            return value > operand
+        if op == "$gte":
+            return value >= operand
+        if op == "$lt":
+            return value < operand
+        return value <= operand
+    except TypeError:
+        return False  # MongoDB never matches across types.
+
+
+def match_condition(value: Any, condition: Any) -> bool:
+    """Whether a field ``value`` satisfies a query ``condition``."""
+    if isinstance(condition, dict) and condition and next(iter(condition)) in OPS:
+        return all(
+            OPS[op](value, operand)
+            for op, operand in condition.items()
+            if op != "$options"
+        )
+    if condition is None:
+        return value is MISSING or value is None
+    if isinstance(value, list) and not isinstance(condition, list):
+        return condition in value
+    return value == condition
+
+
+OPS = {
+    "$eq": lambda value, operand: match_condition(value, operand),
+    "$ne": lambda value, operand: not match_condition(value, operand),
+    "$gt": lambda value, operand: compare("$gt", value, operand),
+    "$gte": lambda value, operand: compare("$gte", value, operand),
+    "$lt": lambda value, operand: compare("$lt", value, operand),
+    "$lte": lambda value, operand: compare("$lte", value, operand),
+    "$in": lambda value, operand: any(match_condition(value, o) for o in operand),
+    "$nin": lambda value, operand: not any(match_condition(value, o) for o in operand),
+    "$exists": lambda value, operand: (value is not MISSING) == bool(operand),
+    "$not": lambda value, operand: not match_condition(value, operand),
+}
+
+
+def matches(doc: dict, query: dict) -> bool:
+    """Whether ``doc`` matches a MongoDB ``query``."""
+    for key, condition in query.items():
+        if key == "$or":
+            if not any(matches(doc, clause) for clause in condition):
+                return False
+        elif key == "$and":
+            if not all(matches(doc, clause) for clause in condition):
+                return False
+        elif key.startswith("$"):
+            raise NotImplementedError(f"Query operator {key}")
+        elif not match_condition(get_path(doc, key), condition):
+            return False
+    return True
+
+
+def evaluate(expression: Any, doc: dict) -> Any:
+    """Evaluate an aggregation expression against ``doc``."""
+    if isinstance(expression, str):
+        if expression == "$$NOW":
+            return datetime.now(timezone.utc).replace(tzinfo=None)
+        if expression == "$$REMOVE":
+            return REMOVE
+        if expression.startswith("$"):
+            value = get_path(doc, expression[1:])
+            return None if value is MISSING else value
+        return expression
+    if isinstance(expression, list):
+        return [evaluate(item, doc) for item in expression]
+    if isinstance(expression, dict) and len(expression) == 1:
+        ((op, args),) = expression.items()
+        if op == "$literal":
+            return args
+        if op == "$ifNull":
+            value = evaluate(args[0], doc)
+            return evaluate(args[1], doc) if value is None else value
+        if op == "$not":
+            value = evaluate(args[0] if isinstance(args, list) else args, doc)
+            return not value
+        if op == "$add":
+            return sum(evaluate(arg, doc) for arg in args)
+        if op == "$concatArrays":
+            return [item for arg in args for item in evaluate(arg, doc)]
+        if op == "$eq":
+            left, right = (evaluate(arg, doc) for arg in args)
+            return left == right
+        if op in ("$gt", "$gte", "$lt", "$lte"):
+            left, right = (evaluate(arg, doc) for arg in args)
+            return compare(op, left, right)
+        if op == "$and":
+            return all(evaluate(arg, doc) for arg in args)
+        if op == "$cond":
+            if isinstance(args, dict):
+                args = [args["if"], args["then"], args["else"]]
+            return evaluate(args[1] if evaluate(args[0], doc) else args[2], doc)
+        if op == "$subtract":
+            left, right = (evaluate(arg, doc) for arg in args)
+            return left - right
+        if op == "$divide":
+            left, right = (evaluate(arg, doc) for arg in args)
+            return left / right
+        if op == "$toLong":
+            value = evaluate(args, doc)
+            if isinstance(value, datetime):
+                return (value - EPOCH) // timedelta(milliseconds=1)
+            return int(value)
+        if op == "$dateFromString":
+            value = evaluate(args["dateString"], doc)
+            return datetime.strptime(value, args.get("format", "%Y-%m-%dT%H:%M:%S"))
+        if op == "$dateTrunc":
+            value = evaluate(args["date"], doc)
+            return value.replace(**DATE_UNITS[args["unit"]])
+        if op.startswith("$"):
+            raise NotImplementedError(f"Expression operator {op}")
+    if isinstance(expression, dict):
+        return {key: evaluate(value, doc) for key, value in expression.items()}
+    return expression
+
+
+def project(doc: dict, projection: dict | None) -> dict:
+    """Apply a find projection."""
+    doc = copy.deepcopy(doc)
+    if not projection:
+        return doc
+    included = [key for key, value in projection.items() if value and key != "_id"]
+    if included:
+        result = {}
+        if projection.get("_id", 1):
+            result["_id"] = doc.get("_id")
+        for key in included:
+            value = get_path(doc, key)
+            if value is not MISSING:
+                set_path(result, key, value)
+        return result
+    for key, value in projection.items():
+        if not value:
+            unset_path(doc, key)
+    return doc
+
+
+def sort_key(fields: list[tuple[str, int]]):
+    def key(doc):
+        parts = []
+        for field, _ in fields:
+            value = get_path(doc, field)
+            parts.append((0, None) if value in (MISSING, None) else (1, value))
+        return parts
+
+    return key
+
+
+def sort_docs(docs: list[dict], fields: list[tuple[str, int]]) -> list[dict]:
+    for field, direction in reversed(fields):
+        docs = sorted(docs, key=sort_key([(field, direction)]), reverse=direction < 0)
+    return docs
+
+
+class FakeCursor:
+    """Result of ``find`` or ``aggregate``."""
+
+    def __init__(self, docs: list[dict]):
+        self.docs = docs
+        self.limit_to: int | None = None
+
+    def sort(self, key, direction: int | None = None) -> "FakeCursor":
+        fields = [(key, direction or 1)] if isinstance(key, str) else list(key)
+        self.docs = sort_docs(self.docs, fields)
+        return self
+
+    def batch_size(self, size: int) -> "FakeCursor":
+        return self
+
+    def limit(self, count: int) -> "FakeCursor":
+        self.limit_to = count or None
+        return self
+
+    def results(self) -> list[dict]:
+        return self.docs[: self.limit_to] if self.limit_to else self.docs
+
+    async def to_list(self, length: int | None = None) -> list[dict]:
+        docs = self.results()
+        return docs[:length] if length else docs
+
+    def __aiter__(self):
+        return self.iterate()
+
+    async def iterate(self):
+        for doc in self.results():
+            yield doc
+
+
+class FakeCollection:
+    """One collection of documents."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.docs: list[dict] = []
+        self.queries: list[dict] = []
+        self.unique = [["_id"]] + [
+            [key for key, _ in spec.keys]
+            for spec in INDEXES
+            if spec.collection == name and spec.unique
+        ]
+
+    def select(self, query: dict | None) -> list[dict]:
+        """Stored documents matching ``query``, which is logged."""
+        self.queries.append(query or {})
+        return [doc for doc in self.docs if matches(doc, query or {})]
+
+    # Writes
+
+    def check_unique(self, doc: dict, ignore: dict | None = None) -> None:
+        for keys in self.unique:
+            values = [get_path(doc, key) for key in keys]
+            for other in self.docs:
+                if other is ignore or other is doc:
+                    continue
+                if [get_path(other, key) for key in keys] == values:
+                    raise DuplicateKeyError(
+                        f"E11000 duplicate key error collection: {self.name}",
+                        DUPLICATE_KEY,
+                    )
+
+    async def insert_one(self, doc: dict):
+        doc.setdefault("_id", ObjectId())
+        stored = copy.deepcopy(doc)
+        self.check_unique(stored)
+        self.docs.append(stored)
+        return SimpleNamespace(inserted_id=doc["_id"])
+
+    async def insert_many(self, docs: list[dict], ordered: bool = True):
+        for doc in docs:
+            await self.insert_one(doc)
+        return SimpleNamespace(inserted_ids=[doc["_id"] for doc in docs])
+
+    def apply(self, doc: dict, update, inserting: bool) -> dict:
+        """Return ``doc`` with ``update`` applied."""
+        doc = copy.deepcopy(doc)
+        if isinstance(update, list):
+            for stage in update:
+                ((name, fields),) = stage.items()
+                if name not in ("$set", "$addFields"):
+                    raise NotImplementedError(f"Pipeline stage {name}")
+                values = {key: evaluate(value, doc) for key, value in fields.items()}
+                for key, value in values.items():
+                    set_path(doc, key, value)
+            return doc
+        for op, fields in update.items():
+            for key, value in fields.items():
+                current = get_path(doc, key)
+                if op == "$set":
+                    set_path(doc, key, copy.deepcopy(value))
+                elif op == "$setOnInsert":
+                    if inserting:
+                        set_path(doc, key, copy.deepcopy(value))
+                elif op == "$unset":
+                    unset_path(doc, key)
+                elif op == "$inc":
+                    set_path(doc, key, (0 if current is MISSING else current) + value)
+                elif op == "$max":
+                    if current is MISSING or current is None or value > current:
+                        set_path(doc, key, value)
+                elif op == "$min":
+                    if current is MISSING or current is None or value < current:
+                        set_path(doc, key, value)
+                elif op == "$push":
+                    set_path(
+                        doc, key, [*([] if current is MISSING else current), value]
+                    )
+                elif op == "$pull":
+                    items = [] if current is MISSING else current
+                    set_path(
+                        doc,
+                        key,
+                        [
+                            item
+                            for item in items
+                            if not (
+                                matches(item, value)
+                                if isinstance(value, dict)
+                                else item == value
+                            )
+                        ],
+                    )
+                elif op == "$bit":
+                    bits = 0 if current is MISSING else current
+                    for bit_op, operand in value.items():
+                        if bit_op == "or":
+                            bits |= operand
+                        elif bit_op == "and":
+                            bits &= operand
+                        else:
+                            bits ^= operand
+                    set_path(doc, key, bits)
+                else:
+                    raise NotImplementedError(f"Update operator {op}")
+        return doc
+
+    def seed(self, query: dict) -> dict:
+        """Equality fields of ``query``, the base of an upserted document."""
+        doc: dict = {"_id": ObjectId()}
+        for key, condition in query.items():
+            if key.startswith("$"):
+                continue
+            if (
+                isinstance(condition, dict)
+                and condition
+                and next(iter(condition)) in OPS
+            ):
+                if "$eq" in condition:
+                    set_path(doc, key, condition["$eq"])
+                continue
+            set_path(doc, key, condition)
+        return doc
+
+    def write(self, query: dict, update, upsert: bool, many: bool = False):
+        """Apply an update; returns ``(matched, upserted doc, before docs)``.
+
+        Only documents the update changed are in ``before docs``.
+        """
+        targets = self.select(query)
+        if not many:
+            targets = targets[:1]
+        befores = []
+        for doc in targets:
+            updated = self.apply(doc, update, inserting=False)
+            if updated == doc:
+                continue
+            self.check_unique(updated, ignore=doc)
+            befores.append(copy.deepcopy(doc))
+            doc.clear()
+            doc.update(updated)
+        if targets or not upsert:
+            return len(targets), None, befores
+        if isinstance(update, dict) and not any(k.startswith("$") for k in update):
+            new = {"_id": ObjectId(), **self.seed(query), **copy.deepcopy(update)}
+        else:
+            new = self.apply(self.seed(query), update, inserting=True)
+        self.check_unique(new)
+        self.docs.append(new)
+        return 0, new, []
+
+    async def update_one(self, query: dict, update, upsert: bool = False):
+        matched, new, befores = self.write(query, update, upsert)
+        return SimpleNamespace(
+            matched_count=matched,
+            modified_count=len(befores),
+            upserted_id=new["_id"] if new else None,
+        )
+
+    async def update_many(self, query: dict, update, upsert: bool = False):
+        matched, new, befores = self.write(query, update, upsert, many=True)
+        return SimpleNamespace(
+            matched_count=matched,
+            modified_count=len(befores),
+            upserted_id=new["_id"] if new else None,
+        )
+
+    async def replace_one(self, query: dict, replacement: dict, upsert: bool = False):
+        for doc in self.select(query):
+            new = {"_id": doc["_id"], **copy.deepcopy(replacement)}
+            self.check_unique(new, ignore=doc)
+            doc.clear()
+            doc.update(new)
+            return SimpleNamespace(matched_count=1, upserted_id=None)
+        if upsert:
+            new = {"_id": ObjectId(), **copy.deepcopy(replacement)}
+            self.check_unique(new)
+            self.docs.append(new)
+            return SimpleNamespace(matched_count=0, upserted_id=new["_id"])
+        return SimpleNamespace(matched_count=0, upserted_id=None)
+
+    async def find_one_and_update(
+        self,
+        query: dict,
+        update,
+        projection: dict | None = None,
+        sort=None,
+        upsert: bool = False,
+        return_document: bool = False,
+    ):
+        if sort:
+            ordered = sort_docs([d for d in self.docs if matches(d, query)], sort)
+            query = {"_id": ordered[0]["_id"]} if ordered else query
+        target = next((d for d in self.docs if matches(d, query)), None)
+        before = copy.deepcopy(target)
+        matched, new, _ = self.write(query, update, upsert)
+        if new is not None:
+            return project(new, projection) if return_document else None
+        if not matched:
+            return None
+        return project(target if return_document else before, projection)
+
+    async def find_one_and_delete(self, query: dict, projection=None, sort=None):
+        for doc in self.select(query):
+            self.docs.remove(doc)
+            return project(doc, projection)
+        return None
+
+    async def delete_one(self, query: dict):
+        for doc in self.select(query):
+            self.docs.remove(doc)
+            return SimpleNamespace(deleted_count=1)
+        return SimpleNamespace(deleted_count=0)
+
+    async def delete_many(self, query: dict):
+        deleted = self.select(query)
+        self.docs = [doc for doc in self.docs if doc not in deleted]
+        return SimpleNamespace(deleted_count=len(deleted))
+
+    async def bulk_write(self, requests: list, ordered: bool = True):
+        errors, matched, modified, upserted = [], 0, 0, 0
+        for index, request in enumerate(requests):
+            if not isinstance(request, UpdateOne):
+                raise NotImplementedError(type(request).__name__)
+            try:
+                count, new, befores = self.write(
+                    request._filter, request._doc, bool(request._upsert)
+                )
+            except DuplicateKeyError as exc:
+                errors.append({"index": index, "code": exc.code, "errmsg": str(exc)})
+                if ordered:
+                    break
+                continue
+            matched += count
+            modified += len(befores)
+            upserted += new is not None
+        details = {
+            "writeErrors": errors,
+            "nMatched": matched,
+            "nModified": modified,
+            "nUpserted": upserted,
+        }
+        if errors:
+            raise BulkWriteError(details)
+        return SimpleNamespace(
+            bulk_api_result=details,
+            matched_count=matched,
+            modified_count=modified,
+            upserted_count=upserted,
+        )
+
+    # Reads
+
+    def find(self, query: dict | None = None, projection: dict | None = None):
+        return FakeCursor([project(d, projection) for d in self.select(query)])
+
+    async def find_one(self, query: dict | None = None, projection=None, sort=None):
+        docs = self.select(query)
+        if sort:
+            docs = sort_docs(docs, sort)
+        return project(docs[0], projection) if docs else None
+
+    async def count_documents(self, query: dict) -> int:
+        return len(self.select(query))
+
+    async def distinct(self, key: str, query: dict | None = None) -> list:
+        values = []
+        for doc in self.select(query):
+            value = get_path(doc, key)
+            if value is not MISSING:
+                if value not in values:
+                    values.append(value)
+        return values
+
+    def aggregate(self, pipeline: list[dict], **kwargs) -> FakeCursor:
+        docs = copy.deepcopy(self.docs)
+        for stage in pipeline:
+            ((name, spec),) = stage.items()
+            if name == "$match" and stage is pipeline[0]:
+                docs = copy.deepcopy(self.select(spec))
+            elif name == "$match":
+                docs = [doc for doc in docs if matches(doc, spec)]
+            elif name == "$group":
+                docs = group(docs, spec)
+            elif name in ("$set", "$addFields"):
+                docs = [
+                    {
+                        **doc,
+                        **{key: evaluate(value, doc) for key, value in spec.items()},
+                    }
+                    for doc in docs
+                ]
+            elif name == "$setWindowFields":
+                docs = window(docs, spec)
+            elif name == "$sort":
+                docs = sort_docs(docs, list(spec.items()))
+            elif name == "$project":
+                docs = [project_expression(doc, spec) for doc in docs]
+            elif name == "$limit":
+                docs = docs[:spec]
+            else:
+                raise NotImplementedError(f"Aggregation stage {name}")
+        return FakeCursor(docs)
+
+    async def create_indexes(self, models: list) -> None:
+        pass
+
+
+def group(docs: list[dict], spec: dict) -> list[dict]:
+    groups: dict = {}
+    for doc in docs:
+        key = evaluate(spec["_id"], doc)
+        frozen = repr(key)
+        if frozen not in groups:
+            groups[frozen] = {
+                "_id": key,
+                **{field: [] for field in spec if field != "_id"},
+            }
+        for field, accumulator in spec.items():
+            if field != "_id":
+                ((op, expression),) = accumulator.items()
+                if op == "$top":
+                    # Kept with its sort key for the reduction below.
+                    value = (
+                        evaluate(expression["output"], doc),
+                        project_expression(doc, dict.fromkeys(expression["sortBy"], 1)),
+                    )
+                else:
+                    value = evaluate(expression, doc)
+                groups[frozen][field].append((op, value))
+    results = []
+    for row in groups.values():
+        for field, values in row.items():
+            if field == "_id":
+                continue
+            op = values[0][0] if values else "$sum"
+            items = [value for _, value in values]
+            if op == "$sum":
+                row[field] = sum(
+                    item for item in items if isinstance(item, (int, float))
+                )
+            elif op == "$min":
+                row[field] = min(items)
+            elif op == "$max":
+                row[field] = max(items)
+            elif op == "$push":
+                row[field] = [item for item in items if item is not REMOVE]
+            elif op == "$top":
+                ranked = sort_docs(
+                    [{**key, "output": output} for output, key in items],
+                    list(spec[field]["$top"]["sortBy"].items()),
+                )
+                row[field] = ranked[0]["output"]
+            elif op == "$addToSet":
+                row[field] = list(dict.fromkeys(items))
+            else:
+                raise NotImplementedError(f"Accumulator {op}")
+        results.append(row)
+    return results
+
+
+def window(docs: list[dict], spec: dict) -> list[dict]:
+    """``$setWindowFields`` numbering documents within each partition."""
+    partitions: dict = {}
+    for doc in docs:
+        partitions.setdefault(repr(evaluate(spec["partitionBy"], doc)), []).append(doc)
+    results = []
+    for partition in partitions.values():
+        ordered = sort_docs(partition, list(spec["sortBy"].items()))
+        for number, doc in enumerate(ordered, start=1):
+            for field, operator in spec["output"].items():
+                if operator != {"$documentNumber": {}}:
+                    raise NotImplementedError(f"Window operator {operator}")
+                doc[field] = number
+            results.append(doc)
+    return results
+
+
+def project_expression(doc: dict, spec: dict) -> dict:
+    result = {} if spec.get("_id", 1) == 0 else {"_id": doc.get("_id")}
+    for field, value in spec.items():
+        if field == "_id":
+            continue
+        if value in (1, True):
+            current = get_path(doc, field)
+            if current is not MISSING:
+                set_path(result, field, current)
+        else:
+            set_path(result, field, evaluate(value, doc))
+    return result
+
+
+class FakeDatabase:
+    """Database whose collections spring into existence on first use."""
+
+    def __init__(self):
+        self.collections: dict[str, FakeCollection] = {}
+
+    def __getitem__(self, name: str) -> FakeCollection:
+        if name not in self.collections:
+            self.collections[name] = FakeCollection(name)
+        return self.collections[name]
+
+    def __getattr__(self, name: str) -> FakeCollection:
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return self[name]
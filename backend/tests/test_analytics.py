@@ -0,0 +1,113 @@
+"""Analytics route tests."""
+
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "query",
+    ["daily?from=2024-02-30", "daily?to=2023-13-01", "weekly?week_start=2024-04-31"],
+)
+async def test_invalid_calendar_dates_rejected(auth_client, query):
+    """Test well-formed but impossible dates are a 400, not a server error."""
+    response = await auth_client.get(f"/api/analytics/{query}")
+    assert response.status_code == 400
+    assert "not a valid date" in response.json()["detail"]
+
+
+async def add_habit(db, user: dict, habit_id: str, created: date, *days: date) -> None:
+    """Store a habit created on ``created`` and completed on ``days``."""
+    await db.habits.insert_one(
+        {
+            "id": habit_id,
+            "user_id": user["id"],
+            "name": habit_id,
+            "is_archived": False,
+            "created_at": f"{created.isoformat()}T08:00:00+00:00",
+        }
+    )
+    for day in days:
+        await db.completions.insert_one(
+            {
+                "id": f"{habit_id}-{day}",
+                "user_id": user["id"],
+                "habit_id": habit_id,
+                "date": day.isoformat(),
+                "completed": True,
+            }
+        )
+
+
+@pytest.mark.asyncio
+async def test_habit_streaks_and_rates(auth_client, fake_db, user):
+    """Test streaks are the runs of consecutive days and rates their windows."""
+    today = datetime.now(timezone.utc).date()
+    ago = [today - timedelta(days=n) for n in range(30)]
+    # A three-day run up to today and a longer one ending ten days ago.
+    await add_habit(fake_db, user, "h1", ago[20], *ago[0:3], *ago[10:15])
+
+    response = await auth_client.get("/api/analytics/habits/h1")
+    assert response.json() == {
+        "habit_id": "h1",
+        "habit_name": "h1",
+        "current_streak": 3,
+        "longest_streak": 5,
+        "completion_rate_7d": 42.9,
+        "completion_rate_30d": 26.7,
+        "completion_rate_all_time": 38.1,
+        "total_completions": 8,
+        "best_streak_start": ago[14].isoformat(),
+        "best_streak_end": ago[10].isoformat(),
+    }
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("ended", [1, 2])
+async def test_current_streak_ends_after_a_missed_day(
+    auth_client, fake_db, user, ended
+):
+    """Test a streak is current through yesterday and broken after that."""
+    today = datetime.now(timezone.utc).date()
+    days = [today - timedelta(days=ended + n) for n in range(4)]
+    await add_habit(fake_db, user, "h1", days[-1], *days)
+
+    row = (await auth_client.get("/api/analytics/habits/h1")).json()
+    assert (row["current_streak"], row["longest_streak"]) == (
+        4 if ended == 1 else 0,
+        4,
+    )
+
+
+@pytest.mark.asyncio
+async def test_weekly_and_monthly_rates(auth_client, fake_db, user):
+    """Test period rates divide completions by every habit-day in the period."""
+    created = date(2023, 12, 1)
+    await add_habit(fake_db, user, "h1", created, date(2024, 1, 1), date(2024, 1, 2))
+    await add_habit(fake_db, user, "h2", created, date(2024, 1, 1))
+
+    weekly = (
+        await auth_client.get("/api/analytics/weekly?week_start=2024-01-01")
+    ).json()
+    assert weekly == {
+        "week_start": "2024-01-01",
+        "week_end": "2024-01-07",
+        "completed_count": 3,
+        "total_possible": 14,
+        "completion_rate": 21.4,
+        "best_day": "2024-01-01",
+        "worst_day": "2024-01-03",
+    }
+
+    monthly = (await auth_client.get("/api/analytics/monthly?month=2024-01")).json()
+    assert (
+        monthly["completed_count"],
+        monthly["total_possible"],
+        monthly["completion_rate"],
+    ) == (3, 62, 4.8)
+    assert [day["completion_rate"] for day in monthly["daily_breakdown"][:3]] == [
+        100.0,
+        50.0,
+        0.0,
+    ]
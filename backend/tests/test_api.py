@@ -17,4 +17,45 @@ async def test_health_endpoint(client):
     """Test health check endpoint."""
     response = await client.get("/api/health")
     assert response.status_code == 200
-    assert response.json()["status"] == "healthy"
+    assert response.json() == {"status": "healthy"}
+
+
+@pytest.mark.asyncio
+async def test_habits_require_authentication(client):
+    """Test habit routes reject unauthenticated requests."""
+    response = await client.get("/api/habits")
+    assert response.status_code == 401
+
+    response = await client.post(
+        "/api/habits/completions/toggle",
+        json={"habit_id": "abc", "date": "2024-01-01"},
+    )
+    assert response.status_code == 401
+
+    response = await client.get("/api/analytics/overall")
+    assert response.status_code == 401
+
+    response = await client.get("/api/export")
+    assert response.status_code == 401
+
+    response = await client.get("/api/categories")
+    assert response.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_refresh_requires_token(client):
+    """Test the refresh endpoint validates its body before any lookup."""
+    response = await client.post("/api/auth/refresh", json={})
+    assert response.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_ready_endpoint_reports_pool(client):
+    """Test readiness pings MongoDB and reports pool counters either way."""
+    response = await client.get("/api/ready")
+    data = response.json()
+    assert (response.status_code, data["status"]) in [
+        (200, "ready"),
+        (503, "unavailable"),
+    ]
+    assert {"max_size", "checked_out", "waiting"} <= data["pool"].keys()
@@ -0,0 +1,72 @@
+"""Completion bitmap tests."""
+
+import base64
+from datetime import date
+
+import pytest
+
+from app.services.bitmaps import (
+    bitmap_from_dates,
+    current_streak,
+    encode_base64,
+    encode_rle,
+    int_to_words,
+    load_bitmaps,
+    longest_run,
+    words_to_int,
+)
+
+
+def test_words_round_trip():
+    """Test a bitmap survives splitting into stored words."""
+    bits = bitmap_from_dates(["2024-01-01", "2024-02-01", "2024-12-31"], 2024)
+    assert words_to_int(int_to_words(bits)) == bits
+    assert bin(bits).count("1") == 3
+
+
+def test_longest_and_current_streak():
+    """Test streaks are derived from runs of set bits across years."""
+    previous = bitmap_from_dates(["2023-12-30", "2023-12-31"], 2023)
+    current = bitmap_from_dates(
+        ["2024-01-01", "2024-01-02", "2024-01-10", "2024-01-11", "2024-01-12"], 2024
+    )
+    assert longest_run(current) == 3
+    bitmaps = {2023: previous, 2024: current}
+    assert current_streak(bitmaps, date(2024, 1, 12)) == 3
+    assert current_streak(bitmaps, date(2024, 1, 13)) == 3
+    assert current_streak(bitmaps, date(2024, 1, 3)) == 4
+    assert current_streak(bitmaps, date(2024, 1, 14)) == 0
+
+
+def test_encodings_cover_the_year():
+    """Test the base64 and run-length encodings describe all days."""
+    bits = bitmap_from_dates(["2023-01-02", "2023-01-03"], 2023)
+    assert encode_rle(bits, 2023) == [1, 2, 362]
+    raw = base64.b64decode(encode_base64(bits, 2023))
+    assert len(raw) == 46
+    assert int.from_bytes(raw, "little") == bits
+
+
+@pytest.mark.asyncio
+async def test_toggle_without_bitmap_builds_whole_year(auth_client, fake_db, user):
+    """Test the first toggle of a year keeps the days recorded before it."""
+    habit = (await auth_client.post("/api/habits", json={"name": "Read"})).json()
+    for day in ("2024-01-01", "2024-01-02"):
+        await fake_db.completions.insert_one(
+            {
+                "user_id": user["id"],
+                "habit_id": habit["id"],
+                "date": day,
+                "completed": True,
+            }
+        )
+
+    toggle = {"habit_id": habit["id"], "date": "2024-01-03"}
+    await auth_client.post("/api/habits/completions/toggle", json=toggle)
+    await auth_client.post(
+        "/api/habits/completions/toggle", json={**toggle, "date": "2024-01-05"}
+    )
+
+    stored = await load_bitmaps(fake_db, user["id"], habit["id"], [2024])
+    expected = ["2024-01-01", "2024-01-02", "2024-01-03", "2024-01-05"]
+    assert stored == {2024: bitmap_from_dates(expected, 2024)}
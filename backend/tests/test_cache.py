@@ -0,0 +1,50 @@
+"""TTL cache tests."""
+
+from app.core.cache import TTLCache
+
+
+class FakeClock:
+    """Manually advanced monotonic clock."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_entries_expire_and_count_misses():
+    """Test entries expire after their TTL and lookups are counted."""
+    clock = FakeClock()
+    cache = TTLCache(maxsize=10, ttl=60, clock=clock)
+    cache.set("token", "alice")
+    cache.set("short", "bob", ttl=5)
+    assert cache.get("token") == "alice"
+    clock.now = 10
+    assert cache.get("short") is None
+    clock.now = 61
+    assert cache.get("token") is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 2
+
+
+def test_least_recently_used_evicted():
+    """Test the cache stays bounded by evicting the oldest entry."""
+    cache = TTLCache(maxsize=2, ttl=60, clock=FakeClock())
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.stats()["evictions"] == 1
+
+
+def test_discard_where_invalidates_matching_values():
+    """Test invalidation by value removes every matching entry."""
+    cache = TTLCache(maxsize=10, ttl=60, clock=FakeClock())
+    cache.set("t1", "alice")
+    cache.set("t2", "alice")
+    cache.set("t3", "bob")
+    assert cache.discard_where(lambda user: user == "alice") == 2
+    assert cache.stats()["size"] == 1
@@ -0,0 +1,65 @@
+"""Category counter tests."""
+
+import pytest
+
+from app.services.categories import counted_category, habit_category_changed
+
+
+class FakeCategories:
+    """Applies ``$inc`` updates to in-memory habit counts."""
+
+    def __init__(self):
+        self.counts: dict[str, int] = {}
+        self.categories = self
+
+    async def update_one(self, query, update, upsert=False):
+        name = query["name"]
+        self.counts[name] = self.counts.get(name, 0) + update["$inc"]["habit_count"]
+
+
+def test_only_active_categorized_habits_count():
+    """Test archived and uncategorized habits count towards no category."""
+    assert counted_category({"category": "Health"}) == "Health"
+    assert counted_category({"category": "Health", "is_archived": True}) is None
+    assert counted_category({"category": ""}) is None
+    assert counted_category(None) is None
+
+
+@pytest.mark.asyncio
+async def test_habit_count_follows_habit_lifecycle():
+    """Test create, recategorize, archive and delete move the counters."""
+    db = FakeCategories()
+    habit = {"category": "Health"}
+    await habit_category_changed(db, "u1", None, habit)
+    assert db.counts == {"Health": 1}
+
+    moved = {**habit, "category": "Work"}
+    await habit_category_changed(db, "u1", habit, moved)
+    assert db.counts == {"Health": 0, "Work": 1}
+
+    archived = {**moved, "is_archived": True}
+    await habit_category_changed(db, "u1", moved, archived)
+    assert db.counts["Work"] == 0
+
+    await habit_category_changed(db, "u1", archived, None)
+    assert db.counts == {"Health": 0, "Work": 0}
+
+
+@pytest.mark.asyncio
+async def test_category_routes_track_habit_counts(auth_client):
+    """Test category counts follow habits and in-use categories stay put."""
+    category = (await auth_client.post("/api/categories", json={"name": "Mind"})).json()
+    duplicate = await auth_client.post("/api/categories", json={"name": "Mind"})
+    assert duplicate.status_code == 409
+    await auth_client.post("/api/habits", json={"name": "Read", "category": "Mind"})
+
+    in_use = await auth_client.delete(f"/api/categories/{category['id']}")
+    assert in_use.status_code == 409
+    renamed = await auth_client.patch(
+        f"/api/categories/{category['id']}", json={"name": "Focus"}
+    )
+    assert renamed.status_code == 200
+    categories = await auth_client.get("/api/categories")
+    assert [(c["name"], c["habit_count"]) for c in categories.json()] == [("Focus", 1)]
+    habits = await auth_client.get("/api/habits")
+    assert [h["category"] for h in habits.json()] == ["Focus"]
@@ -0,0 +1,129 @@
+"""Completion route tests against the in-memory database."""
+
+import pytest
+
+
+@pytest.mark.asyncio
+async def test_toggle_creates_record_then_flips_it(auth_client, fake_db, create_habit):
+    """Test toggling upserts a completed record and flips it on each call."""
+    habit = await create_habit()
+    toggle = {"habit_id": habit["id"], "date": "2024-03-01"}
+
+    response = await auth_client.post("/api/habits/completions/toggle", json=toggle)
+    assert response.status_code == 200
+    record = response.json()
+    assert record["completed"] is True
+    assert await fake_db.completions.count_documents({}) == 1
+
+    response = await auth_client.post("/api/habits/completions/toggle", json=toggle)
+    assert response.json()["completed"] is False
+    assert response.json()["id"] == record["id"]
+
+    response = await auth_client.post("/api/habits/completions/toggle", json=toggle)
+    assert response.json()["completed"] is True
+    assert await fake_db.completions.count_documents({}) == 1
+
+
+@pytest.mark.asyncio
+async def test_toggle_unknown_habit(auth_client, fake_db):
+    """Test toggling another user's or a missing habit is a 404."""
+    response = await auth_client.post(
+        "/api/habits/completions/toggle",
+        json={"habit_id": "missing", "date": "2024-03-01"},
+    )
+    assert response.status_code == 404
+    assert await fake_db.completions.count_documents({}) == 0
+
+
+@pytest.mark.asyncio
+async def test_batch_applies_newest_operation_per_record(
+    auth_client, fake_db, create_habit
+):
+    """Test batch replay is last-writer-wins and rejects unknown habits."""
+    habit = await create_habit()
+    toggle = {"habit_id": habit["id"], "date": "2024-01-01"}
+    await auth_client.post("/api/habits/completions/toggle", json=toggle)
+
+    response = await auth_client.post(
+        "/api/habits/completions/batch",
+        json={
+            "operations": [
+                {**toggle, "completed": False, "client_ts": "2000-01-01T00:00:00Z"},
+                {
+                    **toggle,
+                    "date": "2024-01-02",
+                    "completed": True,
+                    "client_ts": "2099-01-01T00:00:00Z",
+                },
+                {
+                    **toggle,
+                    "date": "2024-01-02",
+                    "completed": False,
+                    "client_ts": "2098-01-01T00:00:00Z",
+                },
+                {
+                    "habit_id": "missing",
+                    "date": "2024-01-02",
+                    "completed": True,
+                    "client_ts": "2099-01-01T00:00:00Z",
+                },
+            ]
+        },
+    )
+    assert response.status_code == 200
+    assert [item["status"] for item in response.json()["results"]] == [
+        "stale",
+        "applied",
+        "stale",
+        "rejected",
+    ]
+    records = await fake_db.completions.find({}, {"_id": 0}).sort("date").to_list()
+    assert [(r["date"], r["completed"]) for r in records] == [
+        ("2024-01-01", True),
+        ("2024-01-02", True),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_batch_limit(auth_client):
+    """Test a batch over the per-request limit is refused as a whole."""
+    operation = {
+        "habit_id": "h",
+        "date": "2024-01-01",
+        "completed": True,
+        "client_ts": "2024-01-01T00:00:00Z",
+    }
+    response = await auth_client.post(
+        "/api/habits/completions/batch", json={"operations": [operation] * 1001}
+    )
+    assert response.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_toggle_after_batch_keeps_bitmap_whole(
+    auth_client, fake_db, user, create_habit
+):
+    """Test a batch's bitmap invalidation is not followed by a partial bitmap."""
+    habit = await create_habit()
+    operations = [
+        {
+            "habit_id": habit["id"],
+            "date": day,
+            "completed": True,
+            "client_ts": "2024-01-01T00:00:00Z",
+        }
+        for day in ("2024-01-01", "2024-01-02")
+    ]
+    await auth_client.post(
+        "/api/habits/completions/batch", json={"operations": operations}
+    )
+    await auth_client.post(
+        "/api/habits/completions/toggle",
+        json={"habit_id": habit["id"], "date": "2024-01-03"},
+    )
+
+    response = await auth_client.get(
+        f"/api/habits/{habit['id']}/bitmap?year=2024&encoding=rle"
+    )
+    assert response.json()["total_completions"] == 3
+    assert response.json()["data"][:2] == [0, 3]
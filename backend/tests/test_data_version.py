@@ -0,0 +1,77 @@
+"""Tests for ETag helpers."""
+
+import pytest
+
+from app.services.data_version import etag_matches, get_data_version, make_etag
+
+
+def test_make_etag_changes_with_version_and_parts():
+    """Test tags differ per user, version and representation."""
+    etag = make_etag("u1", 3, "/api/habits", "include=stats")
+
+    assert etag.startswith('W/"3-')
+    assert etag == make_etag("u1", 3, "/api/habits", "include=stats")
+    assert etag != make_etag("u1", 4, "/api/habits", "include=stats")
+    assert etag != make_etag("u1", 3, "/api/habits", "")
+    assert etag != make_etag("u2", 3, "/api/habits", "include=stats")
+
+
+def test_etag_matches_uses_weak_comparison():
+    """Test If-None-Match lists, wildcards and strong forms match."""
+    etag = make_etag("u1", 1, "/api/habits")
+    strong = etag.removeprefix("W/")
+
+    assert etag_matches(etag, etag)
+    assert etag_matches(strong, etag)
+    assert etag_matches(f'"other", {etag}', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches(None, etag)
+    assert not etag_matches('W/"0-0000000000000000"', etag)
+
+
+@pytest.mark.asyncio
+async def test_conditional_get_revalidates_until_data_changes(auth_client):
+    """Test a matching If-None-Match is a 304 until the user writes."""
+    habit = (await auth_client.post("/api/habits", json={"name": "Read"})).json()
+    fresh = await auth_client.get(f"/api/habits/{habit['id']}")
+    etag = fresh.headers["ETag"]
+
+    cached = await auth_client.get(
+        f"/api/habits/{habit['id']}", headers={"If-None-Match": etag}
+    )
+    assert cached.status_code == 304
+
+    await auth_client.patch(f"/api/habits/{habit['id']}", json={"color": "blue"})
+    changed = await auth_client.get(
+        f"/api/habits/{habit['id']}", headers={"If-None-Match": etag}
+    )
+    assert changed.status_code == 200
+    assert changed.json()["color"] == "blue"
+
+
+@pytest.mark.asyncio
+async def test_version_bumped_only_by_writes_that_change_data(
+    auth_client, fake_db, user
+):
+    """Test 404s, conflicts and no-op updates leave the data version alone."""
+
+    async def version() -> int:
+        return await get_data_version(fake_db, user["id"])
+
+    habit = (await auth_client.post("/api/habits", json={"name": "Read"})).json()
+    created = await version()
+    assert created > 0
+
+    await auth_client.patch("/api/habits/missing", json={"color": "blue"})
+    await auth_client.delete("/api/habits/missing")
+    await auth_client.patch(f"/api/habits/{habit['id']}", json={"name": "Read"})
+    await auth_client.post("/api/categories", json={"name": "Mind"})
+    duplicate = await auth_client.post("/api/categories", json={"name": "Mind"})
+    assert duplicate.status_code == 409
+    await auth_client.delete("/api/categories/missing")
+    assert await version() == created + 1
+
+    await auth_client.patch(f"/api/habits/{habit['id']}", json={"name": "Write"})
+    assert await version() == created + 2
+    stored = await fake_db.habits.find_one({"id": habit["id"]})
+    assert stored["sync_version"] == created + 2
@@ -0,0 +1,48 @@
+"""Database client configuration tests."""
+
+from pymongo import monitoring
+
+from app.core.config import get_settings
+from app.core.database import PoolStats, client_options
+
+ADDRESS = ("localhost", 27017)
+
+
+def test_client_options_skip_unset_values():
+    """Test only configured options are passed to the driver."""
+    settings = get_settings().model_copy(
+        update={
+            "mongo_max_idle_time_ms": 30_000,
+            "mongo_compressors": "zstd,zlib",
+            "mongo_write_concern": "2",
+        }
+    )
+    options = client_options(settings)
+    assert options["maxIdleTimeMS"] == 30_000
+    assert options["compressors"] == "zstd,zlib"
+    assert options["w"] == 2
+    assert "socketTimeoutMS" not in options
+
+
+def test_pool_stats_track_checkouts():
+    """Test pool events update live counters and wait times."""
+    stats = PoolStats()
+    stats.connection_created(monitoring.ConnectionCreatedEvent(ADDRESS, 1))
+    stats.connection_check_out_started(
+        monitoring.ConnectionCheckOutStartedEvent(ADDRESS)
+    )
+    stats.connection_check_out_started(
+        monitoring.ConnectionCheckOutStartedEvent(ADDRESS)
+    )
+    stats.connection_checked_out(
+        monitoring.ConnectionCheckedOutEvent(ADDRESS, 1, 0.004)
+    )
+
+    snapshot = stats.snapshot()
+    assert snapshot["open"] == 1
+    assert snapshot["checked_out"] == 1
+    assert snapshot["waiting"] == 1
+    assert snapshot["max_wait_ms"] == 4.0
+
+    stats.connection_checked_in(monitoring.ConnectionCheckedInEvent(ADDRESS, 1))
+    assert stats.snapshot()["checked_out"] == 0
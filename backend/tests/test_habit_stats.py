@@ -0,0 +1,109 @@
+"""Incremental habit statistics tests."""
+
+from datetime import date
+
+import pytest
+
+from app.services import habit_stats
+from app.services.habit_stats import (
+    apply_toggle,
+    empty_stats,
+    read_stats,
+    rebuild_habit_stats,
+)
+from tests.fakes import FakeDatabase
+
+TODAY = date(2024, 3, 31)
+
+
+def toggle_all(days: list[str], completed: bool = True, stats: dict | None = None):
+    """Apply a series of toggles to a stats document."""
+    stats = stats or empty_stats()
+    for day in days:
+        stats = apply_toggle(stats, day, completed, TODAY)
+    return stats
+
+
+def test_consecutive_days_extend_streak():
+    """Test toggling the next day extends the latest streak in place."""
+    stats = toggle_all(["2024-03-01", "2024-03-02", "2024-03-04", "2024-03-05"])
+    assert not stats["dirty"]
+    assert (stats["streak_start"], stats["streak_end"]) == ("2024-03-04", "2024-03-05")
+    assert stats["longest_streak"] == 2
+    assert stats["total_completions"] == 4
+
+    result = read_stats(stats, date(2024, 3, 6))
+    assert result["current_streak"] == 2
+    assert result["completion_rate_30d"] == round(4 / 30 * 100, 1)
+    assert read_stats(stats, date(2024, 3, 7))["current_streak"] == 0
+
+
+def test_unchecking_latest_day_shrinks_streak():
+    """Test unchecking the last day of a non-longest streak stays incremental."""
+    stats = toggle_all(["2024-03-01", "2024-03-02", "2024-03-03"])
+    stats = toggle_all(["2024-03-05", "2024-03-06"], stats=stats)
+    stats = apply_toggle(stats, "2024-03-06", False, TODAY)
+    assert not stats["dirty"]
+    assert stats["streak_end"] == "2024-03-05"
+    assert stats["longest_streak"] == 3
+    assert stats["total_completions"] == 4
+
+
+def test_edits_inside_history_mark_dirty():
+    """Test edits that may merge or split streaks defer to a rebuild."""
+    stats = toggle_all(["2024-03-01", "2024-03-02", "2024-03-03"])
+    assert apply_toggle(stats, "2024-03-02", False, TODAY)["dirty"]
+    assert apply_toggle(stats, "2024-02-29", True, TODAY)["dirty"]
+
+
+def test_toggles_after_today_mark_dirty():
+    """Test a toggle dated after today never moves the streak into the future."""
+    stats = toggle_all(["2024-03-29", "2024-03-30", "2024-03-31"])
+    assert not stats["dirty"]
+    ahead = apply_toggle(stats, "2024-04-01", True, TODAY)
+    assert ahead["dirty"]
+    assert ahead["streak_end"] == "2024-03-31"
+    assert ahead["total_completions"] == 4
+
+
+@pytest.mark.asyncio
+async def test_rebuild_skips_documents_changed_while_aggregating(monkeypatch):
+    """Test a rebuild never overwrites a toggle that landed mid-aggregation."""
+    db = FakeDatabase()
+    await db.habit_stats.insert_one(
+        {
+            "user_id": "u1",
+            "habit_id": "h1",
+            **empty_stats(),
+            "dirty": True,
+            "version": 1,
+        }
+    )
+
+    async def concurrent_toggle(db_, user_id, habit_ids, today, recent_days):
+        await db.habit_stats.update_one(
+            {"habit_id": "h1"},
+            {"$set": {"total_completions": 7}, "$inc": {"version": 1}},
+        )
+        return {}
+
+    monkeypatch.setattr(habit_stats, "habit_streaks", concurrent_toggle)
+    rebuilt = await rebuild_habit_stats(db, "u1", ["h1", "h2"], date(2024, 1, 1))
+
+    assert rebuilt["h1"]["total_completions"] == 0
+    stored = await db.habit_stats.find_one({"habit_id": "h1"})
+    assert (stored["total_completions"], stored["version"]) == (7, 2)
+    created = await db.habit_stats.find_one({"habit_id": "h2"})
+    assert (created["dirty"], created["version"]) == (False, 1)
+
+
+@pytest.mark.asyncio
+async def test_toggle_rejects_impossible_dates(auth_client, fake_db):
+    """Test a well-formed but impossible date is a 422 and writes nothing."""
+    habit = (await auth_client.post("/api/habits", json={"name": "Read"})).json()
+    response = await auth_client.post(
+        "/api/habits/completions/toggle",
+        json={"habit_id": habit["id"], "date": "2024-02-30"},
+    )
+    assert response.status_code == 422
+    assert await fake_db.completions.count_documents({}) == 0
@@ -0,0 +1,85 @@
+"""Import parsing tests."""
+
+import pytest
+
+from app.services import importer
+from app.services.importer import iter_lines
+
+
+async def chunked(data: bytes, size: int):
+    """Yield ``data`` in fixed-size chunks like a request body stream."""
+    for start in range(0, len(data), size):
+        yield data[start : start + size]
+
+
+@pytest.mark.asyncio
+async def test_iter_lines_reassembles_split_chunks():
+    """Test lines and multi-byte characters split across chunks survive."""
+    data = "﻿name,date\r\nCafé,2024-01-01\r\nRun,2024-01-02".encode()
+    lines = [line async for line in iter_lines(chunked(data, 5))]
+    assert lines == ["name,date", "Café,2024-01-01", "Run,2024-01-02"]
+
+
+CSV = (
+    "habit_name,date,notes\n"
+    "Read,2024-01-01,\n"
+    'Read,2024-01-02,"two\n'
+    'lines"\n'
+    "Run,2024-02-30,\n"
+    "Run,2024-01-01\n"
+    "Run,2024-01-03,\n"
+)
+
+
+async def import_csv_text(client, text: str):
+    response = await client.post("/api/import?format=csv", content=text.encode())
+    assert response.status_code == 200
+    return response.json()
+
+
+@pytest.mark.asyncio
+async def test_csv_import_batches_and_reports_rejected_lines(
+    auth_client, fake_db, monkeypatch
+):
+    """Test rows are written in batches and bad lines counted, not written."""
+    monkeypatch.setattr(importer, "BATCH_SIZE", 2)
+    result = await import_csv_text(auth_client, CSV)
+
+    assert (result["lines"], result["completions"], result["skipped"]) == (7, 3, 2)
+    assert result["errors"] == [
+        "line 5: date: Value error, day is out of range for month",
+        "line 6: expected 3 columns, got 2",
+    ]
+    assert [b["collection"] for b in result["batches"]] == [
+        "habits",
+        "completions",
+        "habits",
+        "completions",
+    ]
+    habits = await fake_db.habits.distinct("name")
+    assert sorted(habits) == ["Read", "Run"]
+    notes = await fake_db.completions.find_one({"date": "2024-01-02"})
+    assert notes["notes"] == "two\nlines"
+
+
+@pytest.mark.asyncio
+async def test_reimport_upserts_in_place(auth_client, fake_db):
+    """Test importing the same file twice leaves one record per row."""
+    await import_csv_text(auth_client, CSV)
+    result = await import_csv_text(auth_client, CSV)
+
+    assert result["completions"] == 3
+    completions = [b for b in result["batches"] if b["collection"] == "completions"]
+    assert [(b["inserted"], b["unchanged"]) for b in completions] == [(0, 3)]
+    assert await fake_db.completions.count_documents({}) == 3
+    assert await fake_db.habits.count_documents({}) == 2
+
+
+@pytest.mark.asyncio
+async def test_unterminated_quote_rejected(auth_client, fake_db):
+    """Test a quoted field left open at the end of input is reported."""
+    result = await import_csv_text(
+        auth_client, 'habit_name,date,notes\nRead,2024-01-01,"open\n'
+    )
+    assert result["errors"] == ["line 2: unterminated quoted field"]
+    assert await fake_db.completions.count_documents({}) == 0
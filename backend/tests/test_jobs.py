@@ -0,0 +1,136 @@
+"""Background job tests."""
+
+import asyncio
+from datetime import timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.config import get_settings
+from app.services.jobs import HANDLERS, JobWorkerPool, handler, retry_delay
+
+
+class FakeJobs:
+    """Records job updates made by the worker pool."""
+
+    def __init__(self):
+        self.updates: list[dict] = []
+        self.jobs = self
+
+    async def update_one(self, query, update):
+        self.updates.append(update)
+        return SimpleNamespace(matched_count=1)
+
+
+@handler("test_failing")
+async def failing(ctx, chunk_size):
+    raise RuntimeError("boom")
+
+
+@pytest.fixture
+def pool():
+    db = FakeJobs()
+    return db, JobWorkerPool(db, get_settings())
+
+
+def test_retry_delay_backs_off_exponentially():
+    """Test retries wait longer each attempt, up to a cap."""
+    assert retry_delay(1) == timedelta(seconds=2)
+    assert retry_delay(3) == timedelta(seconds=8)
+    assert retry_delay(20) == timedelta(minutes=5)
+
+
+def test_builtin_handlers_registered():
+    """Test every job the routes queue has a handler."""
+    assert {"delete_habit", "delete_account", "rebuild_rollups"} <= set(HANDLERS)
+
+
+@pytest.mark.asyncio
+async def test_failed_job_requeued_until_last_attempt(pool):
+    """Test a failing job is retried, then marked failed."""
+    db, workers = pool
+    job = {"id": "j1", "user_id": "u1", "kind": "test_failing", "attempts": 1}
+    await workers.execute(job)
+    update = db.updates.pop()["$set"]
+    assert update["status"] == "queued"
+    assert update["error"] == "RuntimeError: boom"
+
+    await workers.execute({**job, "attempts": workers.max_attempts})
+    update = db.updates.pop()["$set"]
+    assert update["status"] == "failed"
+    assert update["finished_at"] is not None
+
+
+@pytest.mark.asyncio
+async def test_unknown_job_kind_fails_immediately(pool):
+    """Test a job without a handler is not retried."""
+    db, workers = pool
+    await workers.execute({"id": "j2", "user_id": "u1", "kind": "nope", "attempts": 1})
+    assert db.updates.pop()["$set"]["status"] == "failed"
+
+
+@pytest.mark.asyncio
+async def test_habit_deletion_job_removes_completions(auth_client, fake_db):
+    """Test deleting a habit queues a job that clears its completions."""
+    habit = (await auth_client.post("/api/habits", json={"name": "Read"})).json()
+    toggle = {"habit_id": habit["id"], "date": "2024-01-01"}
+    await auth_client.post("/api/habits/completions/toggle", json=toggle)
+
+    deleted = await auth_client.delete(f"/api/habits/{habit['id']}")
+    assert deleted.status_code == 202
+    job = await auth_client.get(f"/api/jobs/{deleted.json()['id']}")
+    assert job.json()["status"] == "queued"
+
+    workers = JobWorkerPool(fake_db, get_settings())
+    await workers.execute(await workers.claim())
+    job = await auth_client.get(f"/api/jobs/{deleted.json()['id']}")
+    assert job.json()["status"] == "succeeded"
+    assert await fake_db.completions.count_documents({"habit_id": habit["id"]}) == 0
+
+
+@pytest.mark.asyncio
+async def test_account_deletion_job_removes_user_data(auth_client, fake_db, user):
+    """Test deleting the account queues a job that clears every collection."""
+    await auth_client.post("/api/habits", json={"name": "Read"})
+
+    deleted = await auth_client.delete("/api/auth/me")
+    assert deleted.status_code == 202
+    assert await fake_db.users.count_documents({"id": user["id"]}) == 0
+    job, token = deleted.json()["id"], deleted.json()["status_token"]
+    stored = await fake_db.jobs.find_one({"id": job})
+    assert token not in stored.values()
+
+    unauthorized = await auth_client.get(f"/api/jobs/{job}")
+    assert unauthorized.status_code == 401
+    del auth_client.headers["Authorization"]
+    wrong = await auth_client.get(f"/api/jobs/{job}", headers={"X-Job-Token": "x"})
+    assert wrong.status_code == 404
+
+    workers = JobWorkerPool(fake_db, get_settings())
+    await workers.execute(await workers.claim())
+    assert await fake_db.habits.count_documents({"user_id": user["id"]}) == 0
+    status = await auth_client.get(f"/api/jobs/{job}", headers={"X-Job-Token": token})
+    assert status.json()["status"] == "succeeded"
+    assert "status_token" not in status.json()
+
+
+@pytest.mark.asyncio
+async def test_worker_survives_failure_to_record_outcome(pool, monkeypatch, caplog):
+    """Test an error escaping execute is logged and the worker keeps polling."""
+    db, workers = pool
+    jobs = iter([{"id": "j3", "kind": "test_failing", "attempts": 1}])
+
+    async def claim():
+        job = next(jobs, None)
+        if job is None:
+            raise asyncio.CancelledError
+        return job
+
+    async def execute(job):
+        raise RuntimeError("database unavailable")
+
+    monkeypatch.setattr(workers, "claim", claim)
+    monkeypatch.setattr(workers, "execute", execute)
+    with pytest.raises(asyncio.CancelledError):
+        await workers.run()
+    assert "Running job j3 (test_failing) failed" in caplog.text
@@ -0,0 +1,58 @@
+"""Metrics tests."""
+
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.metrics import CommandMetrics, Histogram, Metrics
+
+
+def test_histogram_renders_cumulative_buckets():
+    """Test bucket counts accumulate up to +Inf."""
+    histogram = Histogram((0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 5.0):
+        histogram.observe(value)
+    lines = histogram.render("latency", 'route="/x"')
+    assert lines[:3] == [
+        'latency_bucket{route="/x",le="0.1"} 1',
+        'latency_bucket{route="/x",le="1.0"} 3',
+        'latency_bucket{route="/x",le="+Inf"} 4',
+    ]
+    assert lines[-1] == 'latency_count{route="/x"} 4'
+
+
+def test_command_listener_labels_by_collection():
+    """Test command durations are keyed by collection and command name."""
+    registry = Metrics()
+    listener = CommandMetrics(registry)
+    ids = {"connection_id": ("localhost", 27017), "request_id": 7}
+    listener.started(
+        SimpleNamespace(command_name="find", command={"find": "habits"}, **ids)
+    )
+    listener.succeeded(SimpleNamespace(duration_micros=1500, **ids))
+    listener.started(
+        SimpleNamespace(
+            command_name="getMore",
+            command={"getMore": 1, "collection": "habits"},
+            **ids,
+        )
+    )
+    listener.failed(SimpleNamespace(duration_micros=500, **ids))
+
+    assert registry.commands[("habits", "find")].sum == 0.0015
+    assert registry.command_failures == {("habits", "getMore"): 1}
+    assert not listener.pending
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint_reports_route_templates(client):
+    """Test requests are counted under their route template."""
+    await client.get("/api/habits/abc")
+    response = await client.get("/api/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert (
+        'http_requests_total{method="GET",route="/api/habits/{habit_id}",status="401"}'
+        in response.text
+    )
+    assert 'auth_cache{kind="hits"}' in response.text
@@ -0,0 +1,45 @@
+"""Keyset pagination tests."""
+
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException
+
+from app.core.pagination import after_filter, decode_cursor, encode_cursor
+
+
+def test_cursor_round_trip():
+    """Test cursors decode back to the sort-key values."""
+    cursor = encode_cursor(["2024-01-01T00:00:00+00:00", "abc"])
+    assert decode_cursor(cursor, 2) == ["2024-01-01T00:00:00+00:00", "abc"]
+
+
+def test_cursor_round_trips_datetimes():
+    """Test datetime sort keys decode as datetimes for range predicates."""
+    moment = datetime(2024, 1, 1, 12, 30, 15, 250000)
+    assert decode_cursor(encode_cursor([moment, "abc"]), 2) == [moment, "abc"]
+
+
+def test_invalid_cursor_rejected():
+    """Test malformed or mismatched cursors raise a 400."""
+    with pytest.raises(HTTPException) as exc:
+        decode_cursor("not-a-cursor", 2)
+    assert exc.value.status_code == 400
+    with pytest.raises(HTTPException):
+        decode_cursor(encode_cursor(["2024-01-01"]), 2)
+
+
+def test_after_filter_uses_leading_range():
+    """Test the compound predicate bounds the leading key."""
+    assert after_filter(["date"], ["2024-01-01"]) == {"date": {"$gt": "2024-01-01"}}
+    assert after_filter(["created_at", "id"], ["t", "x"]) == {
+        "created_at": {"$gte": "t"},
+        "$or": [{"created_at": {"$gt": "t"}}, {"id": {"$gt": "x"}}],
+    }
+
+
+@pytest.mark.asyncio
+async def test_status_rejects_bad_cursor(client):
+    """Test a paginated route answers 400 for a bad cursor."""
+    response = await client.get("/api/status?after=bogus")
+    assert response.status_code == 400
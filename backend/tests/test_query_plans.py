@@ -0,0 +1,277 @@
+"""Query-plan regression tests.
+
+Each flow drives one area of the API. Against the in-memory database, every
+filter the routes issue must lead with the first field of an index declared
+in ``app.core.indexes``. Against a real MongoDB, every command is recorded
+and run through ``explain``, failing if any plans a collection scan; those
+tests are skipped when no server is reachable. What the routes return is
+covered elsewhere; these only check plans.
+"""
+
+import pytest
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import MongoClient, monitoring
+from pymongo.errors import PyMongoError
+
+from app.core.config import get_settings
+from app.core.database import db_instance
+from app.core.indexes import INDEXES, ensure_indexes
+from app.core.timing import DRIVER_FIELDS, EXPLAINABLE
+from app.services.jobs import JobWorkerPool
+from app.services.reminders import LogSink, ReminderScheduler
+from app.services.status_checks import ensure_status_collection
+from tests.fakes import FakeDatabase
+
+
+class CommandRecorder(monitoring.CommandListener):
+    """Collects explainable commands issued against the test database."""
+
+    def __init__(self, db_name: str):
+        self.db_name = db_name
+        self.commands: list[dict] = []
+
+    def started(self, event):
+        if event.database_name == self.db_name and event.command_name in EXPLAINABLE:
+            command = {k: v for k, v in event.command.items() if k not in DRIVER_FIELDS}
+            self.commands.append(command)
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+def find_stages(node, stages: set[str]) -> set[str]:
+    """Collect every plan stage name below an explain document node."""
+    if isinstance(node, dict):
+        if "stage" in node:
+            stages.add(node["stage"])
+        for value in node.values():
+            find_stages(value, stages)
+    elif isinstance(node, list):
+        for value in node:
+            find_stages(value, stages)
+    return stages
+
+
+def winning_plans(node) -> list:
+    """Return every ``winningPlan`` found in an explain document."""
+    plans = []
+    if isinstance(node, dict):
+        for key, value in node.items():
+            if key == "winningPlan":
+                plans.append(value)
+            else:
+                plans.extend(winning_plans(value))
+    elif isinstance(node, list):
+        for value in node:
+            plans.extend(winning_plans(value))
+    return plans
+
+
+@pytest.fixture(scope="module")
+def server():
+    """A synchronous client to a live server, probed once per module."""
+    probe = MongoClient(get_settings().mongo_url, serverSelectionTimeoutMS=500)
+    try:
+        probe.admin.command("ping")
+    except PyMongoError:
+        probe.close()
+        pytest.skip("MongoDB is not available")
+    yield probe
+    probe.close()
+
+
+@pytest.fixture
+async def recorder(server):
+    """Attach a recording client to a scratch database on a live server."""
+    settings = get_settings()
+    db_name = f"{settings.db_name}_query_plans"
+    server.drop_database(db_name)
+
+    recorder = CommandRecorder(db_name)
+    client = AsyncIOMotorClient(settings.mongo_url, event_listeners=[recorder])
+    db_instance.client = client
+    db_instance.db = client[db_name]
+    await ensure_status_collection(db_instance.db, settings)
+    await ensure_indexes(db_instance.db)
+    recorder.commands.clear()
+    yield recorder
+
+    client.close()
+    db_instance.client = None
+    db_instance.db = None
+    server.drop_database(db_name)
+
+
+async def assert_indexed(recorder: CommandRecorder) -> None:
+    """Fail if any recorded command plans a collection scan."""
+    assert recorder.commands
+    for command in recorder.commands:
+        explain = await db_instance.db.command(
+            {"explain": command, "verbosity": "queryPlanner"}
+        )
+        stages: set[str] = set()
+        for plan in winning_plans(explain):
+            find_stages(plan, stages)
+        assert "COLLSCAN" not in stages, f"Collection scan planned for {command}"
+
+
+def indexable_fields(query: dict) -> set[str]:
+    """Fields of a filter the planner could select an index on."""
+    fields = {key for key in query if not key.startswith("$")}
+    for clause in query.get("$and", []):
+        fields |= indexable_fields(clause)
+    if "$or" in query:
+        fields |= set.intersection(*map(indexable_fields, query["$or"]))
+    return fields
+
+
+def assert_shapes_indexed(db: FakeDatabase) -> None:
+    """Fail if any logged filter has no index leading with one of its fields.
+
+    Unfiltered reads walk an index only through their sort, which is left
+    to the ``explain`` tests.
+    """
+    leading = {(spec.collection, spec.keys[0][0]) for spec in INDEXES}
+    queries = [
+        (name, query)
+        for name, collection in db.collections.items()
+        for query in collection.queries
+        if query
+    ]
+    assert queries
+    for name, query in queries:
+        fields = indexable_fields(query)
+        assert "_id" in fields or any(
+            (name, field) in leading for field in fields
+        ), f"No index on {name} leads with any of {sorted(fields)}"
+
+
+async def habit_queries(client, create_habit) -> None:
+    """Habit listing, paging, reads and updates."""
+    habit = await create_habit()
+    await create_habit(name="Run")
+    await client.get(
+        "/api/habits?include=completions,stats&from=2024-01-01&to=2024-12-31"
+    )
+    page = await client.get("/api/habits?limit=1")
+    await client.get(f"/api/habits?limit=1&after={page.headers['X-Next-Cursor']}")
+    fresh = await client.get(f"/api/habits/{habit['id']}")
+    await client.get(
+        f"/api/habits/{habit['id']}", headers={"If-None-Match": fresh.headers["ETag"]}
+    )
+    await client.patch(f"/api/habits/{habit['id']}", json={"color": "blue"})
+
+
+async def completion_queries(client, create_habit) -> None:
+    """Toggles, batch replay and completion reads."""
+    habit = await create_habit()
+    toggle = {"habit_id": habit["id"], "date": "2024-01-01"}
+    await client.post("/api/habits/completions/toggle", json=toggle)
+    await client.post("/api/habits/completions/toggle", json=toggle)
+    await client.post(
+        "/api/habits/completions/batch",
+        json={
+            "operations": [
+                {**toggle, "completed": True, "client_ts": "2000-01-01T00:00:00Z"},
+                {
+                    **toggle,
+                    "date": "2024-01-02",
+                    "completed": True,
+                    "client_ts": "2099-01-01T00:00:00Z",
+                },
+            ]
+        },
+    )
+    await client.get(f"/api/habits/completions/{habit['id']}")
+    await client.get(f"/api/habits/{habit['id']}/bitmap?year=2023")
+
+
+async def analytics_queries(client, create_habit) -> None:
+    """Per-habit, monthly and overall analytics."""
+    habit = await create_habit()
+    toggle = {"habit_id": habit["id"], "date": "2024-01-01"}
+    await client.post("/api/habits/completions/toggle", json=toggle)
+    await client.get(f"/api/analytics/habits/{habit['id']}")
+    await client.get("/api/analytics/monthly?month=2024-01")
+    await client.get("/api/analytics/overall")
+
+
+async def sync_queries(client, create_habit) -> None:
+    """Full and delta sync and both export formats."""
+    habit = await create_habit()
+    full = await client.get("/api/sync")
+    await client.delete(f"/api/habits/{habit['id']}")
+    await client.get(f"/api/sync?since={full.json()['cursor']}")
+    await client.get("/api/export")
+    await client.get("/api/export?format=json")
+
+
+async def category_queries(client, create_habit) -> None:
+    """Category CRUD and counters."""
+    category = (await client.post("/api/categories", json={"name": "Mind"})).json()
+    await create_habit(category="Mind")
+    await client.delete(f"/api/categories/{category['id']}")
+    await client.patch(f"/api/categories/{category['id']}", json={"name": "Focus"})
+    await client.get("/api/categories")
+
+
+async def job_queries(client, create_habit) -> None:
+    """Queueing, claiming and running deletion jobs."""
+    habit = await create_habit()
+    toggle = {"habit_id": habit["id"], "date": "2024-01-01"}
+    await client.post("/api/habits/completions/toggle", json=toggle)
+    deleted = await client.delete(f"/api/habits/{habit['id']}")
+    workers = JobWorkerPool(db_instance.db, get_settings())
+    await workers.execute(await workers.claim())
+    await client.get(f"/api/jobs/{deleted.json()['id']}")
+    await client.delete("/api/auth/me")
+    await workers.execute(await workers.claim())
+
+
+async def reminder_queries(client, create_habit) -> None:
+    """The reminder scheduler's slot scan."""
+    await create_habit(reminder_enabled=True, reminder_time="07:30")
+    scheduler = ReminderScheduler(db_instance.db, LogSink(), get_settings())
+    assert await scheduler.run_slot("2024-01-01T07:30") == 1
+
+
+async def status_queries(client, create_habit) -> None:
+    """Status check reads and downsampling."""
+    await client.post("/api/status", json={"client_name": "plans"})
+    await client.get("/api/status")
+    await client.get("/api/status?client_name=plans&from=2024-01-01T00:00:00Z")
+    series = await client.get("/api/status/series?client_name=plans&bucket=hour")
+    assert [bucket["count"] for bucket in series.json()] == [1]
+
+
+FLOWS = [
+    habit_queries,
+    completion_queries,
+    analytics_queries,
+    sync_queries,
+    category_queries,
+    job_queries,
+    reminder_queries,
+    status_queries,
+]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("flow", FLOWS, ids=lambda flow: flow.__name__)
+async def test_query_shapes_have_indexes(
+    flow, fake_db, registered_client, create_habit
+):
+    """Test every filter a flow issues can be answered from a declared index."""
+    await flow(registered_client, create_habit)
+    assert_shapes_indexed(fake_db)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("flow", FLOWS, ids=lambda flow: flow.__name__)
+async def test_queries_use_indexes(flow, recorder, registered_client, create_habit):
+    """Test no command a flow issues plans a collection scan."""
+    await flow(registered_client, create_habit)
+    await assert_indexed(recorder)
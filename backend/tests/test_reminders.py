@@ -0,0 +1,145 @@
+"""Reminder scheduler tests."""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.core.config import get_settings
+from app.services import reminders
+from app.services.reminders import (
+    LogSink,
+    ReminderScheduler,
+    WebhookSink,
+    due_slots,
+    make_sink,
+)
+
+SLOT = "2024-01-01T07:30"
+
+
+def test_due_slots_cover_catchup_window():
+    """Test slots run oldest first up to the current minute."""
+    now = datetime(2024, 1, 1, 0, 1, 45, tzinfo=timezone.utc)
+    assert due_slots(now, 2) == [
+        "2023-12-31T23:59",
+        "2024-01-01T00:00",
+        "2024-01-01T00:01",
+    ]
+
+
+def test_make_sink_selects_configured_sink():
+    """Test the webhook sink needs a URL and log is the default."""
+    settings = get_settings()
+    assert isinstance(make_sink(settings), LogSink)
+
+    webhook = settings.model_copy(
+        update={"reminder_sink": "webhook", "reminder_webhook_url": "http://hook"}
+    )
+    assert isinstance(make_sink(webhook), WebhookSink)
+    with pytest.raises(ValueError):
+        make_sink(webhook.model_copy(update={"reminder_webhook_url": None}))
+
+
+class RecordingSink:
+    """Records delivered habit ids, optionally failing after some batches."""
+
+    def __init__(self, fail_after: int | None = None):
+        self.batches: list[tuple[str, list[str]]] = []
+        self.fail_after = fail_after
+
+    async def deliver(self, slot: str, reminders: list[dict]) -> None:
+        if self.fail_after is not None and len(self.batches) >= self.fail_after:
+            raise RuntimeError("sink unavailable")
+        self.batches.append((slot, [reminder["id"] for reminder in reminders]))
+
+
+def scheduler(db, sink=None, **settings) -> ReminderScheduler:
+    """A scheduler delivering two reminders per batch."""
+    config = get_settings().model_copy(
+        update={"reminder_batch_size": 2, "reminder_catchup_minutes": 5, **settings}
+    )
+    return ReminderScheduler(db, sink or RecordingSink(), config)
+
+
+async def add_reminders(db, time: str, *habit_ids: str) -> None:
+    for habit_id in habit_ids:
+        await db.habits.insert_one(
+            {
+                "id": habit_id,
+                "user_id": "u1",
+                "name": habit_id,
+                "reminder_enabled": True,
+                "reminder_time": time,
+            }
+        )
+
+
+@pytest.mark.asyncio
+async def test_live_lease_refuses_second_scheduler(fake_db):
+    """Test only the lease owner may claim a slot until the lease expires."""
+    first, second = scheduler(fake_db), scheduler(fake_db)
+    assert (await first.claim(SLOT))["owner"] == first.owner
+    assert await second.claim(SLOT) is None
+    assert await second.run_slot(SLOT) == 0
+    assert (await first.claim(SLOT))["owner"] == first.owner
+
+
+@pytest.mark.asyncio
+async def test_expired_lease_resumes_after_checkpoint(fake_db):
+    """Test a takeover delivers only what the dead owner had not recorded."""
+    await add_reminders(fake_db, "07:30", "h1", "h2", "h3")
+    crashed = scheduler(fake_db, RecordingSink(fail_after=1))
+    with pytest.raises(RuntimeError):
+        await crashed.run_slot(SLOT)
+    assert crashed.sink.batches == [(SLOT, ["h1", "h2"])]
+
+    successor = scheduler(fake_db)
+    assert await successor.run_slot(SLOT) == 0
+    await fake_db.reminder_slots.update_one(
+        {"_id": SLOT},
+        {"$set": {"lease_until": datetime.now(timezone.utc) - timedelta(seconds=1)}},
+    )
+    assert await successor.run_slot(SLOT) == 1
+    assert successor.sink.batches == [(SLOT, ["h3"])]
+
+    state = await fake_db.reminder_slots.find_one({"_id": SLOT})
+    assert (state["owner"], state["last_id"], state["sent"], state["done"]) == (
+        successor.owner,
+        "h3",
+        3,
+        True,
+    )
+    crashed.sink.fail_after = None
+    assert await crashed.run_slot(SLOT) == 0
+
+
+@pytest.mark.asyncio
+async def test_run_catches_up_on_missed_slots(fake_db, monkeypatch):
+    """Test one pass delivers every unfinished slot in the catch-up window."""
+    await add_reminders(fake_db, "07:26", "h1")
+    await add_reminders(fake_db, "07:28", "h2")
+    await add_reminders(fake_db, "07:29", "h3")
+    await add_reminders(fake_db, "07:30", "h4")
+    await fake_db.reminder_slots.insert_one(
+        {"_id": "2024-01-01T07:29", "done": True, "last_id": "h3", "sent": 1}
+    )
+    now = datetime(2024, 1, 1, 7, 30, 15, tzinfo=timezone.utc)
+
+    class FrozenDatetime(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return now
+
+    async def stop(seconds):
+        raise asyncio.CancelledError
+
+    monkeypatch.setattr(reminders, "datetime", FrozenDatetime)
+    monkeypatch.setattr(reminders.asyncio, "sleep", stop)
+    worker = scheduler(fake_db, reminder_catchup_minutes=3)
+    with pytest.raises(asyncio.CancelledError):
+        await worker.run()
+    assert worker.sink.batches == [
+        ("2024-01-01T07:28", ["h2"]),
+        ("2024-01-01T07:30", ["h4"]),
+    ]
@@ -0,0 +1,211 @@
+"""Daily rollup tests."""
+
+from datetime import date
+
+import pytest
+
+from app.services.rollups import (
+    daily_totals,
+    invalidate_rollups,
+    rebuild_rollups,
+    record_completion,
+    record_habit_delta,
+)
+
+
+class FakeCursor:
+    """Just enough of a Motor cursor for a sorted range read."""
+
+    def __init__(self, docs: list[dict]):
+        self.docs = docs
+
+    def sort(self, key: str, direction: int):
+        self.docs.sort(key=lambda doc: doc[key], reverse=direction < 0)
+        return self
+
+    async def to_list(self, length):
+        return self.docs
+
+
+class FakeDatabase:
+    """Users with built rollups and a ``daily_rollups`` collection."""
+
+    def __init__(self, rollups: list[dict]):
+        self.rollups = rollups
+        self.users = self
+        self.daily_rollups = self
+
+    async def find_one(self, query, projection):
+        return {"rollups_built": True}
+
+    def find(self, query, projection):
+        since = query["date"]["$gte"]
+        return FakeCursor([doc for doc in self.rollups if doc["date"] >= since])
+
+
+@pytest.mark.asyncio
+async def test_daily_totals_walk_habit_deltas_back():
+    """Test each day's total undoes the habit changes made after it."""
+    db = FakeDatabase(
+        [
+            {"date": "2024-01-01", "completed_count": 9, "habit_delta": 1},
+            {"date": "2024-01-03", "completed_count": 2, "habit_delta": 0},
+            {"date": "2024-01-04", "habit_delta": 1},
+            {"date": "2024-01-06", "completed_count": 1, "habit_delta": -1},
+        ]
+    )
+    totals = await daily_totals(db, "u1", 3, date(2024, 1, 2), date(2024, 1, 5))
+    assert totals == [
+        ("2024-01-02", 0, 3),
+        ("2024-01-03", 2, 3),
+        ("2024-01-04", 0, 4),
+        ("2024-01-05", 0, 4),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_archived_habits_leave_both_figures(auth_client):
+    """Test archiving drops a habit's completions along with its count."""
+    first = (await auth_client.post("/api/habits", json={"name": "Read"})).json()
+    second = (await auth_client.post("/api/habits", json={"name": "Run"})).json()
+    today = first["created_at"][:10]
+    for habit in (first, second):
+        await auth_client.post(
+            "/api/habits/completions/toggle",
+            json={"habit_id": habit["id"], "date": today},
+        )
+
+    async def figures():
+        days = (await auth_client.get(f"/api/analytics/daily?from={today}")).json()
+        return days[-1]["completed_count"], days[-1]["total_habits"]
+
+    assert await figures() == (2, 2)
+    await auth_client.patch(f"/api/habits/{second['id']}", json={"is_archived": True})
+    assert await figures() == (1, 1)
+    await auth_client.post(
+        "/api/habits/completions/toggle",
+        json={"habit_id": second["id"], "date": today},
+    )
+    await auth_client.post(
+        "/api/habits/completions/toggle",
+        json={"habit_id": second["id"], "date": today},
+    )
+    assert await figures() == (1, 1)
+    await auth_client.patch(f"/api/habits/{second['id']}", json={"is_archived": False})
+    assert await figures() == (2, 2)
+
+
+@pytest.mark.asyncio
+async def test_rebuild_sets_days_in_place(fake_db):
+    """Test a rebuild overwrites and zeroes days rather than recreating them."""
+    db = fake_db
+    await db.users.insert_one({"id": "u1"})
+    await db.habits.insert_one(
+        {"user_id": "u1", "id": "h1", "created_at": "2024-01-01T08:00:00"}
+    )
+    await db.habits.insert_one(
+        {
+            "user_id": "u1",
+            "id": "h2",
+            "created_at": "2024-01-01T09:00:00",
+            "is_archived": True,
+        }
+    )
+    for habit_id, day in (
+        ("h1", "2024-01-02"),
+        ("h2", "2024-01-02"),
+        ("h2", "2024-01-03"),
+    ):
+        await db.completions.insert_one(
+            {"user_id": "u1", "habit_id": habit_id, "date": day, "completed": True}
+        )
+    stale = {"user_id": "u1", "date": "2024-01-03", "completed_count": 4}
+    await db.daily_rollups.insert_one(stale)
+
+    assert await rebuild_rollups(db, "u1") == 3
+    rollups = (
+        await db.daily_rollups.find({}, {"_id": 0, "user_id": 0, "version": 0})
+        .sort("date")
+        .to_list()
+    )
+    assert rollups == [
+        {"date": "2024-01-01", "completed_count": 0, "habit_delta": 1},
+        {"date": "2024-01-02", "completed_count": 1, "habit_delta": 0},
+        {"date": "2024-01-03", "completed_count": 0, "habit_delta": 0},
+    ]
+    assert (await db.daily_rollups.find_one({"date": "2024-01-03"}))["_id"] == stale[
+        "_id"
+    ]
+    assert (await db.users.find_one({"id": "u1"}))["rollups_built"] is True
+
+
+@pytest.mark.asyncio
+async def test_rebuild_keeps_writes_made_while_aggregating(fake_db, monkeypatch):
+    """Test a rebuild never overwrites an ``$inc`` that landed mid-aggregation."""
+    db = fake_db
+    await db.users.insert_one({"id": "u1"})
+    await db.habits.insert_one(
+        {"user_id": "u1", "id": "h1", "created_at": "2024-01-01T08:00:00"}
+    )
+    await db.completions.insert_one(
+        {"user_id": "u1", "habit_id": "h1", "date": "2024-01-02", "completed": True}
+    )
+    await db.daily_rollups.insert_one(
+        {"user_id": "u1", "date": "2024-01-02", "completed_count": 5}
+    )
+    aggregate = db.completions.aggregate
+
+    def aggregate_then_write(pipeline):
+        rows = aggregate(pipeline)
+
+        async def iterate():
+            async for row in rows:
+                yield row
+            # A habit is created and completed after the counts were read.
+            habit = {"user_id": "u1", "id": "h2", "created_at": "2024-01-01T09:00:00"}
+            await db.habits.insert_one(habit)
+            await record_habit_delta(db, "u1", habit, 1)
+            completion = {"user_id": "u1", "habit_id": "h2", "date": "2024-01-02"}
+            await db.completions.insert_one({**completion, "completed": True})
+            await record_completion(db, "u1", "2024-01-02", True)
+
+        return iterate()
+
+    monkeypatch.setattr(db.completions, "aggregate", aggregate_then_write)
+    await rebuild_rollups(db, "u1")
+
+    async def figures():
+        return [
+            (doc["date"], doc.get("completed_count", 0), doc.get("habit_delta", 0))
+            for doc in await db.daily_rollups.find().sort("date").to_list()
+        ]
+
+    assert await figures() == [("2024-01-01", 0, 1), ("2024-01-02", 6, 0)]
+    assert (await db.users.find_one({"id": "u1"}))["rollups_built"] is False
+
+    monkeypatch.undo()
+    await rebuild_rollups(db, "u1")
+    assert await figures() == [("2024-01-01", 0, 2), ("2024-01-02", 2, 0)]
+    assert (await db.users.find_one({"id": "u1"}))["rollups_built"] is True
+
+
+@pytest.mark.asyncio
+async def test_invalidation_during_rebuild_keeps_rollups_unbuilt(fake_db, monkeypatch):
+    """Test a rebuild does not mark rollups built over a newer invalidation."""
+    db = fake_db
+    await db.users.insert_one({"id": "u1"})
+    find = db.habits.find
+
+    def find_then_invalidate(*args):
+        habits = find(*args)
+
+        async def iterate():
+            async for habit in habits:
+                yield habit
+            await invalidate_rollups(db, "u1")
+
+        return iterate()
+
+    monkeypatch.setattr(db.habits, "find", find_then_invalidate)
+    await rebuild_rollups(db, "u1")
+    assert (await db.users.find_one({"id": "u1"}))["rollups_built"] is False
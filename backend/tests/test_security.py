@@ -0,0 +1,47 @@
+"""Password hashing pool tests."""
+
+import asyncio
+import threading
+
+import pytest
+
+from app.core.security import PasswordHasher, PasswordHasherBusy
+
+
+@pytest.mark.asyncio
+async def test_saturated_hasher_rejects_instead_of_queueing():
+    """Test callers beyond the pending limit are shed immediately."""
+    hasher = PasswordHasher(workers=1, max_pending=1, queue_timeout=5)
+    release = threading.Event()
+    try:
+        running = asyncio.create_task(hasher.run(release.wait))
+        await asyncio.sleep(0.05)
+        queued = asyncio.create_task(hasher.run(lambda: "queued"))
+        await asyncio.sleep(0.05)
+
+        with pytest.raises(PasswordHasherBusy):
+            await hasher.run(lambda: "rejected")
+
+        release.set()
+        assert await running is True
+        assert await queued == "queued"
+    finally:
+        release.set()
+        hasher.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_queue_timeout_rejects_waiters():
+    """Test a caller waiting longer than the timeout is rejected."""
+    hasher = PasswordHasher(workers=1, max_pending=5, queue_timeout=0.05)
+    release = threading.Event()
+    try:
+        running = asyncio.create_task(hasher.run(release.wait))
+        await asyncio.sleep(0.02)
+        with pytest.raises(PasswordHasherBusy):
+            await hasher.run(lambda: None)
+        release.set()
+        await running
+    finally:
+        release.set()
+        hasher.shutdown()
@@ -0,0 +1,50 @@
+"""Fast response rendering tests."""
+
+import json
+from datetime import datetime, timezone
+
+from fastapi import Response
+
+from app.core import serialization
+from app.core.config import get_settings
+from app.core.serialization import FastJSONResponse, fast_response, model_projection
+from app.models.habit import CompletionRecord
+
+
+def test_dumps_matches_json_fallback(monkeypatch):
+    """Test both encoders produce the same compact JSON."""
+    content = [{"id": "a", "at": datetime(2024, 1, 1, tzinfo=timezone.utc)}]
+    fast = serialization.dumps(content)
+    monkeypatch.setattr(serialization, "HAS_ORJSON", False)
+    assert serialization.dumps(content) == fast
+    assert json.loads(fast) == [{"id": "a", "at": "2024-01-01T00:00:00+00:00"}]
+
+
+def test_model_projection_lists_model_fields():
+    """Test projections return exactly the model's fields."""
+    assert model_projection(CompletionRecord) == {
+        "_id": 0,
+        "id": 1,
+        "user_id": 1,
+        "habit_id": 1,
+        "date": 1,
+        "completed": 1,
+        "notes": 1,
+    }
+
+
+def test_fast_response_is_opt_in(monkeypatch):
+    """Test content passes through unless enabled, then keeps set headers."""
+    response = Response()
+    del response.headers["content-length"]
+    response.headers["X-Next-Cursor"] = "abc"
+    content = [{"id": "a"}]
+
+    assert fast_response(content, response) is content
+
+    monkeypatch.setattr(get_settings(), "fast_responses", True)
+    rendered = fast_response(content, response)
+    assert isinstance(rendered, FastJSONResponse)
+    assert rendered.body == b'[{"id":"a"}]'
+    assert rendered.headers["x-next-cursor"] == "abc"
+    assert rendered.headers["content-length"] == str(len(rendered.body))
@@ -0,0 +1,59 @@
+"""Status check range tests."""
+
+from datetime import datetime, timezone
+
+import pytest
+
+from app.core.config import get_settings
+from app.models.status import StatusBucketUnit
+from app.services.status_checks import downsample_pipeline, range_query
+
+
+def test_range_query_bounds_are_half_open():
+    """Test ranges include ``from``, exclude ``to`` and may omit either."""
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    end = datetime(2024, 1, 2, tzinfo=timezone.utc)
+    assert range_query(start, end, "web") == {
+        "client_name": "web",
+        "timestamp": {"$gte": start, "$lt": end},
+    }
+    assert range_query(None, None, None) == {}
+
+
+def test_downsample_truncates_to_bucket_unit():
+    """Test checks are grouped per client on the truncated timestamp."""
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    end = datetime(2024, 1, 2, tzinfo=timezone.utc)
+    group = downsample_pipeline(start, end, None, StatusBucketUnit.HOUR)[1]["$group"]
+    assert group["_id"]["start"] == {
+        "$dateTrunc": {"date": "$timestamp", "unit": "hour"}
+    }
+
+
+@pytest.mark.asyncio
+async def test_series_rejects_bad_ranges(client):
+    """Test empty ranges and ranges with too many buckets answer 400."""
+    response = await client.get(
+        "/api/status/series?from=2024-01-02T00:00:00Z&to=2024-01-01T00:00:00Z"
+    )
+    assert response.status_code == 400
+
+    response = await client.get(
+        "/api/status/series?from=2023-01-01T00:00:00Z&to=2024-01-01T00:00:00Z"
+    )
+    assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("fast", [False, True])
+async def test_listed_timestamps_are_utc(client, fake_db, monkeypatch, fast):
+    """Test naive stored timestamps are emitted as UTC on both render paths."""
+    monkeypatch.setattr(get_settings(), "fast_responses", fast)
+    await fake_db.status_checks.insert_one(
+        {"id": "c1", "client_name": "web", "timestamp": datetime(2024, 1, 1, 12)}
+    )
+    response = await client.get("/api/status")
+    assert response.json()[0]["timestamp"] in (
+        "2024-01-01T12:00:00Z",
+        "2024-01-01T12:00:00+00:00",
+    )
@@ -0,0 +1,149 @@
+"""Delta sync and export route tests against the in-memory database."""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.core.indexes import INDEXES
+from app.core.pagination import decode_cursor, encode_cursor
+from app.services.data_version import (
+    PENDING_TIMEOUT,
+    committed_version,
+    committing_version,
+)
+from app.services.sync import MAX_CURSOR_AGE
+
+
+@pytest.mark.asyncio
+async def test_sync_reports_changes_and_deletions_since_cursor(auth_client):
+    """Test a sync cursor yields only later writes, including tombstones."""
+    habit = (await auth_client.post("/api/habits", json={"name": "Read"})).json()
+    full = await auth_client.get("/api/sync")
+    assert full.status_code == 200
+    assert [h["id"] for h in full.json()["habits"]] == [habit["id"]]
+
+    unchanged = await auth_client.get(f"/api/sync?since={full.json()['cursor']}")
+    assert unchanged.json()["habits"] == []
+
+    toggle = {"habit_id": habit["id"], "date": "2024-01-01"}
+    await auth_client.post("/api/habits/completions/toggle", json=toggle)
+    changes = await auth_client.get(f"/api/sync?since={full.json()['cursor']}")
+    assert [c["date"] for c in changes.json()["completions"]] == ["2024-01-01"]
+
+    await auth_client.delete(f"/api/habits/{habit['id']}")
+    changes = await auth_client.get(f"/api/sync?since={changes.json()['cursor']}")
+    assert changes.json()["deleted"] == [{"collection": "habits", "id": habit["id"]}]
+
+
+@pytest.mark.asyncio
+async def test_sync_rejects_invalid_cursor(auth_client):
+    """Test a malformed cursor is a 400."""
+    response = await auth_client.get("/api/sync?since=bogus")
+    assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_export_includes_completions(auth_client):
+    """Test CSV and JSON exports carry every completion."""
+    habit = (await auth_client.post("/api/habits", json={"name": "Read"})).json()
+    toggle = {"habit_id": habit["id"], "date": "2024-01-01"}
+    await auth_client.post("/api/habits/completions/toggle", json=toggle)
+
+    exported = await auth_client.get("/api/export?format=json")
+    assert exported.status_code == 200
+    body = exported.json()
+    assert [h["name"] for h in body["habits"]] == ["Read"]
+    assert [c["date"] for c in body["completions"]] == ["2024-01-01"]
+
+    exported = await auth_client.get("/api/export")
+    assert exported.status_code == 200
+    assert "Read" in exported.text and "2024-01-01" in exported.text
+
+
+@pytest.mark.asyncio
+async def test_cursor_held_below_in_flight_stamps(auth_client, fake_db, user):
+    """Test a sync racing a stamp returns a cursor that still finds it later."""
+    habit = (await auth_client.post("/api/habits", json={"name": "Read"})).json()
+    full = (await auth_client.get("/api/sync")).json()
+
+    async with committing_version(fake_db, user["id"]) as version:
+        racing = (await auth_client.get(f"/api/sync?since={full['cursor']}")).json()
+        assert decode_cursor(racing["cursor"], 2)[0] == version - 1
+        await fake_db.habits.update_one(
+            {"id": habit["id"]}, {"$set": {"name": "Write", "sync_version": version}}
+        )
+
+    changes = (await auth_client.get(f"/api/sync?since={racing['cursor']}")).json()
+    assert [h["name"] for h in changes["habits"]] == ["Write"]
+    assert decode_cursor(changes["cursor"], 2)[0] == version
+    stored = await fake_db.users.find_one({"id": user["id"]})
+    assert stored["pending"] == []
+
+
+@pytest.mark.asyncio
+async def test_abandoned_reservations_expire(fake_db, user):
+    """Test a pending version left by a crashed writer stops holding cursors."""
+    stale = datetime.now(timezone.utc) - PENDING_TIMEOUT - timedelta(seconds=1)
+    await fake_db.users.update_one(
+        {"id": user["id"]},
+        {"$set": {"data_version": 5, "pending": [{"v": 3, "at": stale}]}},
+    )
+    assert await committed_version(fake_db, user["id"]) == 5
+
+
+@pytest.mark.asyncio
+async def test_sync_pages_end_on_version_boundaries(auth_client):
+    """Test small pages follow ``has_more`` and never split one write."""
+    habits = [
+        (await auth_client.post("/api/habits", json={"name": name})).json()
+        for name in ("Read", "Run")
+    ]
+    # One batch stamps both completions with a single version.
+    await auth_client.post(
+        "/api/habits/completions/batch",
+        json={
+            "operations": [
+                {
+                    "habit_id": habit["id"],
+                    "date": "2024-01-01",
+                    "completed": True,
+                    "client_ts": "2024-01-01T00:00:00Z",
+                }
+                for habit in habits
+            ]
+        },
+    )
+
+    pages, cursor = [], None
+    while True:
+        query = f"?limit=1&since={cursor}" if cursor else "?limit=1"
+        page = (await auth_client.get(f"/api/sync{query}")).json()
+        pages.append((len(page["habits"]), len(page["completions"])))
+        cursor = page["cursor"]
+        if not page["has_more"]:
+            break
+    assert pages == [(1, 0), (1, 0), (0, 2)]
+
+    unchanged = (await auth_client.get(f"/api/sync?since={cursor}")).json()
+    assert (unchanged["habits"], unchanged["has_more"]) == ([], False)
+
+
+@pytest.mark.asyncio
+async def test_expired_cursor_requires_resync(auth_client):
+    """Test a cursor older than tombstones are kept for is a 410."""
+    issued = datetime.now(timezone.utc) - MAX_CURSOR_AGE - timedelta(minutes=1)
+    response = await auth_client.get(f"/api/sync?since={encode_cursor([0, issued])}")
+    assert response.status_code == 410
+
+    fresh = encode_cursor([0, datetime.now(timezone.utc)])
+    assert (await auth_client.get(f"/api/sync?since={fresh}")).status_code == 200
+
+
+def test_tombstones_outlive_cursors():
+    """Test tombstones expire only after every cursor that could need them."""
+    (ttl,) = [
+        spec.expire_after_seconds
+        for spec in INDEXES
+        if spec.collection == "tombstones" and spec.expire_after_seconds
+    ]
+    assert timedelta(seconds=ttl) > MAX_CURSOR_AGE + PENDING_TIMEOUT
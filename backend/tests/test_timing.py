@@ -0,0 +1,93 @@
+"""Request timing tests."""
+
+import json
+import logging
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.timing import (
+    CommandTimings,
+    RequestTimings,
+    current_timings,
+    log_slow_query,
+)
+
+
+@pytest.mark.asyncio
+async def test_server_timing_header_reports_spans(client):
+    """Test responses carry auth, render and total spans."""
+    response = await client.get(
+        "/api/habits/abc", headers={"Authorization": "Bearer not-a-token"}
+    )
+    assert response.status_code == 401
+    assert response.headers["server-timing"].startswith("auth;dur=")
+    assert "total;dur=" in response.headers["server-timing"]
+
+    response = await client.get("/api/")
+    assert "render;dur=" in response.headers["server-timing"]
+
+
+def test_slow_commands_are_timed_and_logged(caplog):
+    """Test command durations feed the db span and slow ones are logged."""
+    listener = CommandTimings()
+    timings = RequestTimings()
+    token = current_timings.set(timings)
+    ids = {"connection_id": ("localhost", 27017), "request_id": 1}
+    try:
+        listener.started(
+            SimpleNamespace(
+                command_name="find",
+                command={"find": "habits", "filter": {}, "lsid": {}},
+                database_name="test",
+                **ids,
+            )
+        )
+        with caplog.at_level(logging.WARNING, logger="app.slow_queries"):
+            listener.succeeded(
+                SimpleNamespace(command_name="find", duration_micros=250_000, **ids)
+            )
+    finally:
+        current_timings.reset(token)
+        listener.shutdown()
+
+    assert timings.counts == {"db": 1}
+    assert 'db;dur=250.0;desc="1 commands"' in timings.header()
+    [record] = caplog.records
+    assert "slow find (250.0 ms)" in record.getMessage()
+    assert '"lsid"' not in record.getMessage()
+
+
+def test_slow_query_log_keeps_only_the_query_shape(caplog):
+    """Test values in a logged command and its explain are redacted."""
+    command = {
+        "find": "users",
+        "filter": {"email": "tester@example.com", "id": {"$in": ["a", "b"]}},
+        "limit": 1,
+    }
+    explain = {
+        "nReturned": 1,
+        "executionStages": {
+            "stage": "FETCH",
+            "filter": {"email": {"$eq": "tester@example.com"}},
+            "inputStage": {
+                "stage": "IXSCAN",
+                "indexBounds": {"id": ['["a", "a"]', '["b", "b"]']},
+            },
+        },
+    }
+    with caplog.at_level(logging.WARNING, logger="app.slow_queries"):
+        log_slow_query("find", command, 0.25, explain)
+
+    [record] = caplog.records
+    logged = json.loads(record.getMessage().split(": ", 1)[1])
+    assert logged["command"] == {
+        "find": "users",
+        "filter": {"email": "?", "id": {"$in": ["?"]}},
+        "limit": "?",
+    }
+    stages = logged["explain"]["executionStages"]
+    assert stages["filter"] == {"email": {"$eq": "?"}}
+    assert stages["inputStage"]["indexBounds"] == {"id": ["?"]}
+    assert (logged["explain"]["nReturned"], stages["stage"]) == (1, "FETCH")
+    assert "example.com" not in record.getMessage()
@@ -13,6 +13,50 @@ export const useHabits = () => {
 };
 
 const STORAGE_KEY = 'habit-tracker-data';
+const PENDING_KEY = 'habit-tracker-pending';
+
+// Completion changes made while offline, replayed in batches on reconnect
+const loadPending = () => {
+  try {
+    return JSON.parse(localStorage.getItem(PENDING_KEY)) || [];
+  } catch (e) {
+    return [];
+  }
+};
+
+const queueCompletion = (operation) => {
+  localStorage.setItem(PENDING_KEY, JSON.stringify([...loadPending(), operation]));
+};
+
+// Most operations the batch endpoint accepts per request
+const SYNC_BATCH_SIZE = 1000;
+
+// Client errors that say nothing about the batch itself and are worth retrying
+const RETRYABLE_STATUSES = [401, 408, 429];
+
+// Replays the queue in server-sized batches, dropping each batch once the
+// server has answered it. Operations it rejects, or a batch it refuses
+// outright, are reported and dropped so they cannot block later syncs.
+const replayPending = async () => {
+  let pending = loadPending();
+  while (pending.length > 0) {
+    const batch = pending.slice(0, SYNC_BATCH_SIZE);
+    try {
+      const result = await api.syncCompletions(batch);
+      if (result.rejected > 0) {
+        const rejected = result.results.filter(r => r.status === 'rejected');
+        console.warn('Server rejected queued completion changes:', rejected);
+      }
+    } catch (error) {
+      const clientError = error.status >= 400 && error.status < 500;
+      if (!clientError || RETRYABLE_STATUSES.includes(error.status)) throw error;
+      console.warn('Dropping queued completion changes the server refused:', error.message);
+    }
+    // Operations queued while the batch was in flight stay behind it
+    pending = loadPending().slice(batch.length);
+    localStorage.setItem(PENDING_KEY, JSON.stringify(pending));
+  }
+};
 
 export const HabitsProvider = ({ children }) => {
   const [habits, setHabits] = useState([]);
@@ -29,8 +73,11 @@ export const HabitsProvider = ({ children }) => {
       await api.healthCheck();
       setIsOnline(true);
 
-      // Load from backend
-      const backendHabits = await api.getHabits();
+      // Replay completion changes queued while offline
+      await replayPending();
+
+      // Load habits and their completions in a single request
+      const backendHabits = await api.getHabitsWithCompletions();
       
       // Transform backend data to frontend format
       const transformedHabits = backendHabits.map(h => ({
@@ -40,17 +87,15 @@ export const HabitsProvider = ({ children }) => {
         createdAt: h.created_at,
       }));
       
-      // Load completions for each habit
       const completionsMap = {};
-      for (const habit of transformedHabits) {
-        const habitCompletions = await api.getCompletions(habit.id);
-        habitCompletions.forEach(c => {
+      backendHabits.forEach(habit => {
+        (habit.completions || []).forEach(c => {
           if (c.completed) {
             if (!completionsMap[c.date]) completionsMap[c.date] = {};
             completionsMap[c.date][c.habit_id] = true;
           }
         });
-      }
+      });
 
       setHabits(transformedHabits);
       setCompletions(completionsMap);
@@ -143,13 +188,22 @@ export const HabitsProvider = ({ children }) => {
 
   const toggleCompletion = async (habitId, date) => {
     const dateKey = format(date, 'yyyy-MM-dd');
+    const operation = {
+      habit_id: habitId,
+      date: dateKey,
+      completed: !completions[dateKey]?.[habitId],
+      client_ts: new Date().toISOString(),
+    };
 
     if (isOnline) {
       try {
         await api.toggleCompletion(habitId, dateKey);
       } catch (error) {
         console.error('Failed to toggle completion on backend:', error);
+        queueCompletion(operation);
       }
+    } else {
+      queueCompletion(operation);
     }
 
     setCompletions(prev => {
@@ -4,11 +4,50 @@
 
 const API_BASE_URL = process.env.REACT_APP_BACKEND_URL || 'http://localhost:8000';
 const TOKEN_KEY = 'habit-tracker-token';
+const REFRESH_TOKEN_KEY = 'habit-tracker-refresh-token';
 
 class ApiClient {
   constructor(baseUrl) {
     this.baseUrl = baseUrl;
     this.token = localStorage.getItem(TOKEN_KEY);
+    this.refreshToken = localStorage.getItem(REFRESH_TOKEN_KEY);
+    this.refreshing = null;
+  }
+
+  setRefreshToken(refreshToken) {
+    this.refreshToken = refreshToken;
+    if (refreshToken) {
+      localStorage.setItem(REFRESH_TOKEN_KEY, refreshToken);
+    } else {
+      localStorage.removeItem(REFRESH_TOKEN_KEY);
+    }
+  }
+
+  // Exchanges the refresh token for a new token pair; concurrent callers
+  // share one in-flight refresh.
+  async refreshSession() {
+    if (!this.refreshing) {
+      this.refreshing = fetch(`${this.baseUrl}/api/auth/refresh`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ refresh_token: this.refreshToken }),
+      })
+        .then(async (response) => {
+          if (!response.ok) {
+            this.setToken(null);
+            this.setRefreshToken(null);
+            return false;
+          }
+          const data = await response.json();
+          this.setToken(data.access_token);
+          this.setRefreshToken(data.refresh_token);
+          return true;
+        })
+        .finally(() => {
+          this.refreshing = null;
+        });
+    }
+    return this.refreshing;
   }
 
   setToken(token) {
@@ -29,6 +68,27 @@ class ApiClient {
   }
 
   async request(endpoint, options = {}) {
+    const { data } = await this.requestWithHeaders(endpoint, options);
+    return data;
+  }
+
+  // Follows X-Next-Cursor headers until every page of a list is loaded.
+  async requestAllPages(endpoint) {
+    const items = [];
+    let cursor = null;
+    do {
+      const separator = endpoint.includes('?') ? '&' : '?';
+      const page = cursor
+        ? `${endpoint}${separator}after=${encodeURIComponent(cursor)}`
+        : endpoint;
+      const { data, headers } = await this.requestWithHeaders(page);
+      items.push(...data);
+      cursor = headers.get('X-Next-Cursor');
+    } while (cursor);
+    return items;
+  }
+
+  async requestWithHeaders(endpoint, options = {}) {
     const url = `${this.baseUrl}/api${endpoint}`;
     const headers = {
       'Content-Type': 'application/json',
@@ -39,21 +99,35 @@ class ApiClient {
       headers['Authorization'] = `Bearer ${this.token}`;
     }
 
-    const config = { ...options, headers };
+    const { isRetry, ...fetchOptions } = options;
+    const config = { ...fetchOptions, headers };
 
     try {
       const response = await fetch(url, config);
-      
+
+      if (
+        response.status === 401 &&
+        this.refreshToken &&
+        !isRetry &&
+        !endpoint.startsWith('/auth/')
+      ) {
+        if (await this.refreshSession()) {
+          return this.requestWithHeaders(endpoint, { ...options, isRetry: true });
+        }
+      }
+
       if (!response.ok) {
-        const error = await response.json().catch(() => ({}));
-        throw new Error(error.detail || `HTTP ${response.status}`);
+        const body = await response.json().catch(() => ({}));
+        const error = new Error(body.detail || `HTTP ${response.status}`);
+        error.status = response.status;
+        throw error;
       }
 
       if (response.status === 204) {
-        return null;
+        return { data: null, headers: response.headers };
       }
 
-      return response.json();
+      return { data: await response.json(), headers: response.headers };
     } catch (error) {
       console.error(`API Error [${endpoint}]:`, error);
       throw error;
@@ -67,7 +141,16 @@ class ApiClient {
 
   // Habits
   async getHabits() {
-    return this.request('/habits');
+    return this.requestAllPages('/habits');
+  }
+
+  async getHabitsWithCompletions({ from, to, stats = false } = {}) {
+    const params = new URLSearchParams({
+      include: stats ? 'completions,stats' : 'completions',
+    });
+    if (from) params.set('from', from);
+    if (to) params.set('to', to);
+    return this.requestAllPages(`/habits?${params.toString()}`);
   }
 
   async createHabit(habit) {
@@ -90,6 +173,38 @@ class ApiClient {
     });
   }
 
+  // Categories
+  async getCategories() {
+    return this.request('/categories');
+  }
+
+  async createCategory(category) {
+    return this.request('/categories', {
+      method: 'POST',
+      body: JSON.stringify(category),
+    });
+  }
+
+  async updateCategory(categoryId, updates) {
+    return this.request(`/categories/${categoryId}`, {
+      method: 'PATCH',
+      body: JSON.stringify(updates),
+    });
+  }
+
+  async deleteCategory(categoryId) {
+    return this.request(`/categories/${categoryId}`, {
+      method: 'DELETE',
+    });
+  }
+
+  // Background jobs (habit and account deletion return one); account deletion
+  // jobs outlive the session and are read with their status token
+  async getJob(jobId, statusToken = null) {
+    const headers = statusToken ? { 'X-Job-Token': statusToken } : {};
+    return this.request(`/jobs/${jobId}`, { headers });
+  }
+
   // Completions
   async toggleCompletion(habitId, date) {
     return this.request('/habits/completions/toggle', {
@@ -98,8 +213,52 @@ class ApiClient {
     });
   }
 
+  async syncCompletions(operations) {
+    return this.request('/habits/completions/batch', {
+      method: 'POST',
+      body: JSON.stringify({ operations }),
+    });
+  }
+
+  // Follows has_more pages from a sync cursor. An expired cursor (410) falls
+  // back to a full sync, returned with full: true.
+  async getChanges(since) {
+    const changes = { habits: [], completions: [], deleted: [], full: !since };
+    let cursor = since;
+    let page;
+    do {
+      const query = cursor ? `?since=${encodeURIComponent(cursor)}` : '';
+      try {
+        page = await this.request(`/sync${query}`);
+      } catch (error) {
+        if (error.status === 410 && since) {
+          return this.getChanges(null);
+        }
+        throw error;
+      }
+      changes.habits.push(...page.habits);
+      changes.completions.push(...page.completions);
+      changes.deleted.push(...page.deleted);
+      cursor = page.cursor;
+    } while (page.has_more);
+    return { ...changes, cursor };
+  }
+
   async getCompletions(habitId) {
-    return this.request(`/habits/completions/${habitId}`);
+    return this.requestAllPages(`/habits/completions/${habitId}`);
+  }
+
+  // Analytics
+  async getHabitAnalytics(habitId) {
+    return this.request(`/analytics/habits/${habitId}`);
+  }
+
+  async getOverallAnalytics() {
+    return this.request('/analytics/overall');
+  }
+
+  async getMonthlyAnalytics(month) {
+    return this.request(`/analytics/monthly?month=${month}`);
   }
 
   // Auth
@@ -118,16 +277,31 @@ class ApiClient {
     });
     if (data.access_token) {
       this.setToken(data.access_token);
+      this.setRefreshToken(data.refresh_token);
     }
     return data;
   }
 
+  async deleteAccount() {
+    const job = await this.request('/auth/me', { method: 'DELETE' });
+    this.setToken(null);
+    this.setRefreshToken(null);
+    return job;
+  }
+
   async getMe() {
     return this.request('/auth/me');
   }
 
   logout() {
+    if (this.refreshToken) {
+      this.request('/auth/logout', {
+        method: 'POST',
+        body: JSON.stringify({ refresh_token: this.refreshToken }),
+      }).catch(() => {});
+    }
     this.setToken(null);
+    this.setRefreshToken(null);
   }
 }
 